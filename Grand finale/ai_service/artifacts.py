@@ -0,0 +1,57 @@
+"""
+Versioned NumPy model artifacts.
+
+A model is saved as a single uncompressed .npz of named arrays plus a
+``checksum`` entry (SHA-256 over names, dtypes, shapes and bytes) and a
+``version`` entry. Loading verifies both so a worker never serves weights from
+a truncated file or an older format.
+"""
+import hashlib
+import os
+import zipfile
+
+import numpy as np
+
+
+class ArtifactError(Exception):
+    """Raised when a saved model artifact is missing, stale or corrupted."""
+
+
+def checksum(arrays: dict) -> str:
+    digest = hashlib.sha256()
+    for key in sorted(arrays):
+        arr = np.ascontiguousarray(arrays[key])
+        digest.update(key.encode())
+        digest.update(str(arr.dtype).encode())
+        digest.update(str(arr.shape).encode())
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+
+def save_arrays(path: str, arrays: dict, version: int):
+    arrays = dict(arrays, version=np.array(version))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write to a temp file first so concurrent workers never see a partial artifact
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        np.savez(fh, checksum=np.array(checksum(arrays)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_arrays(path: str, version: int) -> dict:
+    """Named arrays of a verified artifact (without the checksum/version entries)."""
+    if not os.path.exists(path):
+        raise ArtifactError(f"No model artifact at {path}")
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+    except (OSError, ValueError, EOFError, zipfile.BadZipFile) as e:
+        # Truncated or corrupt file: callers retrain/rebuild as for a missing one
+        raise ArtifactError(f"Unreadable artifact {path}: {type(e).__name__}: {e}")
+    expected = str(arrays.pop("checksum", ""))
+    if checksum(arrays) != expected:
+        raise ArtifactError(f"Checksum mismatch for {path}")
+    found = int(arrays.pop("version", -1))
+    if found != version:
+        raise ArtifactError(f"Artifact version {found} != {version}")
+    return arrays
@@ -0,0 +1,89 @@
+"""
+Micro-batching of concurrent requests onto a worker pool.
+
+Requests awaiting `MicroBatcher.submit` within the same few-millisecond window
+are handed to one call of a batch function (run on an executor), so
+per-call overhead such as model dispatch and NumPy setup is paid once
+per batch instead of once per request. Everything except the batch function
+itself runs on the event loop thread, so no locking is needed.
+"""
+import asyncio
+from typing import Any, Callable, List, Optional
+
+
+class Overloaded(Exception):
+    """Raised by `submit` when too many items are already waiting."""
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 32,
+                 max_wait_ms: float = 5.0, max_pending: int = 256, executor=None):
+        """
+        `fn` maps a list of items to a same-length list of results; a result
+        that is an Exception instance is raised to that item's caller only.
+        `executor` may be an Executor or a zero-argument function returning
+        one, so a pool that is shut down and recreated is picked up.
+        """
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = max_pending
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue = []
+        self._timer = None
+        self._in_flight = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue) + self._in_flight
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # First use, or a new event loop (e.g. a fresh test client)
+            self._loop, self._queue, self._timer, self._in_flight = loop, [], None, 0
+        if self.pending >= self.max_pending:
+            raise Overloaded(f"{self.pending} items already pending")
+
+        future = loop.create_future()
+        self._queue.append((item, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        if self._queue:
+            self._timer = self._loop.call_later(self.max_wait, self._flush)
+        # Drop callers that went away (cancelled) while waiting
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        self._in_flight += len(batch)
+        self.batches += 1
+        self.items += len(batch)
+        executor = self.executor() if callable(self.executor) else self.executor
+        task = self._loop.run_in_executor(executor, self.fn, [item for item, _ in batch])
+        task.add_done_callback(lambda done: self._deliver(batch, done))
+
+    def _deliver(self, batch, done: asyncio.Future):
+        self._in_flight -= len(batch)
+        error = asyncio.CancelledError() if done.cancelled() else done.exception()
+        results = [error] * len(batch) if error is not None else done.result()
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, asyncio.CancelledError):
+                future.cancel()
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,89 @@
+"""
+Bulk credit scoring at portfolio scale.
+
+Scores N synthetic members (default 100k) with the scalar rules in a Python
+loop and with the vectorized `score_columns`, checks the two agree on every
+row, cross-checks a sample against the single-record /credit-score endpoint,
+and times /credit-score/bulk with a JSON and a CSV payload.
+Run from ai_service/: python benchmarks/bench_credit.py [rows]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from credit_scoring import score_columns, score_record  # noqa: E402
+from main import app  # noqa: E402
+
+
+def _portfolio(n, seed=0):
+    rng = np.random.default_rng(seed)
+    land = rng.choice([0.5, 1.0, 2.0, 2.0000001, 3.5, 10.0], n)
+    mask = rng.random(n) < 0.3
+    land[mask] = rng.uniform(0, 6, mask.sum())
+    return {
+        "land_size_acres": land.tolist(),
+        "past_defaults": rng.integers(-1, 4, n).tolist(),
+        "yield_history_years": rng.integers(-5, 40, n).tolist(),
+        "kyc_status": (rng.random(n) < 0.7).tolist(),
+    }
+
+
+def main(n=100_000):
+    cols = _portfolio(n)
+    rows = list(zip(cols["land_size_acres"], cols["past_defaults"], cols["yield_history_years"], cols["kyc_status"]))
+
+    t0 = time.perf_counter()
+    scalar = [score_record(*row) for row in rows]
+    scalar_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scores, risks = score_columns(**cols)
+    vector_s = time.perf_counter() - t0
+    arrays = {key: np.asarray(value) for key, value in cols.items()}
+    t0 = time.perf_counter()
+    score_columns(**arrays)
+    array_s = time.perf_counter() - t0
+
+    assert scores.tolist() == [s for s, _ in scalar], "scores differ from score_record"
+    assert risks.tolist() == [r for _, r in scalar], "risk levels differ from score_record"
+    print(f"{n} rows: scalar loop {scalar_s * 1000:8.1f} ms   numpy from lists {vector_s * 1000:6.2f} ms   "
+          f"numpy on arrays {array_s * 1000:6.2f} ms   (all rows identical)")
+
+    client = TestClient(app)
+    sample = np.random.default_rng(1).choice(n, 200, replace=False)
+    t0 = time.perf_counter()
+    for i in sample.tolist():
+        land, defaults, years, kyc = rows[i]
+        single = client.post("/credit-score", json={
+            "land_size_acres": land, "past_defaults": defaults, "yield_history_years": years, "kyc_status": kyc,
+        }).json()
+        assert (single["score"], single["risk_level"]) == (scores[i], risks[i]), f"row {i} differs from /credit-score"
+    single_s = (time.perf_counter() - t0) / len(sample)
+    print(f"{len(sample)} sampled rows match /credit-score ({single_s * 1000:.2f} ms per call in-process)")
+
+    t0 = time.perf_counter()
+    response = client.post("/credit-score/bulk", json=cols)
+    json_s = time.perf_counter() - t0
+    assert response.json()["scores"] == scores.tolist()
+
+    csv = io.StringIO()
+    csv.write("member_id,land_size_acres,past_defaults,yield_history_years,kyc_status\n")
+    for i, (land, defaults, years, kyc) in enumerate(rows):
+        csv.write(f"M{i},{land!r},{defaults},{years},{'true' if kyc else 'false'}\n")
+    t0 = time.perf_counter()
+    response = client.post("/credit-score/bulk/file", files={"file": ("fpo.csv", csv.getvalue().encode(), "text/csv")})
+    csv_s = time.perf_counter() - t0
+    assert response.json()["scores"] == scores.tolist()
+
+    print(f"/credit-score/bulk JSON {json_s * 1000:8.1f} ms   CSV upload {csv_s * 1000:8.1f} ms   "
+          f"vs ~{single_s * n:.1f} s for {n} single-record calls")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
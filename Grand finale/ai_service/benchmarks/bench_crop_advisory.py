@@ -0,0 +1,117 @@
+"""
+Crop advisories from the gridded forecast: per-farm lookups vs one
+fancy-indexing pass over an FPO's farm list, /crop-advisory/batch over
+HTTP, and publishing a new run while requests are being served.
+
+Uses a synthetic 0.05 deg all-India run (640 x 600 tiles x 16 days) in a
+temporary grid directory.
+
+Run from ai_service/: python benchmarks/bench_crop_advisory.py [farms]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Spawned pool workers re-import this module; they inherit the parent's directory
+GRID = tempfile.mkdtemp(prefix="weather_grid_") if __name__ == "__main__" else os.environ["BIOMETRIX_WEATHER_GRID"]
+os.environ["BIOMETRIX_WEATHER_GRID"] = GRID
+os.environ["BIOMETRIX_WEATHER_GRID_CHECK_S"] = "0.2"
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+import numpy as np  # noqa: E402
+
+import weather_grid  # noqa: E402
+
+
+def _farms(n, rng, start):
+    # FPO farms cluster: a few villages, a few km apart
+    centre = rng.uniform([18, 72], [28, 86], (max(1, n // 500), 2))[rng.integers(0, max(1, n // 500), n)]
+    points = centre + rng.normal(0, 0.05, (n, 2))
+    dates = np.datetime64(start, "D") + rng.integers(0, 10, n)
+    return points[:, 0], points[:, 1], dates
+
+
+def _timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(n_farms=10_000):
+    start = date.today()
+    t0 = time.perf_counter()
+    weather_grid.publish_run(*weather_grid.synthetic_run(start, tile=0.05, seed=0), GRID)
+    grid = weather_grid.get_weather_grid(GRID)
+    print(f"run {grid.run}: {grid.days} days x {grid.n_lat} x {grid.n_lon} tiles "
+          f"published and mapped in {time.perf_counter() - t0:.2f} s")
+
+    lats, lons, dates = _farms(n_farms, np.random.default_rng(0), start)
+    batch_s, window = _timed(lambda: weather_grid.risk_codes(grid.harvest_window(lats, lons, dates)))
+    print(f"{n_farms} farms")
+    print(f"  one pass             {batch_s * 1000:8.1f} ms  ({n_farms / batch_s / 1e6:.2f}M farms/s)")
+
+    def one_by_one():
+        return np.concatenate([weather_grid.risk_codes(grid.harvest_window(lats[i:i + 1], lons[i:i + 1], dates[i:i + 1]))
+                               for i in range(n_farms)])
+
+    single_s, singles = _timed(one_by_one, repeat=1)
+    assert (singles == window).all()
+    print(f"  farm by farm         {single_s * 1000:8.1f} ms  ({single_s / n_farms * 1e6:.0f} us per farm)")
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    body = {"farm_ids": [f"F{i}" for i in range(n_farms)], "lat": lats.tolist(), "lon": lons.tolist(),
+            "harvest_date": np.datetime_as_string(dates).tolist()}
+    with TestClient(app) as client:
+        http_s, response = _timed(lambda: client.post("/crop-advisory/batch", json=body))
+        assert response.status_code == 200, response.text
+        print(f"POST /crop-advisory/batch {http_s * 1000:5.1f} ms  ({len(response.content) / 1e3:.0f} kB) "
+              f"{response.json()['risk_counts']}")
+
+        one = {"lat": float(lats[0]), "lon": float(lons[0]), "harvest_date": str(dates[0])}
+        n_single = 500
+        single_http_s, _ = _timed(lambda: [client.post("/crop-advisory", json=one) for _ in range(n_single)], repeat=1)
+        print(f"POST /crop-advisory    {single_http_s / n_single * 1000:8.2f} ms per request")
+
+        # Hot swap: publish a new run while requests keep coming; none may fail
+        seen, errors, stop = set(), [], threading.Event()
+
+        def serve():
+            while not stop.is_set():
+                r = client.post("/crop-advisory/batch", json={k: v[:1000] for k, v in body.items()})
+                if r.status_code != 200:
+                    errors.append(r.status_code)
+                else:
+                    seen.add(r.json()["forecast_run"])
+
+        worker = threading.Thread(target=serve)
+        worker.start()
+        time.sleep(0.5)
+        new_run = os.path.basename(weather_grid.publish_run(
+            *weather_grid.synthetic_run(start, tile=0.05, seed=1), GRID, keep=1))
+        t0 = time.perf_counter()
+        while new_run not in seen and time.perf_counter() - t0 < 10:
+            time.sleep(0.01)
+        swap_s = time.perf_counter() - t0
+        stop.set()
+        worker.join()
+        print(f"hot swap to {new_run}: served after {swap_s * 1000:.0f} ms "
+              f"(check interval {weather_grid.CHECK_S} s); runs seen {sorted(seen)}, {len(errors)} errors")
+
+
+if __name__ == "__main__":
+    try:
+        main(*(int(arg) for arg in sys.argv[1:2]))
+    finally:
+        shutil.rmtree(GRID, ignore_errors=True)
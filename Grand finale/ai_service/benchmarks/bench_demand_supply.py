@@ -0,0 +1,80 @@
+"""
+/demand-supply rollups: full build vs incremental refresh vs per-request rescan.
+
+Ingests synthetic Agmarknet dumps (see bench_ingest.py) into a temp price
+store, builds the monthly rollups, then lands one more dump and times the
+incremental refresh against a rebuild. Query latency is compared with
+rescanning the store's partitions for every request.
+
+Run from ai_service/: python benchmarks/bench_demand_supply.py [files] [rows_per_file]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from bench_ingest import write_csv  # noqa: E402
+from ingest import PriceStore, ingest  # noqa: E402
+from market_rollups import MarketRollups, discover  # noqa: E402
+
+
+def _rescan(store_dir, crop):
+    """What a request costs without rollups: read every partition of the crop and aggregate by month."""
+    records = PriceStore(store_dir).read(crop)
+    months = records["date"].astype("datetime64[M]").astype(np.int64)
+    months -= months.min()
+    price = np.bincount(months, weights=records["modal_price"]) / np.maximum(np.bincount(months), 1)
+    arrivals = np.bincount(months, weights=np.nan_to_num(records["arrivals"]))
+    return price, arrivals
+
+
+def main(n_files=8, rows_per_file=250_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        dumps, store_dir = os.path.join(tmp, "dumps"), os.path.join(tmp, "store")
+        os.makedirs(dumps)
+        for i in range(n_files):
+            write_csv(os.path.join(dumps, f"dump-{i:02d}.csv"), rows_per_file, seed=i)
+        ingest(dumps, store_dir)
+        trade_dir = os.path.join(tmp, "trade")       # empty: prices and arrivals only
+
+        def partitions():
+            return discover(store_dir, trade_dir=trade_dir)
+
+        rollups = MarketRollups()
+        t0 = time.perf_counter()
+        rollups.refresh(partitions(), store_dir)
+        view = rollups.view()
+        build_s = time.perf_counter() - t0
+        print(f"{n_files * rows_per_file:,} records in {len(partitions())} partitions: "
+              f"full build {build_s * 1000:.0f} ms ({rollups.sums.nbytes / 1e3:.0f} kB of sums)")
+
+        write_csv(os.path.join(dumps, f"dump-{n_files:02d}.csv"), rows_per_file, seed=n_files)
+        ingest(dumps, store_dir)
+        t0 = time.perf_counter()
+        folded = rollups.refresh(partitions(), store_dir)
+        view = rollups.view()
+        incremental_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        MarketRollups().refresh(partitions(), store_dir)
+        rebuild_s = time.perf_counter() - t0
+        print(f"new dump landed: incremental refresh {incremental_s * 1000:.0f} ms ({folded} partitions read) "
+              f"vs rebuild {rebuild_s * 1000:.0f} ms")
+
+        n = 2000
+        t0 = time.perf_counter()
+        for _ in range(n):
+            view.query("soybean", "madhya pradesh")
+        query_us = (time.perf_counter() - t0) / n * 1e6
+        t0 = time.perf_counter()
+        for _ in range(10):
+            _rescan(store_dir, "soybean")
+        rescan_ms = (time.perf_counter() - t0) / 10 * 1000
+        print(f"per request: rollup query {query_us:.1f} us vs rescanning the crop's partitions {rescan_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,123 @@
+"""
+Tail latency of light requests under mixed load, per execution model.
+
+Heavy /optimize-route solves (N farmers, fixed improvement budget) run at a
+steady concurrency while light /logistics/predict calls are fired alongside
+at a fixed rate, all in-process through the ASGI transport. The same solve is served
+three ways:
+
+* inline   - an `async def` handler calling solve_route on the event loop
+             (how CPU-bound async endpoints behaved before the executor lanes)
+* sync-def - a plain `def` handler on Starlette's thread pool
+* cpu-lane - the real /optimize-route, on executors.run_cpu
+
+Solves stop at their time budget, so heavy throughput mostly reflects how
+many solves overlap (the CPU lane caps that at BIOMETRIX_PROCESS_WORKERS);
+the light-request columns are the point of the comparison.
+
+Run from ai_service/: python benchmarks/bench_executors.py [farmers] [heavy requests]
+BIOMETRIX_CPU_EXECUTOR=thread measures the thread-backed CPU lane instead.
+"""
+import asyncio
+import os
+import sys
+
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from loadgen import RequestSpec, percentile, run_load  # noqa: E402
+
+HEAVY_CONCURRENCY = 4
+LIGHT_RATE_HZ = 200
+BUDGET_MS = 100.0
+
+
+def _add_baseline_routes(app):
+    from routers.logistics import RouteRequest, _coordinates
+    from routing import solve_route
+
+    def solve(request: RouteRequest):
+        lats, lons = _coordinates([request.warehouse] + request.farmers)
+        return {"total_distance_km": solve_route(lats, lons, request.time_budget_ms / 1000).distance_km}
+
+    @app.post("/bench/optimize-route-inline")
+    async def inline(request: RouteRequest):
+        return solve(request)
+
+    @app.post("/bench/optimize-route-sync")
+    def sync_def(request: RouteRequest):
+        return solve(request)
+
+
+async def _light_probes(app, stop: asyncio.Future, rate_hz: float):
+    """
+    Open-loop probes: request i is due at start + i / rate_hz, and its latency
+    is measured from that due time, so stalls of the shared event loop (which
+    also delay the client side of an in-process test) are counted.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    latencies, tasks = [], []
+    body = {"distance_km": 120.0, "weight_tons": 4.0}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def probe(due):
+            response = await client.post("/logistics/predict", json=body)
+            response.raise_for_status()
+            latencies.append((loop.time() - due) * 1000)
+
+        start, i = loop.time(), 0
+        while not stop.done():
+            due = start + i / rate_hz
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            tasks.append(asyncio.ensure_future(probe(due)))
+            i += 1
+        await asyncio.gather(*tasks)
+    return sorted(latencies)
+
+
+async def _mixed(app, heavy_path, body, heavy_requests):
+    heavy = asyncio.ensure_future(run_load(
+        app, lambda i: RequestSpec("POST", heavy_path, json=body), heavy_requests, HEAVY_CONCURRENCY))
+    light = await _light_probes(app, heavy, LIGHT_RATE_HZ)
+    return heavy.result(), light
+
+
+def main(n_farmers=200, heavy_requests=24):
+    import executors
+    from main import app
+
+    _add_baseline_routes(app)
+    rng = np.random.default_rng(0)
+    body = {
+        "warehouse": {"id": "W", "lat": 22.7, "lon": 75.9},
+        "farmers": [{"id": f"F{i}", "lat": float(lat), "lon": float(lon)}
+                    for i, (lat, lon) in enumerate(zip(rng.uniform(21, 24, n_farmers), rng.uniform(74, 78, n_farmers)))],
+        "time_budget_ms": BUDGET_MS,
+    }
+    modes = {
+        "inline": "/bench/optimize-route-inline",
+        "sync-def": "/bench/optimize-route-sync",
+        f"cpu-lane ({executors.CPU_EXECUTOR})": "/optimize-route",
+    }
+    print(f"{heavy_requests} x /optimize-route[{n_farmers}] at c={HEAVY_CONCURRENCY} "
+          f"+ /logistics/predict at {LIGHT_RATE_HZ}/s, {os.cpu_count()} CPU(s)")
+    print(f"{'mode':22s} {'heavy req/s':>11s} {'heavy p99':>10s} {'light n':>8s} "
+          f"{'light p50':>10s} {'light p99':>10s} {'light max':>10s}")
+    try:
+        for mode, path in modes.items():
+            asyncio.run(run_load(app, lambda i: RequestSpec("POST", path, json=body), 2, 2))   # warm-up
+            heavy, light = asyncio.run(_mixed(app, path, body, heavy_requests))
+            print(f"{mode:22s} {heavy.throughput_rps:11.1f} {heavy.p99_ms:8.1f}ms {len(light):8d} "
+                  f"{percentile(light, 0.5):8.2f}ms {percentile(light, 0.99):8.2f}ms "
+                  f"{light[-1] if light else 0:8.2f}ms")
+    finally:
+        executors.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
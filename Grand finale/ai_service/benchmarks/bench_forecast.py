@@ -0,0 +1,59 @@
+"""
+/forecast-price latency: p50/p99 for cold (refit) and warm (cached) requests.
+
+Run from ai_service/: python benchmarks/bench_forecast.py [iterations]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+from price_forecast import price_forecaster  # noqa: E402
+
+CROPS = ["soybean", "groundnut", "mustard", "sunflower", "sesame (til)", "castor", "safflower", "niger", "linseed"]
+
+
+def _report(label, samples):
+    ms = np.array(samples) * 1000
+    print(f"{label:18s} n={len(ms):5d}  p50 {np.percentile(ms, 50):8.3f} ms  p99 {np.percentile(ms, 99):8.3f} ms")
+
+
+def main(iterations=200):
+    price_forecaster.history  # load the CSV once; only fitting is measured
+    today = date.today()
+    cold, warm = [], []
+    for i in range(iterations):
+        crop = CROPS[i % len(CROPS)]
+        price_forecaster.models.clear()
+        t0 = time.perf_counter()
+        price_forecaster.forecast(crop, "Madhya Pradesh", today)
+        cold.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        price_forecaster.forecast(crop, "Madhya Pradesh", today)
+        warm.append(time.perf_counter() - t0)
+    _report("engine cold", cold)
+    _report("engine warm", warm)
+
+    client = TestClient(app)
+    http_cold, http_warm = [], []
+    for i in range(iterations):
+        body = {"crop": CROPS[i % len(CROPS)], "region": "Rajasthan"}
+        price_forecaster.models.clear()
+        t0 = time.perf_counter()
+        client.post("/forecast-price", json=body)
+        http_cold.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        client.post("/forecast-price", json=body)
+        http_warm.append(time.perf_counter() - t0)
+    _report("http cold", http_cold)
+    _report("http warm", http_warm)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,60 @@
+"""
+Batch forecast scaling: model fits per second vs process-pool size.
+
+Fits the sample history's series repeatedly (cache bypassed) on pools of
+1, 2, 4, ... up to the core count and reports speed-up and parallel
+efficiency, then times one streamed /forecast-price/batch call end to end.
+Run from ai_service/: python benchmarks/bench_forecast_batch.py [fits]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from crops import BASE_PRICES  # noqa: E402
+from main import app  # noqa: E402
+from price_forecast import fit_series, price_forecaster  # noqa: E402
+
+
+def _fit(args):
+    return fit_series(*args)
+
+
+def main(fits=360):
+    series = list(price_forecaster.history.values())
+    jobs = [series[i % len(series)] for i in range(fits)]
+    cores = os.cpu_count() or 1
+    sizes = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+
+    baseline = None
+    for workers in sizes:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_fit, jobs[:workers]))  # spawn and import before timing
+            t0 = time.perf_counter()
+            list(pool.map(_fit, jobs, chunksize=max(1, fits // (workers * 8))))
+            elapsed = time.perf_counter() - t0
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        print(f"workers={workers:2d}: {fits / elapsed:8.1f} fits/s  speed-up {speedup:5.2f}x  efficiency {speedup / workers:5.1%}")
+
+    client = TestClient(app)
+    price_forecaster.models.clear()
+    body = {"crops": list(BASE_PRICES), "regions": ["All India", "Madhya Pradesh", "Rajasthan", "Gujarat", "Maharashtra"],
+            "horizons_weeks": [4, 13, 26]}
+    t0 = time.perf_counter()
+    first = None
+    with client.stream("POST", "/forecast-price/batch", json=body) as response:
+        n = 0
+        for _ in response.iter_lines():
+            first = first or time.perf_counter() - t0
+            n += 1
+    print(f"batch endpoint: {n} rows, first row {first * 1000:.1f} ms, total {(time.perf_counter() - t0) * 1000:.1f} ms (cold cache)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 360)
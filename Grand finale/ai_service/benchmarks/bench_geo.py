@@ -0,0 +1,60 @@
+"""
+Haversine microbenchmarks: scalar `math` loop vs the vectorized geo kernel.
+
+Covers point-to-point pairs, one-to-many and many-to-many at 10, 1k and 10k
+points (many-to-many at 10k uses 1k destinations to stay within memory).
+Run from ai_service/: python benchmarks/bench_geo.py
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import geo  # noqa: E402
+
+
+def scalar_haversine(lat1, lon1, lat2, lon2):
+    # The formula previously inlined in calculate_distance / calculate_eta
+    R = 6371
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2) * math.sin(dlat/2) + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
+        math.sin(dlon/2) * math.sin(dlon/2)
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for n in (10, 1_000, 10_000):
+        lats1, lons1 = rng.uniform(8, 35, n), rng.uniform(68, 97, n)
+        lats2, lons2 = rng.uniform(8, 35, n), rng.uniform(68, 97, n)
+        pairs = list(zip(lats1.tolist(), lons1.tolist(), lats2.tolist(), lons2.tolist()))
+
+        scalar = _best_of(lambda: [scalar_haversine(*p) for p in pairs])
+        vector = _best_of(lambda: geo.haversine_km(lats1, lons1, lats2, lons2))
+        print(f"pairwise     n={n:6d}: scalar {scalar * 1e3:9.3f} ms | numpy {vector * 1e3:9.3f} ms | {scalar / vector:7.1f}x")
+
+        one = _best_of(lambda: geo.one_to_many(lats1[0], lons1[0], lats2, lons2))
+        print(f"one-to-many  n={n:6d}: numpy {one * 1e3:9.3f} ms")
+
+        m = min(n, 1_000)
+        many = _best_of(lambda: geo.many_to_many(lats1, lons1, lats2[:m], lons2[:m]), repeat=3)
+        print(f"many-to-many {n:6d}x{m:<6d}: numpy {many * 1e3:9.3f} ms ({n * m / many / 1e6:.1f} M cells/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Ingestion throughput (rows/s) for Agmarknet-style CSV and HTML dumps.
+
+Writes synthetic dumps to a temp dir, ingests them into a fresh store, then
+re-runs to show that unchanged files are skipped and one new file is picked up.
+Run from ai_service/: python benchmarks/bench_ingest.py [rows_per_file]
+"""
+import csv
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from ingest import PriceStore, ingest  # noqa: E402
+
+COMMODITIES = ["Soyabean", "Groundnut", "Mustard", "Sesamum(Sesame,Gingelly,Til)", "Castor Seed", "Sunflower"]
+STATES = ["Madhya Pradesh", "Rajasthan", "Gujarat", "Maharashtra"]
+HEADER = ["Sl no.", "State Name", "District Name", "Market Name", "Commodity", "Variety", "Grade",
+          "Min Price (Rs./Quintal)", "Max Price (Rs./Quintal)", "Modal Price (Rs./Quintal)", "Price Date"]
+
+
+def _rows(n, seed):
+    rng = np.random.default_rng(seed)
+    start = date(2023, 1, 1)
+    for i in range(n):
+        modal = int(rng.uniform(4000, 12000))
+        state = STATES[i % len(STATES)]
+        yield [str(i + 1), state, "District", f"Market {i % 50}", COMMODITIES[i % len(COMMODITIES)], "Other", "FAQ",
+               str(modal - 200), str(modal + 200), str(modal),
+               (start + timedelta(days=int(rng.integers(0, 900)))).strftime("%d %b %Y")]
+
+
+def write_csv(path, n, seed):
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(HEADER)
+        writer.writerows(_rows(n, seed))
+
+
+def write_html(path, n, seed):
+    with open(path, "w") as fh:
+        fh.write("<html><body><table><tr>" + "".join(f"<th>{h}</th>" for h in HEADER) + "</tr>\n")
+        for row in _rows(n, seed):
+            fh.write("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>\n")
+        fh.write("</table></body></html>")
+
+
+def main(rows_per_file=100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        dumps, store = os.path.join(tmp, "dumps"), os.path.join(tmp, "store")
+        os.makedirs(dumps)
+        write_csv(os.path.join(dumps, "report_1.csv"), rows_per_file, 1)
+        write_html(os.path.join(dumps, "report_2.xls"), rows_per_file, 2)
+
+        stats = ingest(dumps, store)
+        print(f"full run       : {stats.files_ingested}/{stats.files_seen} files {stats.rows:8d} rows "
+              f"{stats.seconds:6.2f} s  {stats.rows_per_sec:10,.0f} rows/s")
+
+        stats = ingest(dumps, store)
+        print(f"re-run         : {stats.files_ingested}/{stats.files_seen} files {stats.rows:8d} rows {stats.seconds:6.3f} s")
+
+        write_csv(os.path.join(dumps, "report_3.csv"), rows_per_file // 10, 3)
+        stats = ingest(dumps, store)
+        print(f"one new file   : {stats.files_ingested}/{stats.files_seen} files {stats.rows:8d} rows "
+              f"{stats.seconds:6.2f} s  {stats.rows_per_sec:10,.0f} rows/s")
+
+        price_store = PriceStore(store)
+        print("crops:", {crop: len(price_store.read(crop)) for crop in price_store.crops()})
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
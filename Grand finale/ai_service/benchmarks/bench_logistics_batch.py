@@ -0,0 +1,45 @@
+"""
+Throughput benchmark: N single /logistics/predict calls vs one batch call.
+
+Measures both the raw model API (predict vs predict_many) and the HTTP
+endpoints through the in-process ASGI test client.
+Run from ai_service/: python benchmarks/bench_logistics_batch.py [N]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from logistics_ann import get_logistics_ann  # noqa: E402
+from main import app  # noqa: E402
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main(n=500):
+    rng = np.random.default_rng(7)
+    distances = rng.uniform(10, 1500, n)
+    weights = rng.uniform(0.5, 20, n)
+    model = get_logistics_ann()
+
+    single = _timed(lambda: [model.predict(d, w) for d, w in zip(distances, weights)])
+    batch = _timed(lambda: model.predict_many(distances, weights))
+    print(f"model  N={n}: single {n / single:12.0f} rows/s | batch {n / batch:12.0f} rows/s | {single / batch:6.1f}x")
+
+    client = TestClient(app)
+    rows = [{"distance_km": float(d), "weight_tons": float(w)} for d, w in zip(distances, weights)]
+    single = _timed(lambda: [client.post("/logistics/predict", json=r) for r in rows])
+    batch = _timed(lambda: client.post("/logistics/predict/batch", json={"items": rows}))
+    print(f"http   N={n}: single {n / single:12.0f} rows/s | batch {n / batch:12.0f} rows/s | {single / batch:6.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
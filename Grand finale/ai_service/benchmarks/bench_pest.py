@@ -0,0 +1,92 @@
+"""
+/pest-detect throughput: per-stage cost and micro-batching vs one image per call.
+
+Encodes synthetic leaves as 640x480 JPEGs, times decode / features / model per
+image, then fires concurrent uploads at the app in-process (httpx ASGI
+transport) with batching disabled (window 0, batch 1) and enabled.
+Run from ai_service/: python benchmarks/bench_pest.py [uploads] [concurrency]
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import pest_model  # noqa: E402
+from batching import MicroBatcher  # noqa: E402
+from executors import get_inference_pool  # noqa: E402
+from main import app  # noqa: E402
+from routers import pest  # noqa: E402
+
+
+def _uploads(n):
+    rng = np.random.default_rng(0)
+    uploads = []
+    for i in range(n):
+        buf = io.BytesIO()
+        leaf = pest_model.render_leaf(i % len(pest_model.LABELS), rng)
+        Image.fromarray(leaf).resize((640, 480), Image.BICUBIC).save(buf, "JPEG", quality=85)
+        uploads.append(buf.getvalue())
+    return uploads
+
+
+def bench_stages(uploads):
+    model = pest_model.get_pest_classifier()
+    buffer = np.empty((pest_model.MAX_BATCH, pest_model.IMAGE_SIZE, pest_model.IMAGE_SIZE, 3), dtype=np.float32)
+    n = min(len(uploads), pest_model.MAX_BATCH)
+    t0 = time.perf_counter()
+    for i in range(n):
+        pest_model.decode_into(uploads[i], buffer[i])
+    t1 = time.perf_counter()
+    features = pest_model.extract_features(buffer[:n])
+    t2 = time.perf_counter()
+    model.predict_proba(features)
+    t3 = time.perf_counter()
+    print(f"per image: decode {(t1 - t0) / n * 1000:.3f} ms  features {(t2 - t1) / n * 1000:.3f} ms  "
+          f"model {(t3 - t2) / n * 1000:.4f} ms  (batch of {n})")
+
+
+async def _load(uploads, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = list(reversed(uploads))
+        latencies = []
+
+        async def worker():
+            while queue:
+                data = queue.pop()
+                t0 = time.perf_counter()
+                response = await client.post("/pest-detect", files={"file": ("leaf.jpg", data, "image/jpeg")})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - t0, np.array(latencies) * 1000
+
+
+def bench_endpoint(uploads, concurrency):
+    for label, max_batch, window_ms in (("unbatched", 1, 0.0), ("micro-batched", pest_model.MAX_BATCH, pest.BATCH_WINDOW_MS)):
+        pest._batcher = MicroBatcher(pest_model.classify_batch, max_batch=max_batch, max_wait_ms=window_ms,
+                                     max_pending=len(uploads), executor=get_inference_pool)
+        asyncio.run(_load(uploads[:concurrency], concurrency))  # warm up
+        elapsed, ms = asyncio.run(_load(uploads, concurrency))
+        batcher = pest._batcher
+        print(f"{label:14s} {len(uploads) / elapsed:8.1f} img/s  p50 {np.percentile(ms, 50):7.1f} ms  "
+              f"p99 {np.percentile(ms, 99):7.1f} ms  mean batch {batcher.items / max(batcher.batches, 1):5.1f}")
+
+
+def main(n=512, concurrency=32):
+    uploads = _uploads(n)
+    bench_stages(uploads)
+    bench_endpoint(uploads, concurrency)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
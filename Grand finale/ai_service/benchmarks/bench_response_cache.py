@@ -0,0 +1,56 @@
+"""
+Response cache: per-call latency of cache misses (distinct requests) vs hits
+(repeated request) and 304 revalidations on the deterministic endpoints.
+
+Run from ai_service/: python benchmarks/bench_response_cache.py [calls]
+Set BIOMETRIX_RESPONSE_CACHE_DB=/tmp/cache.db to include the SQLite tier.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main as service  # noqa: E402
+
+ENDPOINTS = {
+    "/predict/yield": lambda i: {"crop": "Soybean", "acreage": 1 + i / 1000, "state": "MP",
+                                 "rainfall_mm": 900, "soil_nitrogen": 50},
+    "/recommend/soil": lambda i: {"soil_type": "Black", "nitrogen": 200 + i / 1000, "phosphorus": 20,
+                                  "potassium": 200, "ph_level": 7},
+    "/credit-score": lambda i: {"land_size_acres": 1 + i / 1000, "past_defaults": 0,
+                                "yield_history_years": 3, "kyc_status": True},
+    "/logistics/predict": lambda i: {"distance_km": 10 + i / 1000, "weight_tons": 5},
+}
+
+
+def _per_call_ms(client, path, bodies, headers=None):
+    t0 = time.perf_counter()
+    for body in bodies:
+        response = client.post(path, json=body, headers=headers)
+    return (time.perf_counter() - t0) / len(bodies) * 1000, response
+
+
+def main(calls=500):
+    cache = service.response_cache_store
+    if cache is None:
+        sys.exit("Response cache is disabled (BIOMETRIX_RESPONSE_CACHE=0)")
+    client = TestClient(service.app)
+    print(f"{'endpoint':20s} {'miss ms':>9s} {'hit ms':>9s} {'304 ms':>9s}")
+    for path, make in ENDPOINTS.items():
+        client.post(path, json=make(-1))     # warm imports/models
+        cache.clear()
+        miss_ms, _ = _per_call_ms(client, path, [make(i) for i in range(calls)])
+        hit_ms, response = _per_call_ms(client, path, [make(0)] * calls)
+        assert response.headers["x-cache"] == "HIT"
+        etag = {"If-None-Match": response.headers["etag"]}
+        not_modified_ms, response = _per_call_ms(client, path, [make(0)] * calls, headers=etag)
+        assert response.status_code == 304
+        print(f"{path:20s} {miss_ms:9.3f} {hit_ms:9.3f} {not_modified_ms:9.3f}")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,128 @@
+"""
+Road-network ETA engine on a state-sized graph.
+
+Builds a synthetic ~500k-node network (road_graph.synthetic_network, about
+the node count of a state's OSM roads after preprocessing) into a temp
+directory, then measures build and load time, snapping, point-to-point
+queries/sec for bidirectional ALT vs plain bidirectional Dijkstra (checked
+against SciPy's Dijkstra), matrix builds for /optimize-route and
+/logistics/eta over HTTP.
+
+Run from ai_service/: python benchmarks/bench_road_eta.py [nodes] [queries]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GRAPH_DIR = os.path.join(tempfile.gettempdir(), "biometrix-bench-road-graph")
+os.environ["BIOMETRIX_ROAD_GRAPH"] = GRAPH_DIR
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+import numpy as np  # noqa: E402
+
+import road_graph  # noqa: E402
+from road_graph import RoadGraph, build_graph, save_graph, synthetic_network  # noqa: E402
+
+
+def _build(n_nodes):
+    t0 = time.perf_counter()
+    network = synthetic_network(n_nodes)
+    arrays, meta = build_graph(*network)
+    save_graph(arrays, meta, GRAPH_DIR)
+    print(f"built {meta['nodes']} nodes / {meta['edges']} edges in {time.perf_counter() - t0:.1f} s, "
+          f"{sum(a.nbytes for a in arrays.values()) / 1e6:.1f} MB on disk")
+
+
+def _pairs(graph, n, rng, max_km=None):
+    pairs = []
+    while len(pairs) < n:
+        s, t = rng.integers(graph.n_nodes, size=2)
+        if max_km is None or road_graph.haversine_km(graph.node_lat[s], graph.node_lon[s],
+                                                     graph.node_lat[t], graph.node_lon[t]) <= max_km:
+            pairs.append((int(s), int(t)))
+    return pairs
+
+
+def _queries(graph, name, pairs, use_landmarks, reference=None):
+    settled, worst = 0, 0.0
+    t0 = time.perf_counter()
+    results = [graph.shortest(s, t, use_landmarks) for s, t in pairs]
+    elapsed = time.perf_counter() - t0
+    for (time_s, _, n), ref in zip(results, reference or [None] * len(results)):
+        settled += n
+        if ref is not None:
+            worst = max(worst, abs(time_s - ref))
+    check = f"  max |err| {worst:.3f} s" if reference else ""
+    print(f"  {name:34s} {len(pairs) / elapsed:8.1f} q/s  {elapsed / len(pairs) * 1000:7.2f} ms/q  "
+          f"{settled / len(pairs):9.0f} settled/q{check}")
+    return [r[0] for r in results]
+
+
+def _reference(graph, pairs):
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+
+    m = graph.n_nodes
+    forward = csr_matrix((graph.fwd_time.astype(np.float64), graph.fwd_head, graph.fwd_indptr), shape=(m, m))
+    return [float(dijkstra(forward, indices=s)[t]) for s, t in pairs]
+
+
+def main(n_nodes=500_000, n_queries=200):
+    _build(n_nodes)
+    t0 = time.perf_counter()
+    graph = RoadGraph.load(GRAPH_DIR)
+    print(f"load (mmap) {(time.perf_counter() - t0) * 1000:.1f} ms")
+    rng = np.random.default_rng(0)
+    lat0, lon0 = float(graph.node_lat.min()), float(graph.node_lon.min())
+    lat1, lon1 = float(graph.node_lat.max()), float(graph.node_lon.max())
+
+    points = np.column_stack((rng.uniform(lat0, lat1, 2000), rng.uniform(lon0, lon1, 2000)))
+    t0 = time.perf_counter()
+    for lat, lon in points.tolist():
+        graph.snap(lat, lon)
+    print(f"snap {len(points) / (time.perf_counter() - t0):,.0f} points/s")
+
+    print(f"point-to-point ({n_queries} queries each):")
+    state = _pairs(graph, n_queries, rng)
+    local = _pairs(graph, n_queries, rng, max_km=60)
+    checked = _reference(graph, state[:10])
+    _queries(graph, "state-wide, bidirectional ALT", state, True, checked + [None] * (len(state) - 10))
+    _queries(graph, "state-wide, bidirectional Dijkstra", state[: max(1, n_queries // 10)], False)
+    _queries(graph, "<= 60 km, bidirectional ALT", local, True)
+    _queries(graph, "<= 60 km, bidirectional Dijkstra", local, False)
+
+    print("matrices (SciPy Dijkstra over the stops' window):")
+    graph.cost_matrix([23.0], [77.0], [23.1], [77.1])   # SciPy import
+    for n, span in ((1, 0.5), (50, 0.4), (200, 0.6)):
+        lats, lons = 23 + rng.uniform(0, span, n), 77 + rng.uniform(0, span, n)
+        dest_lats, dest_lons = 23 + rng.uniform(0, span, 500), 77 + rng.uniform(0, span, 500)
+        if n > 1:
+            dest_lats, dest_lons = lats, lons
+        t0 = time.perf_counter()
+        matrix = graph.cost_matrix(lats, lons, dest_lats, dest_lons, weight="length")
+        print(f"  {n:4d} x {len(dest_lats):4d} road km   {(time.perf_counter() - t0) * 1000:8.1f} ms  "
+              f"(mean {matrix.mean():.1f} km)")
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    body = {"origin_lat": 23.2, "origin_lon": 77.4, "dest_lat": 22.7, "dest_lon": 75.9}
+    with TestClient(app) as client:
+        assert client.post("/logistics/eta", json=body).json()["source"] == "road_graph"
+        n = max(10, n_queries // 4)
+        t0 = time.perf_counter()
+        for lat, lon in points[:n].tolist():
+            client.post("/logistics/eta", json=dict(body, dest_lat=lat, dest_lon=lon))
+        elapsed = time.perf_counter() - t0
+        print(f"POST /logistics/eta (CPU lane)  {n / elapsed:8.1f} req/s  {elapsed / n * 1000:7.2f} ms/req")
+    shutil.rmtree(GRAPH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,62 @@
+"""
+/optimize-route benchmark: legacy scalar nearest-neighbour loop vs routing.py.
+
+Reports solve time and tour length at growing farmer counts.
+Run from ai_service/: python benchmarks/bench_route.py [n ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import sklearn.neighbors  # noqa: E402,F401  (routing imports BallTree lazily; keep it out of the timings)
+
+from bench_geo import scalar_haversine  # noqa: E402
+from routers.logistics import Location  # noqa: E402
+from routing import solve_route  # noqa: E402
+
+
+def calculate_distance(loc1, loc2):
+    return scalar_haversine(loc1.lat, loc1.lon, loc2.lat, loc2.lon)
+
+
+def legacy_route(warehouse, farmers):
+    # The original O(n^2) pure-Python loop from the old main.optimize_route
+    unvisited = farmers.copy()
+    total, current = 0.0, warehouse
+    while unvisited:
+        nearest, min_dist = None, float("inf")
+        for farmer in unvisited:
+            dist = calculate_distance(current, farmer)
+            if dist < min_dist:
+                min_dist, nearest = dist, farmer
+        total += min_dist
+        current = nearest
+        unvisited.remove(nearest)
+    return total + calculate_distance(current, warehouse)
+
+
+def main(sizes):
+    rng = np.random.default_rng(42)
+    for n in sizes:
+        lats = np.concatenate(([21.15], rng.uniform(20.5, 21.8, n)))
+        lons = np.concatenate(([79.09], rng.uniform(78.4, 79.8, n)))
+        warehouse = Location(id="W", lat=lats[0], lon=lons[0])
+        farmers = [Location(id=f"F{i}", lat=lats[i], lon=lons[i]) for i in range(1, n + 1)]
+
+        t0 = time.perf_counter()
+        legacy_km = legacy_route(warehouse, farmers)
+        legacy_s = time.perf_counter() - t0
+
+        sol = solve_route(lats, lons, time_budget_s=1.0)
+        print(
+            f"n={n:5d} legacy {legacy_s * 1000:9.1f} ms {legacy_km:9.1f} km | "
+            f"greedy {sol.greedy_distance_km:9.1f} km | improved {sol.distance_km:9.1f} km "
+            f"(-{sol.improvement_pct:4.1f}%) in {sol.solve_time_s * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 500, 2000])
@@ -0,0 +1,84 @@
+"""
+Sell-vs-hold Monte Carlo: the FPO batch (lots x paths x weeks in chunked
+float32 blocks, one path set per price series) vs evaluating lot by lot,
+and /sell-hold/batch over HTTP.
+
+Run from ai_service/: python benchmarks/bench_sell_hold.py [lots] [paths] [weeks]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+import numpy as np  # noqa: E402
+
+import sell_hold  # noqa: E402
+from price_forecast import price_forecaster  # noqa: E402
+
+CROPS = ["Soybean", "Groundnut", "Mustard", "Sunflower"]
+REGIONS = ["Madhya Pradesh", "Gujarat", "Rajasthan", "All India"]
+
+
+def _lots(n, rng):
+    return {
+        "crop": [CROPS[i % len(CROPS)] for i in range(n)],
+        "region": [REGIONS[i % len(REGIONS)] for i in range(n)],
+        "quantity_quintals": rng.uniform(10, 200, n),
+        "temperature_c": rng.uniform(20, 35, n),
+        "humidity_percent": rng.uniform(55, 80, n),
+        "degradation": rng.uniform(0, 0.3, n),
+        "storage_cost": np.full(n, sell_hold.DEFAULT_STORAGE_COST),
+        "lot_ids": [f"L{i}" for i in range(n)],
+    }
+
+
+def _timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(n_lots=100, n_paths=10_000, weeks=26):
+    price_forecaster.warm()
+    lots = _lots(n_lots, np.random.default_rng(0))
+    cells = n_lots * n_paths * (weeks + 1)
+    print(f"{n_lots} lots x {n_paths} paths x {weeks + 1} horizons = {cells / 1e6:.0f}M lot-path-weeks")
+
+    batch_s, batch = _timed(lambda: sell_hold.evaluate(**lots, weeks=weeks, n_paths=n_paths))
+    print(f"  batch                {batch_s * 1000:8.1f} ms  ({cells / batch_s / 1e6:.0f}M cells/s)")
+
+    def one_by_one():
+        return [sell_hold.evaluate(**{k: v[i:i + 1] for k, v in lots.items()}, weeks=weeks, n_paths=n_paths)
+                for i in range(n_lots)]
+
+    single_s, singles = _timed(one_by_one, repeat=1)
+    worst = max(float(np.abs(s.expected_revenue[0] - batch.expected_revenue[i]).max()) for i, s in enumerate(singles))
+    print(f"  lot by lot           {single_s * 1000:8.1f} ms  (max |batch - single| expected revenue {worst:.4f} INR)")
+    hold = int((batch.best_horizon > 0).sum())
+    print(f"  {hold}/{n_lots} lots held; portfolio {batch.portfolio['expected_revenue'] / 1e5:.1f} lakh INR "
+          f"vs {batch.portfolio['sell_now_revenue'] / 1e5:.1f} lakh selling everything now")
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    body = {"lots": [{"crop": lots["crop"][i], "region": lots["region"][i], "lot_id": lots["lot_ids"][i],
+                      "quantity_quintals": float(lots["quantity_quintals"][i]),
+                      "temperature_c": float(lots["temperature_c"][i]),
+                      "humidity_percent": float(lots["humidity_percent"][i]),
+                      "degradation": float(lots["degradation"][i])} for i in range(n_lots)],
+            "n_paths": n_paths, "horizon_weeks": weeks}
+    with TestClient(app) as client:
+        http_s, response = _timed(lambda: client.post("/sell-hold/batch", json=body))
+        assert response.status_code == 200, response.text
+        print(f"POST /sell-hold/batch  {http_s * 1000:8.1f} ms  ({len(response.content) / 1e3:.0f} kB)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,135 @@
+"""
+Response serialization: the previous paths (pydantic response_model
+re-validation, FastAPI's jsonable_encoder on returned dicts, JSONResponse over
+`.tolist()`) vs serialization.respond, at realistic payload sizes.
+
+Each payload is built once and served by two bench routes, so the timings
+differ only in serialization. Also reports gzip (and brotli, MessagePack and
+Arrow when those packages are installed) sizes and encode times.
+
+Run from ai_service/: python benchmarks/bench_serialization.py [repeats]
+"""
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+import numpy as np  # noqa: E402
+from fastapi import Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import serialization  # noqa: E402
+from main import app  # noqa: E402
+from routers.logistics import Location, RouteResponse  # noqa: E402
+
+
+def _payloads(rng):
+    stops = [Location(id=f"farmer-{i:05d}", lat=float(lat), lon=float(lon))
+             for i, (lat, lon) in enumerate(zip(rng.uniform(21, 26, 1000), rng.uniform(74, 82, 1000)))]
+    route = {"total_distance_km": 4321.5, "greedy_distance_km": 5012.3, "improvement_pct": 13.8,
+             "solve_time_ms": 500.0, "metric": "road"}
+    n = 200_000
+    per_acre = rng.uniform(2, 12, n)
+    yields = {"count": n, "confidence_score": 0.83, "field_ids": [f"F{i}" for i in range(n)],
+              "predicted_yield_quintals": (per_acre * rng.uniform(0.5, 10, n)).round(2),
+              "yield_per_acre": per_acre.round(2)}
+    matrix = rng.uniform(0, 800, (1000, 1000)).round(3)
+    lots = 1000
+    sell_hold = {name: rng.uniform(1e4, 1e6, (lots, 27)).round(2)
+                 for name in ("expected_price", "expected_revenue", "revenue_p5", "revenue_std")}
+    return stops, route, yields, matrix, sell_hold
+
+
+def _add_routes(stops, route, yields, matrix, sell_hold):
+    columns = ("field_ids", "predicted_yield_quintals", "yield_per_acre")
+
+    @app.post("/bench/route/model", response_model=RouteResponse)
+    def route_model():
+        return RouteResponse(ordered_path=list(stops), **route)
+
+    @app.post("/bench/route/fast", response_model=RouteResponse)
+    def route_fast(request: Request):
+        path = [{"id": s.id, "lat": s.lat, "lon": s.lon} for s in stops]
+        return serialization.respond(request, dict(route, ordered_path=path), table=("ordered_path",))
+
+    @app.post("/bench/yield/tolist")
+    def yield_tolist():
+        return JSONResponse({k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in yields.items()})
+
+    @app.post("/bench/yield/fast")
+    def yield_fast(request: Request):
+        return serialization.respond(request, yields, table=columns)
+
+    @app.post("/bench/matrix/dict")
+    def matrix_dict():
+        return {"rows": 1000, "cols": 1000, "distances_km": matrix.tolist()}
+
+    @app.post("/bench/matrix/fast")
+    def matrix_fast(request: Request):
+        return serialization.respond(request, {"rows": 1000, "cols": 1000, "distances_km": matrix},
+                                     table=("distances_km",))
+
+    @app.post("/bench/sell-hold/tolist")
+    def sell_hold_tolist():
+        return JSONResponse({k: v.tolist() for k, v in sell_hold.items()})
+
+    @app.post("/bench/sell-hold/fast")
+    def sell_hold_fast(request: Request):
+        return serialization.respond(request, sell_hold, table=tuple(sell_hold))
+
+
+def _time(client, path, repeats, headers=None):
+    best, response = float("inf"), None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        response = client.post(path, headers=headers or {"accept-encoding": "identity"})
+        best = min(best, time.perf_counter() - t0)
+    assert response.status_code == 200, response.text
+    return best, response
+
+
+def main(repeats=5):
+    stops, route, yields, matrix, sell_hold = _payloads(np.random.default_rng(0))
+    _add_routes(stops, route, yields, matrix, sell_hold)
+    cases = [
+        ("1000-stop route", "/bench/route/model", "/bench/route/fast"),
+        ("200k-field yield batch", "/bench/yield/tolist", "/bench/yield/fast"),
+        ("1000x1000 distance matrix", "/bench/matrix/dict", "/bench/matrix/fast"),
+        ("1000-lot sell-hold batch", "/bench/sell-hold/tolist", "/bench/sell-hold/fast"),
+    ]
+    binary = [fmt for fmt in serialization.FORMATS if fmt != serialization.JSON]
+    print(f"JSON encoder: {'orjson' if serialization.orjson else 'stdlib'}; "
+          f"optional formats: {', '.join(binary) or 'none installed'}; "
+          f"encodings: {', '.join(serialization.ENCODINGS)}")
+    with TestClient(app) as client:
+        for name, old, new in cases:
+            old_s, old_r = _time(client, old, repeats)
+            new_s, new_r = _time(client, new, repeats)
+            assert old_r.json() == new_r.json()
+            print(f"{name}: {len(new_r.content) / 1e6:.2f} MB JSON")
+            print(f"  previous path        {old_s * 1000:8.1f} ms")
+            print(f"  serialization.respond {new_s * 1000:7.1f} ms  ({old_s / new_s:.1f}x)")
+            body = new_r.content
+            t0 = time.perf_counter()
+            packed = gzip.compress(body, serialization.GZIP_LEVEL)
+            print(f"  gzip -{serialization.GZIP_LEVEL}              {(time.perf_counter() - t0) * 1000:8.1f} ms  "
+                  f"-> {len(packed) / 1e6:.2f} MB")
+            if "br" in serialization.ENCODINGS:
+                import brotli
+
+                t0 = time.perf_counter()
+                packed = brotli.compress(body, quality=serialization.BROTLI_QUALITY)
+                print(f"  brotli q{serialization.BROTLI_QUALITY}            {(time.perf_counter() - t0) * 1000:8.1f} ms  "
+                      f"-> {len(packed) / 1e6:.2f} MB")
+            for fmt in binary:
+                fmt_s, fmt_r = _time(client, new, repeats, {"accept": fmt, "accept-encoding": "identity"})
+                print(f"  {fmt.split('/')[-1][:20]:20s} {fmt_s * 1000:8.1f} ms  -> {len(fmt_r.content) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
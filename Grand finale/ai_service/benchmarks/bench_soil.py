@@ -0,0 +1,61 @@
+"""
+Soil recommendation at campaign scale: per-sample rules vs the vectorized batch.
+
+Run from ai_service/: python benchmarks/bench_soil.py [samples]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+from soil_rules import get_rule_table  # noqa: E402
+
+SOIL_TYPES = ["Black", "Black Cotton Soil", "Alluvial", "Red", "Red Sandy Loam", "Lateritic", "Saline", "Regur"]
+
+
+def main(n=100_000):
+    rng = np.random.default_rng(0)
+    cols = {
+        "soil_type": rng.choice(SOIL_TYPES, n).tolist(),
+        "nitrogen": rng.uniform(80, 400, n).round(1).tolist(),
+        "phosphorus": rng.uniform(5, 60, n).round(1).tolist(),
+        "potassium": rng.uniform(80, 500, n).round(1).tolist(),
+        "ph_level": rng.uniform(4.5, 9.0, n).round(2).tolist(),
+    }
+    table = get_rule_table()
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        table.resolve(cols["soil_type"][i])
+        table.assess({"ph_level": cols["ph_level"][i], "nitrogen": cols["nitrogen"][i]})
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    table.assess_many({"ph_level": cols["ph_level"], "nitrogen": cols["nitrogen"]})
+    vector_s = time.perf_counter() - t0
+
+    client = TestClient(app)
+    body = {k: v[0] for k, v in cols.items()}
+    client.post("/recommend/soil", json=body)
+    t0 = time.perf_counter()
+    for _ in range(200):
+        client.post("/recommend/soil", json=body)
+    single_s = (time.perf_counter() - t0) / 200
+
+    t0 = time.perf_counter()
+    response = client.post("/recommend/soil/batch", json=cols)
+    batch_s = time.perf_counter() - t0
+    assert response.json()["count"] == n
+
+    print(f"{n} samples: rule loop {loop_s * 1000:8.1f} ms   assess_many {vector_s * 1000:6.1f} ms")
+    print(f"/recommend/soil {single_s * 1000:.2f} ms per call (~{single_s * n:.0f} s for {n})   "
+          f"/recommend/soil/batch {batch_s * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,115 @@
+"""
+Spoilage engine throughput with a full warehouse fleet.
+
+100k lots spread over bays that each report every 5 minutes. Measures bay
+readings/s and lot updates/s for the columnar engine call, the event-dict
+path (WebSocket batches) and NDJSON through POST /storage/events, against a
+per-lot Python loop doing the same update, plus the engine's array memory.
+
+Run from ai_service/: python benchmarks/bench_spoilage.py [lots] [bays] [ticks]
+"""
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import spoilage_engine  # noqa: E402
+from spoilage_engine import SHELF_LIFE_DAYS, SpoilageEngine  # noqa: E402
+
+TICK_S = 300.0
+
+
+def _fleet(engine, n_lots, n_bays, rng):
+    crops = list(SHELF_LIFE_DAYS)
+    events = [{"type": "lot", "lot_id": f"L{i}", "bay_id": f"B{i % n_bays}", "crop": crops[i % len(crops)],
+               "degradation": float(d)} for i, d in enumerate(rng.uniform(0, 0.6, n_lots))]
+    return engine.ingest_events(events)
+
+
+def _tick(n_bays, t, rng):
+    temperature = 28 + 6 * np.sin(2 * np.pi * t / 86400) + rng.normal(0, 1, n_bays)
+    humidity = np.clip(70 + rng.normal(0, 8, n_bays), 20, 100)
+    return [f"B{i}" for i in range(n_bays)], np.full(n_bays, t), temperature, humidity
+
+
+def _per_lot_loop(engine, bay_ids, ts, temperature, humidity):
+    """The same update as a per-lot scalar loop (state kept in dicts)."""
+    state = {lot: (0.1, bay, 1 / 180) for lot, bay in zip(engine.lots.ids, engine.lot_bay.tolist())}
+    readings = dict(zip(range(len(bay_ids)), zip(temperature.tolist(), humidity.tolist())))
+    t0 = time.perf_counter()
+    for lot, (d, bay, rate) in state.items():
+        t, h = readings[bay]
+        env = 2.0 ** ((t - 25) / 10) * math.exp(0.08 * max(h - 65, 0))
+        d += rate * env * TICK_S / 86400
+        state[lot] = (d, bay, rate)
+    return time.perf_counter() - t0
+
+
+def main(n_lots=100_000, n_bays=5000, ticks=50):
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    engine = SpoilageEngine(max_lots=n_lots, max_bays=n_bays)
+    t0 = time.perf_counter()
+    _fleet(engine, n_lots, n_bays, rng)
+    register_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{n_lots} lots in {n_bays} bays: registered in {register_s:.2f} s; "
+          f"arrays {engine.nbytes() / 1e6:.1f} MB, traced peak {peak / 1e6:.1f} MB")
+
+    start = time.time() - ticks * TICK_S * 3
+    engine.ingest_readings(*_tick(n_bays, start, rng))
+    alerts, elapsed = 0, 0.0
+    for k in range(1, ticks + 1):
+        batch = _tick(n_bays, start + k * TICK_S, rng)
+        t0 = time.perf_counter()
+        alerts += len(engine.ingest_readings(*batch)["alerts"])
+        elapsed += time.perf_counter() - t0
+    per_tick = elapsed / ticks
+    print(f"columnar   {per_tick * 1000:7.2f} ms/tick  {n_bays / per_tick:12,.0f} readings/s  "
+          f"{n_lots / per_tick:12,.0f} lot updates/s  ({alerts} alerts)")
+
+    loop_s = _per_lot_loop(engine, *_tick(n_bays, start, rng))
+    print(f"per-lot loop {loop_s * 1000:5.1f} ms/tick  {n_lots / loop_s:12,.0f} lot updates/s")
+
+    t_base = start + (ticks + 1) * TICK_S
+    bay_ids, _, temperature, humidity = _tick(n_bays, t_base, rng)
+    events = [{"bay_id": b, "ts": t_base, "temperature_c": t, "humidity_percent": h}
+              for b, t, h in zip(bay_ids, temperature.tolist(), humidity.tolist())]
+    t0 = time.perf_counter()
+    engine.ingest_events(events)
+    events_s = time.perf_counter() - t0
+    print(f"events     {events_s * 1000:7.2f} ms/tick  {n_bays / events_s:12,.0f} readings/s")
+
+    # NDJSON over HTTP: 10 ticks per request
+    from main import app
+
+    spoilage_engine._engine = engine
+    lines = []
+    for k in range(10):
+        bay_ids, _, temperature, humidity = _tick(n_bays, t_base + (k + 1) * TICK_S, rng)
+        lines += [json.dumps({"bay_id": b, "ts": t_base + (k + 1) * TICK_S, "temperature_c": round(t, 2),
+                              "humidity_percent": round(h, 1)})
+                  for b, t, h in zip(bay_ids, temperature.tolist(), humidity.tolist())]
+    body = "\n".join(lines).encode()
+    client = TestClient(app)
+    t0 = time.perf_counter()
+    response = client.post("/storage/events", content=body, headers={"content-type": "application/x-ndjson"})
+    http_s = time.perf_counter() - t0
+    assert response.json()["accepted"] == len(lines), response.text[:500]
+    print(f"NDJSON     {http_s * 1000:7.1f} ms for {len(lines)} readings ({len(body) / 1e6:.1f} MB)  "
+          f"{len(lines) / http_s:12,.0f} readings/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,133 @@
+"""
+Cold-start benchmarks for an ai_service worker.
+
+1. Logistics ANN: fitting the MLP in-process (the old import-time behaviour)
+   vs loading the saved artifact.
+2. Worker startup: wall time and resident memory of a fresh interpreter that
+   imports `main` (lazy routers), the same with every feature preloaded, and
+   the old eager import set (pandas, bs4, requests, sklearn) for comparison.
+
+Run from ai_service/:
+
+    python benchmarks/bench_startup.py [--max-import-ms MS] [--max-rss-mb MB]
+
+With a limit set, the run exits non-zero when a plain `import main` exceeds it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+# Executed in a fresh interpreter; prints {"import_ms": ..., "rss_mb": ...}
+_PROBE = """
+import json, os, sys, time
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+rss_kb = 0
+try:
+    with open("/proc/self/status") as fh:
+        rss_kb = next(int(line.split()[1]) for line in fh if line.startswith("VmRSS:"))
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+print(json.dumps({{"import_ms": elapsed * 1000, "rss_mb": rss_kb / 1024}}))
+"""
+
+SCENARIOS = {
+    "baseline (python)": "pass",
+    "import main": "import main",
+    "import main + preload all": "import main; main.preload_features('all')",
+    "old eager imports": (
+        "import numpy, pandas, requests, bs4, fastapi, pydantic\n"
+        "import sklearn.neural_network, sklearn.preprocessing"
+    ),
+}
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_artifact():
+    from logistics_ann import LogisticsANN
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "logistics_ann.npz")
+        LogisticsANN.train().save(path)
+
+        train_s = _best_of(LogisticsANN.train, repeat=3)
+        load_s = _best_of(lambda: LogisticsANN.load(path))
+
+    print(f"train in-process : {train_s * 1000:8.2f} ms")
+    print(f"load artifact    : {load_s * 1000:8.2f} ms")
+    print(f"speed-up         : {train_s / load_s:8.1f}x")
+
+
+def probe(code: str, repeat: int = 3) -> dict:
+    """Best import time and its RSS over `repeat` fresh interpreters."""
+    env = dict(os.environ, BIOMETRIX_PRELOAD="none")
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(code=code)],
+            cwd=SERVICE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or result["import_ms"] < best["import_ms"]:
+            best = result
+    return best
+
+
+def bench_worker_startup(repeat: int) -> dict:
+    results = {}
+    for label, code in SCENARIOS.items():
+        try:
+            results[label] = probe(code, repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{label:28s} skipped ({e.stderr.strip().splitlines()[-1]})")
+            continue
+        r = results[label]
+        print(f"{label:28s} {r['import_ms']:9.1f} ms  {r['rss_mb']:7.1f} MB RSS")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ai_service cold-start benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    parser.add_argument("--skip-artifact", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_artifact:
+        bench_artifact()
+        print()
+    results = bench_worker_startup(args.repeat)
+
+    lazy = results["import main"]
+    failures = []
+    if args.max_import_ms is not None and lazy["import_ms"] > args.max_import_ms:
+        failures.append(f"import main took {lazy['import_ms']:.1f} ms > {args.max_import_ms} ms")
+    if args.max_rss_mb is not None and lazy["rss_mb"] > args.max_rss_mb:
+        failures.append(f"import main RSS {lazy['rss_mb']:.1f} MB > {args.max_rss_mb} MB")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmark and load-test suite for every ai_service endpoint family.
+
+1. Microbenchmarks of the hot functions: calculate_distance,
+   LogisticsANN.predict, the cached forecast behind /forecast-price and
+   recommend_crops_by_soil.
+2. Concurrency sweeps through the in-process ASGI load generator
+   (loadgen.py): /optimize-route at growing farmer counts, /pest-detect with
+   synthetic leaf JPEGs, and the batch/bulk endpoints.
+3. Results are written as JSON. Given --baseline, every result is compared
+   against the earlier run and the suite exits 1 when any of them is slower
+   by more than --threshold (per-call time for microbenchmarks, throughput
+   for load tests). Any failed request in a load test also fails the run.
+
+The response cache is disabled so repeated requests hit the handlers, and
+the executor lanes admit every request of the widest sweep (c=64) so the
+load tests measure queueing rather than 503 backpressure.
+Run from ai_service/:
+
+    python benchmarks/bench_suite.py --out before.json
+    python benchmarks/bench_suite.py --baseline before.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date
+
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+os.environ.setdefault("BIOMETRIX_CPU_QUEUE_LIMIT", "1024")
+os.environ.setdefault("BIOMETRIX_THREAD_QUEUE_LIMIT", "1024")
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+import numpy as np  # noqa: E402
+
+from loadgen import RequestSpec, run_load  # noqa: E402
+
+SOIL_TYPES = ["Black", "Alluvial", "Red Sandy Loam", "Lateritic", "Saline", "Regur"]
+
+
+# --- Microbenchmarks ---
+
+def _time_per_call(fn, min_time_s: float, repeat: int = 5) -> float:
+    """Best-of-`repeat` seconds per call, each repeat looping for about `min_time_s`."""
+    fn()
+    t0 = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - t0, 1e-7)
+    loops = max(1, int(min_time_s / single))
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / loops)
+    return best
+
+
+def micro_benchmarks(min_time_s: float) -> dict:
+    from starlette.requests import Request
+
+    from logistics_ann import get_logistics_ann
+    from price_forecast import price_forecaster
+    from routers.logistics import Location, calculate_distance
+    from routers.soil import SoilRecommendationRequest, recommend_crops_by_soil
+
+    a = Location(id="A", lat=22.7196, lon=75.8577)
+    b = Location(id="B", lat=23.2599, lon=77.4126)
+    ann = get_logistics_ann()
+    today = date.today()
+    soil_req = SoilRecommendationRequest(soil_type="Black Cotton Soil", nitrogen=180, phosphorus=20,
+                                         potassium=200, ph_level=7.8)
+    # The handler only reads the Accept header (JSON when absent)
+    http_request = Request({"type": "http", "method": "POST", "path": "/recommend/soil", "headers": []})
+    cases = {
+        "calculate_distance": lambda: calculate_distance(a, b),
+        "LogisticsANN.predict": lambda: ann.predict(250.0, 4.0),
+        "price_forecaster.forecast": lambda: price_forecaster.forecast("Soybean", "Indore", today),
+        "recommend_crops_by_soil": lambda: recommend_crops_by_soil(soil_req, http_request),
+    }
+    results = {}
+    for name, fn in cases.items():
+        per_call = _time_per_call(fn, min_time_s)
+        results[f"micro/{name}"] = {"value": per_call * 1e6, "unit": "us/call", "better": "lower"}
+        print(f"  {name:28s} {per_call * 1e6:10.2f} us/call")
+    return results
+
+
+# --- Load tests ---
+
+def _route_request(n_farmers: int, budget_ms: float):
+    rng = np.random.default_rng(n_farmers)
+    farmers = [{"id": f"F{i}", "lat": float(lat), "lon": float(lon)}
+               for i, (lat, lon) in enumerate(zip(rng.uniform(21, 24, n_farmers), rng.uniform(74, 78, n_farmers)))]
+    body = {"warehouse": {"id": "W", "lat": 22.7, "lon": 75.9}, "farmers": farmers, "time_budget_ms": budget_ms}
+    return lambda i: RequestSpec("POST", "/optimize-route", json=body)
+
+
+def _pest_request(n_images: int):
+    from PIL import Image
+
+    import pest_model
+
+    rng = np.random.default_rng(0)
+    uploads = []
+    for i in range(n_images):
+        buf = io.BytesIO()
+        leaf = pest_model.render_leaf(i % len(pest_model.LABELS), rng)
+        Image.fromarray(leaf).resize((640, 480), Image.BICUBIC).save(buf, "JPEG", quality=85)
+        uploads.append(buf.getvalue())
+    return lambda i: RequestSpec("POST", "/pest-detect",
+                                 files={"file": ("leaf.jpg", uploads[i % n_images], "image/jpeg")})
+
+
+def _batch_requests(rows: int) -> dict:
+    rng = np.random.default_rng(1)
+    logistics = {"items": [{"distance_km": float(d), "weight_tons": float(w)}
+                           for d, w in zip(rng.uniform(5, 1500, rows), rng.uniform(0.5, 20, rows))]}
+    credit = {
+        "land_size_acres": rng.uniform(0, 8, rows).round(2).tolist(),
+        "past_defaults": rng.integers(0, 3, rows).tolist(),
+        "yield_history_years": rng.integers(0, 25, rows).tolist(),
+        "kyc_status": (rng.random(rows) < 0.7).tolist(),
+    }
+    soil = {
+        "soil_type": rng.choice(SOIL_TYPES, rows).tolist(),
+        "nitrogen": rng.uniform(80, 400, rows).round(1).tolist(),
+        "phosphorus": rng.uniform(5, 60, rows).round(1).tolist(),
+        "potassium": rng.uniform(80, 500, rows).round(1).tolist(),
+        "ph_level": rng.uniform(4.5, 9.0, rows).round(2).tolist(),
+    }
+    yields = {
+        "crop": rng.choice(["Soybean", "Groundnut", "Mustard", "Sunflower"], rows).tolist(),
+        "acreage": rng.uniform(0.5, 10, rows).round(2).tolist(),
+        "state": rng.choice(["Madhya Pradesh", "Rajasthan", "Gujarat", "Maharashtra"], rows).tolist(),
+        "rainfall_mm": rng.uniform(200, 1600, rows).round(0).tolist(),
+        "soil_nitrogen": rng.uniform(10, 250, rows).round(1).tolist(),
+    }
+    grid = {
+        "districts": [{"name": f"D{i}", "state": "Madhya Pradesh", "soil_nitrogen": float(n)}
+                      for i, n in enumerate(rng.uniform(20, 250, 50))],
+        "crops": ["Soybean", "Groundnut", "Mustard", "Sunflower"],
+        "rainfall_mm": [400, 600, 800, 1000, 1200],
+        "include_factors": True,
+    }
+    side = int(min(rows, 4000) ** 0.5 * 4)
+    matrix = {"origin_lats": rng.uniform(21, 24, side).tolist(), "origin_lons": rng.uniform(74, 78, side).tolist()}
+    n_fleet = 60
+    fleet = {
+        "warehouse": {"id": "W", "lat": 22.7, "lon": 75.9},
+        "farmers": [{"id": f"F{i}", "lat": float(lat), "lon": float(lon), "load_tons": float(t)}
+                    for i, (lat, lon, t) in enumerate(zip(rng.uniform(21, 24, n_fleet), rng.uniform(74, 78, n_fleet),
+                                                          rng.uniform(0.2, 3, n_fleet)))],
+        "fleet": [{"id": f"T{i}", "capacity_tons": 15.0} for i in range(8)],
+        "time_budget_ms": 50.0,
+    }
+    return {
+        f"/logistics/predict/batch[{rows}]": lambda i: RequestSpec("POST", "/logistics/predict/batch", json=logistics),
+        f"/credit-score/bulk[{rows}]": lambda i: RequestSpec("POST", "/credit-score/bulk", json=credit),
+        f"/recommend/soil/batch[{rows}]": lambda i: RequestSpec("POST", "/recommend/soil/batch", json=soil),
+        f"/predict/yield/batch[{rows}]": lambda i: RequestSpec("POST", "/predict/yield/batch", json=yields),
+        "/predict/yield/grid[50x4x5]": lambda i: RequestSpec("POST", "/predict/yield/grid", json=grid),
+        f"/logistics/distance-matrix[{side}x{side}]": lambda i: RequestSpec("POST", "/logistics/distance-matrix",
+                                                                           json=matrix),
+        f"/optimize-route/fleet[{n_fleet}]": lambda i: RequestSpec("POST", "/optimize-route/fleet", json=fleet),
+        "/forecast-price/batch[4x3x2]": lambda i: RequestSpec("POST", "/forecast-price/batch", json={
+            "crops": ["Soybean", "Mustard", "Groundnut", "Sunflower"],
+            "regions": ["Indore", "Jaipur", "Rajkot"], "horizons_weeks": [4, 26],
+        }),
+    }
+
+
+def _record(results: dict, name: str, result) -> None:
+    results[f"load/{name}"] = {
+        "value": result.throughput_rps, "unit": "req/s", "better": "higher",
+        "concurrency": result.concurrency, "requests": result.requests, "errors": result.errors,
+        "p50_ms": result.p50_ms, "p95_ms": result.p95_ms, "p99_ms": result.p99_ms, "max_ms": result.max_ms,
+        "status_counts": {str(k): v for k, v in result.status_counts.items()},
+    }
+    print(f"  {name:44s} c={result.concurrency:<3d} {result.throughput_rps:9.1f} req/s   "
+          f"p50 {result.p50_ms:8.2f}  p95 {result.p95_ms:8.2f}  p99 {result.p99_ms:8.2f} ms"
+          + (f"   {result.errors} errors {result.status_counts}" if result.errors else ""))
+
+
+def load_tests(app, quick: bool) -> dict:
+    concurrencies = (1, 4) if quick else (1, 4, 16, 64)
+    per_client = 3 if quick else 10
+    results = {}
+
+    def sweep(name, make_request, levels=concurrencies, per=per_client):
+        for c in levels:
+            asyncio.run(run_load(app, make_request, 1, 1))    # warm-up (imports, model load)
+            result = asyncio.run(run_load(app, make_request, max(4, c * per), c))
+            _record(results, f"{name}@c{c}", result)
+
+    for n_farmers in ((10, 100) if quick else (10, 50, 200, 500)):
+        sweep(f"/optimize-route[{n_farmers}]", _route_request(n_farmers, budget_ms=50.0))
+    sweep("/pest-detect", _pest_request(64), per=per_client * 4)
+    for name, make_request in _batch_requests(1000 if quick else 10_000).items():
+        sweep(name, make_request, levels=concurrencies[:2] if quick else concurrencies[:3])
+    return results
+
+
+# --- Comparison ---
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print(f"\nAgainst baseline (threshold {threshold:.0%}, + = faster):")
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None or not before["value"]:
+            continue
+        if current["better"] == "lower":
+            change = current["value"] / before["value"] - 1
+        else:
+            change = before["value"] / current["value"] - 1 if current["value"] else float("inf")
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"  {name:56s} {before['value']:12.2f} -> {current['value']:12.2f} {current['unit']:8s} "
+              f"{-change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ai_service benchmark and load-test suite")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--only", choices=("micro", "load"), default=None)
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer concurrency levels")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per microbenchmark repeat")
+    args = parser.parse_args()
+
+    import executors
+    from main import app
+
+    results = {}
+    try:
+        if args.only in (None, "micro"):
+            print("Microbenchmarks:")
+            results.update(micro_benchmarks(args.min_time))
+        if args.only in (None, "load"):
+            print("Load tests (in-process ASGI):")
+            results.update(load_tests(app, args.quick))
+    finally:
+        executors.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nWrote {len(results)} results to {args.out}")
+
+    failed = [name for name, result in results.items() if result.get("errors")]
+    if failed:
+        print(f"\nRequests failed in: {', '.join(failed)}")
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            failed += regressions
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+/weather-alerts served from the background-polled snapshot vs fetching the
+feed per request (with a simulated upstream round trip), plus the poller's
+behaviour through a feed outage.
+
+Runs the local feed stand-in (weather_feed_stub.py) with a short poll
+interval, so a few seconds cover many conditional polls, an outage
+(stale-while-revalidate) and the recovery.
+
+Run from ai_service/: python benchmarks/bench_weather_alerts.py [requests]
+"""
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from weather_feed_stub import FeedStub  # noqa: E402
+
+POLL_S = 0.2
+UPSTREAM_RTT_S = 0.05
+stub = FeedStub().start()
+os.environ["BIOMETRIX_WEATHER_FEED_URL"] = stub.url
+os.environ["BIOMETRIX_WEATHER_POLL_S"] = str(POLL_S)
+os.environ["BIOMETRIX_WEATHER_MAX_BACKOFF_S"] = "1"
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+os.environ.setdefault("BIOMETRIX_PRELOAD", "none")
+
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from loadgen import percentile  # noqa: E402
+from main import app  # noqa: E402
+from weather_alerts import parse_feed  # noqa: E402
+
+
+def _add_fetching_route(app):
+    """The naive design: fetch and parse the feed inside the handler (pooled client)."""
+    upstream = httpx.AsyncClient(timeout=10)
+
+    @app.get("/bench/weather-alerts-fetch")
+    async def fetch_per_request():
+        response = await upstream.get(stub.url)
+        return [alert._asdict() for alert in parse_feed(response.json())]
+
+
+def _latencies_ms(fn, n):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+def _row(name, latencies):
+    print(f"  {name:36s} p50 {percentile(latencies, 0.5):7.3f} ms   p99 {percentile(latencies, 0.99):7.3f} ms")
+
+
+def _wait_for(predicate, timeout_s=10.0):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline and not predicate():
+        time.sleep(0.02)
+    return predicate()
+
+
+def main(n=2000):
+    _add_fetching_route(app)
+    with TestClient(app) as client:
+        assert _wait_for(lambda: client.get("/weather-alerts/status").json()["origin"] == "feed")
+        print(f"Latency ({n} requests per snapshot row, {max(1, n // 20)} fetching):")
+        _row("/weather-alerts (snapshot)", _latencies_ms(lambda: client.get("/weather-alerts"), n))
+        _row("/weather-alerts?state=gujarat", _latencies_ms(
+            lambda: client.get("/weather-alerts", params={"state": "gujarat"}), n))
+        stub.delay_s = UPSTREAM_RTT_S
+        _row(f"fetch per request ({UPSTREAM_RTT_S * 1000:.0f} ms upstream)", _latencies_ms(
+            lambda: client.get("/bench/weather-alerts-fetch"), max(1, n // 20)))
+        _row(f"snapshot ({UPSTREAM_RTT_S * 1000:.0f} ms upstream)", _latencies_ms(
+            lambda: client.get("/weather-alerts"), n))
+        stub.delay_s = 0.0
+
+        time.sleep(POLL_S * 5)
+        print(f"poller so far: {stub.status_counts} over {stub.connections} connection(s)")
+
+        stub.fail = True
+        time.sleep(POLL_S * 3)
+        response = client.get("/weather-alerts")
+        print(f"outage: HTTP {response.status_code}, {len(response.json())} alerts, "
+              f"X-Alerts-Stale={response.headers['x-alerts-stale']}, "
+              f"failures={client.get('/weather-alerts/status').json()['consecutive_failures']}")
+
+        stub.fail = False
+        client.get("/weather-alerts")   # a stale read wakes the poller
+        recovered = _wait_for(lambda: client.get("/weather-alerts").headers["x-alerts-stale"] == "0")
+        print(f"recovered: {recovered}; feed responses {stub.status_counts}")
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,69 @@
+"""
+Yield model at planning scale: per-row scoring vs the vectorized ensemble
+pass, with and without factor attribution, and the /predict/yield/grid cube.
+
+Run from ai_service/: python benchmarks/bench_yield.py [districts]
+"""
+import os
+import sys
+import time
+
+os.environ["BIOMETRIX_RESPONSE_CACHE"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+from yield_model import CROP_PROFILES, STATE_FACTORS, get_yield_model  # noqa: E402
+
+RAINFALL_SCENARIOS = [300, 500, 700, 900, 1100, 1300, 1600]
+
+
+def main(n_districts=700):
+    model = get_yield_model()
+    crops = [c for c in CROP_PROFILES if c != "other"]
+    states = [s for s in STATE_FACTORS if s != "other"]
+    rng = np.random.default_rng(0)
+    districts = [{"name": f"D{i}", "state": states[i % len(states)],
+                  "soil_nitrogen": float(rng.uniform(20, 250)), "acreage": float(rng.uniform(1e3, 5e4))}
+                 for i in range(n_districts)]
+    X = model.grid([d["state"] for d in districts], [d["soil_nitrogen"] for d in districts],
+                   crops, RAINFALL_SCENARIOS)
+    n = len(X)
+
+    sample = X[:500]
+    t0 = time.perf_counter()
+    for row in sample:
+        model.explain(row[None, :])
+    row_s = (time.perf_counter() - t0) / len(sample)
+
+    model.predict(X[:100])
+    t0 = time.perf_counter()
+    model.predict(X)
+    predict_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    model.explain(X)
+    explain_s = time.perf_counter() - t0
+
+    print(f"{model.feature.shape[0]} trees, depth {model.depth}, {n} cells "
+          f"({n_districts} districts x {len(crops)} crops x {len(RAINFALL_SCENARIOS)} rainfall)")
+    print(f"per-row explain {row_s * 1e6:8.1f} us/row (~{row_s * n:.1f} s for the cube)")
+    print(f"vectorized      predict {predict_s * 1000:7.1f} ms ({predict_s / n * 1e6:.2f} us/row)   "
+          f"explain {explain_s * 1000:7.1f} ms ({explain_s / n * 1e6:.2f} us/row)")
+
+    client = TestClient(app)
+    for include_factors in (False, True):
+        body = {"districts": districts, "crops": crops, "rainfall_mm": RAINFALL_SCENARIOS,
+                "include_factors": include_factors}
+        t0 = time.perf_counter()
+        response = client.post("/predict/yield/grid", json=body)
+        grid_s = time.perf_counter() - t0
+        assert response.status_code == 200, response.text
+        print(f"/predict/yield/grid include_factors={include_factors!s:5s} {grid_s * 1000:7.0f} ms "
+              f"({len(response.content) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 700)
@@ -0,0 +1,92 @@
+"""
+In-process ASGI load generator.
+
+Drives the FastAPI app through httpx's ASGI transport, so a sweep measures the
+service itself (routing, validation, handlers, middleware) without sockets or
+a separate server process. A fixed number of client coroutines each send
+requests back to back until the total is reached (closed-loop load).
+"""
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+
+class RequestSpec(NamedTuple):
+    method: str
+    path: str
+    json: object = None
+    files: Optional[dict] = None
+    headers: Optional[dict] = None
+
+
+class LoadResult(NamedTuple):
+    requests: int
+    concurrency: int
+    errors: int
+    elapsed_s: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    status_counts: Dict[int, int]
+    latencies_ms: List[float]      # sorted
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_load(app, make_request: Callable[[int], RequestSpec], total: int, concurrency: int,
+                   timeout_s: float = 120.0) -> LoadResult:
+    """Sends `total` requests from `concurrency` clients; `make_request(i)` builds request i."""
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    next_index = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout_s) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < total:
+                spec = make_request(next_index)
+                next_index += 1
+                t0 = time.perf_counter()
+                try:
+                    response = await client.request(spec.method, spec.path, json=spec.json,
+                                                    files=spec.files, headers=spec.headers)
+                    await response.aread()
+                    status = response.status_code
+                except Exception:
+                    status = 0
+                latencies.append(time.perf_counter() - t0)
+                statuses[status] = statuses.get(status, 0) + 1
+                if not 200 <= status < 300:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, total)))))
+        elapsed = time.perf_counter() - start
+
+    ordered = sorted(ms * 1000 for ms in latencies)
+    return LoadResult(
+        requests=len(ordered),
+        concurrency=concurrency,
+        errors=errors,
+        elapsed_s=elapsed,
+        throughput_rps=len(ordered) / elapsed if elapsed else 0.0,
+        p50_ms=statistics.median(ordered) if ordered else 0.0,
+        p95_ms=percentile(ordered, 0.95),
+        p99_ms=percentile(ordered, 0.99),
+        max_ms=ordered[-1] if ordered else 0.0,
+        status_counts=statuses,
+        latencies_ms=ordered,
+    )
+
@@ -0,0 +1,105 @@
+"""
+Local stand-in for the weather alert feed, for exercising weather_alerts.py.
+
+Serves a JSON alert document with ETag / Last-Modified and answers
+conditional requests with 304, like a real feed behind a CDN. `fail` makes it
+return 503 and `delay_s` slows every response, to simulate an outage or a
+slow upstream.
+
+    python benchmarks/weather_feed_stub.py [--port 8099] [--file alerts.json]
+    BIOMETRIX_WEATHER_FEED_URL=http://127.0.0.1:8099/alerts.json uvicorn main:app
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+                      "weather_alerts_sample.json")
+
+
+class FeedStub:
+    def __init__(self, payload=None, host: str = "127.0.0.1", port: int = 0):
+        self.fail = False
+        self.delay_s = 0.0
+        self.status_counts = {}
+        self.connections = 0
+        if payload is None:
+            with open(SAMPLE) as fh:
+                payload = json.load(fh)
+        self.set_payload(payload)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"     # keep-alive, so the client's pooled connection is reused
+            disable_nagle_algorithm = True      # headers and body go out as separate writes
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def do_GET(self):
+                if stub.delay_s:
+                    time.sleep(stub.delay_s)
+                body, etag, modified = stub._body, stub._etag, stub._modified
+                if stub.fail:
+                    status, body = 503, b'{"detail": "unavailable"}'
+                elif self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == modified:
+                    status, body = 304, b""
+                else:
+                    status = 200
+                stub.status_counts[status] = stub.status_counts.get(status, 0) + 1
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}/alerts.json"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="feed-stub", daemon=True)
+
+    def set_payload(self, payload):
+        body = json.dumps(payload).encode()
+        self._body = body
+        self._etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self._modified = formatdate(time.time(), usegmt=True)
+
+    def start(self) -> "FeedStub":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a weather alert feed with conditional GET")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--file", default=SAMPLE)
+    args = parser.parse_args()
+    with open(args.file) as fh:
+        payload = json.load(fh)
+    stub = FeedStub(payload, port=args.port).start()
+    print(f"Serving {args.file} at {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Farmer credit scoring rules, for one record or a whole columnar portfolio.
+
+`score_record` is the scalar rule set behind /credit-score; `score_columns`
+applies the same rules to NumPy columns with boolean masks and np.select and
+returns identical integers and bands for every row. Integer columns are
+scored in int64, so `yield_history_years` is limited to +/- MAX_ABS_YEARS
+(anything larger is rejected rather than silently overflowing).
+"""
+from typing import Tuple
+
+BASE_SCORE = 300
+LAND_THRESHOLD_ACRES = 2
+LAND_BONUS = 50
+NO_DEFAULT_BONUS = 100
+POINTS_PER_YIELD_YEAR = 20
+KYC_BONUS = 50
+MAX_SCORE = 850
+
+LOW_RISK_MIN = 750
+MEDIUM_RISK_MIN = 600
+RISK_LEVELS = ("Low", "Medium", "High")
+
+MAX_ABS_YEARS = 10 ** 15
+
+
+def risk_level(score: int) -> str:
+    return "Low" if score >= LOW_RISK_MIN else "Medium" if score >= MEDIUM_RISK_MIN else "High"
+
+
+def score_record(land_size_acres: float, past_defaults: int, yield_history_years: int,
+                 kyc_status: bool) -> Tuple[int, str]:
+    score = BASE_SCORE
+    if land_size_acres > LAND_THRESHOLD_ACRES: score += LAND_BONUS
+    if past_defaults == 0: score += NO_DEFAULT_BONUS
+    score += (yield_history_years * POINTS_PER_YIELD_YEAR)
+    if kyc_status: score += KYC_BONUS
+    if score > MAX_SCORE: score = MAX_SCORE
+    return score, risk_level(score)
+
+
+def score_columns(land_size_acres, past_defaults, yield_history_years, kyc_status):
+    """
+    Vectorized `score_record`. Takes four equal-length columns and returns
+    (scores int64 array, risk level string array).
+    """
+    import numpy as np
+
+    try:
+        land = np.asarray(land_size_acres, dtype=np.float64)
+        defaults = np.asarray(past_defaults, dtype=np.int64)
+        years = np.asarray(yield_history_years, dtype=np.int64)
+    except OverflowError:
+        raise ValueError("integer column out of int64 range")
+    kyc = np.asarray(kyc_status, dtype=bool)
+    if not (len(land) == len(defaults) == len(years) == len(kyc)):
+        raise ValueError("all columns must have the same length")
+    if ((years > MAX_ABS_YEARS) | (years < -MAX_ABS_YEARS)).any():
+        raise ValueError(f"yield_history_years must be within +/-{MAX_ABS_YEARS}")
+
+    score = np.full(len(land), BASE_SCORE, dtype=np.int64)
+    score += np.where(land > LAND_THRESHOLD_ACRES, LAND_BONUS, 0)
+    score += np.where(defaults == 0, NO_DEFAULT_BONUS, 0)
+    score += years * POINTS_PER_YIELD_YEAR
+    score += np.where(kyc, KYC_BONUS, 0)
+    np.minimum(score, MAX_SCORE, out=score)
+
+    risk = np.select(
+        [score >= LOW_RISK_MIN, score >= MEDIUM_RISK_MIN],
+        [RISK_LEVELS[0], RISK_LEVELS[1]],
+        default=RISK_LEVELS[2],
+    )
+    return score, risk
+
+
+# --- File input ---
+
+COLUMNS = ("land_size_acres", "past_defaults", "yield_history_years", "kyc_status")
+_TRUE = {"true", "1", "yes", "y", "t", "on"}
+_FALSE = {"false", "0", "no", "n", "f", "off"}
+
+
+def _as_bool(values, name):
+    import numpy as np
+
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in "iuf":
+        if not np.isin(values, (0, 1)).all():
+            raise ValueError(f"{name} must be a boolean")
+        return values == 1
+    text = np.char.lower(np.char.strip(values.astype(str)))
+    truthy = np.isin(text, list(_TRUE))
+    if not (truthy | np.isin(text, list(_FALSE))).all():
+        raise ValueError(f"{name} must be a boolean")
+    return truthy
+
+
+def _as_int(values, name):
+    import numpy as np
+
+    if values.dtype.kind in "iu":
+        return values.astype(np.int64)
+    try:
+        floats = values.astype(np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if not (np.isfinite(floats).all() and (floats == np.floor(floats)).all()):
+        raise ValueError(f"{name} must be an integer")
+    if np.abs(floats).max(initial=0) >= 2.0 ** 63:
+        raise ValueError(f"{name} out of int64 range")
+    return floats.astype(np.int64)
+
+
+def read_table(data: bytes, fmt: str) -> dict:
+    """
+    Columns from an uploaded CSV (with a header row) or Arrow IPC file.
+    Extra columns such as member_id are kept; missing score inputs raise ValueError.
+    """
+    import io
+
+    import numpy as np
+
+    if fmt == "csv":
+        import pandas as pd
+
+        frame = pd.read_csv(io.BytesIO(data), skipinitialspace=True)
+        columns = {str(name).strip(): frame[name].to_numpy() for name in frame.columns}
+    elif fmt == "arrow":
+        try:
+            import pyarrow.ipc
+        except ImportError:
+            raise ValueError("Arrow input requires the pyarrow package")
+        try:
+            table = pyarrow.ipc.open_file(io.BytesIO(data)).read_all()
+        except pyarrow.ArrowInvalid:
+            table = pyarrow.ipc.open_stream(io.BytesIO(data)).read_all()
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}")
+
+    missing = [name for name in COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    try:
+        columns["land_size_acres"] = columns["land_size_acres"].astype(np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("land_size_acres must be a number")
+    columns["past_defaults"] = _as_int(columns["past_defaults"], "past_defaults")
+    columns["yield_history_years"] = _as_int(columns["yield_history_years"], "yield_history_years")
+    columns["kyc_status"] = _as_bool(columns["kyc_status"], "kyc_status")
+    return columns
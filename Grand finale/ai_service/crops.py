@@ -0,0 +1,87 @@
+"""
+Canonical oilseed, region and state names shared by the forecasting,
+ingestion, yield and weather-alert code.
+"""
+import re
+
+# Reference modal prices (INR/quintal), used when a crop has no price history
+BASE_PRICES = {
+    "soybean": 4500,
+    "groundnut": 6200,
+    "mustard": 5400,
+    "sunflower": 5800,
+    "sesame": 12000,
+    "castor": 6000,
+    "safflower": 5300,
+    "niger": 7000,
+    "linseed": 5700
+}
+DEFAULT_BASE_PRICE = 5000
+
+# Market/commodity spellings seen in Agmarknet dumps and client dropdowns
+CROP_ALIASES = {
+    "soyabean": "soybean",
+    "soya bean": "soybean",
+    "til": "sesame",
+    "gingelly": "sesame",
+    "sesamum": "sesame",
+    "rapeseed": "mustard",
+    "rapeseed & mustard": "mustard",
+    "rapeseed and mustard": "mustard",
+    "sarson": "mustard",
+    "groundnut pods": "groundnut",
+    "groundnut seed": "groundnut",
+    "sunflower seed": "sunflower",
+    "castor seed": "castor",
+    "kusum": "safflower",
+    "niger seed": "niger",
+    "alsi": "linseed",
+    "flaxseed": "linseed",
+}
+
+_PAREN = re.compile(r"\s*\(([^)]*)\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_crop(name: str) -> str:
+    """
+    Maps a free-text crop/commodity name to its canonical key,
+    e.g. "Sesame (Til)" -> "sesame", "Soyabean" -> "soybean".
+    """
+    key = _SPACES.sub(" ", name.strip().lower())
+    if key in BASE_PRICES:
+        return key
+    if key in CROP_ALIASES:
+        return CROP_ALIASES[key]
+    # "Sesame (Til)", "Til (Sesamum)": try the outer name, then the bracketed one
+    inner = _PAREN.findall(key)
+    outer = _PAREN.sub("", key).strip()
+    for candidate in [outer] + [s.strip() for s in inner]:
+        if candidate in BASE_PRICES:
+            return candidate
+        if candidate in CROP_ALIASES:
+            return CROP_ALIASES[candidate]
+    for crop in BASE_PRICES:
+        if crop in key:
+            return crop
+    return outer or key
+
+
+def normalize_region(name: str) -> str:
+    return _SPACES.sub(" ", name.strip().lower())
+
+
+# Abbreviations and old spellings of state names
+STATE_ALIASES = {
+    "mp": "madhya pradesh", "rj": "rajasthan", "gj": "gujarat", "mh": "maharashtra",
+    "ka": "karnataka", "ap": "andhra pradesh", "tg": "telangana", "ts": "telangana",
+    "tn": "tamil nadu", "up": "uttar pradesh", "hr": "haryana", "wb": "west bengal",
+    "od": "odisha", "or": "odisha", "orissa": "odisha", "pb": "punjab", "br": "bihar",
+    "jh": "jharkhand", "cg": "chhattisgarh", "ct": "chhattisgarh", "hp": "himachal pradesh",
+    "uk": "uttarakhand", "uttaranchal": "uttarakhand", "dl": "delhi", "nct of delhi": "delhi",
+}
+
+
+def normalize_state(name: str) -> str:
+    key = normalize_region(name)
+    return STATE_ALIASES.get(key, key)
@@ -0,0 +1,199 @@
+"""
+Shared worker pools for CPU-heavy jobs (route improvement, model fitting,
+image inference).
+
+Pools are created lazily on first use so workers that never run heavy jobs
+never spawn child processes.
+
+Request handlers don't touch the pools directly; they go through two lanes
+with admission control:
+
+* `run_cpu(fn, *args)` - heavy, self-contained jobs (single-vehicle routing,
+  forecast fits) on the process pool, or a thread pool of the same size with
+  BIOMETRIX_CPU_EXECUTOR=thread. Arguments and results must pickle.
+* `run_threaded(fn, *args)` - NumPy/Pillow work that releases the GIL, or
+  that itself fans out to the CPU lane (via `submit_cpu`), on the inference
+  thread pool.
+
+Each lane admits at most BIOMETRIX_{CPU,THREAD}_QUEUE_LIMIT jobs (queued plus
+running) and raises `Overloaded` beyond that; callers waiting longer than
+BIOMETRIX_JOB_TIMEOUT_S get `JobTimeout`. main.py maps those to 503 (with
+Retry-After) and 504. A timed-out job that already started keeps its slot
+until it finishes, so the limit reflects the real work on the pool.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from batching import Overloaded
+from metrics import REGISTRY, Counter, Gauge
+
+PROCESS_WORKERS = int(os.environ.get("BIOMETRIX_PROCESS_WORKERS", os.cpu_count() or 1))
+# Threads for NumPy/Pillow inference, which release the GIL in their hot loops
+INFERENCE_THREADS = int(os.environ.get("BIOMETRIX_INFERENCE_THREADS", min(4, os.cpu_count() or 1)))
+CPU_EXECUTOR = os.environ.get("BIOMETRIX_CPU_EXECUTOR", "process")     # "process" or "thread"
+CPU_QUEUE_LIMIT = int(os.environ.get("BIOMETRIX_CPU_QUEUE_LIMIT", max(1, PROCESS_WORKERS) * 8))
+THREAD_QUEUE_LIMIT = int(os.environ.get("BIOMETRIX_THREAD_QUEUE_LIMIT", max(1, INFERENCE_THREADS) * 16))
+JOB_TIMEOUT_S = float(os.environ.get("BIOMETRIX_JOB_TIMEOUT_S", "30"))
+# Process-pool workers run at a lower CPU priority so, when cores are scarce,
+# the kernel preempts them in favour of the event loop
+WORKER_NICE = int(os.environ.get("BIOMETRIX_WORKER_NICE", "10"))
+# Starlette's pool for plain `def` endpoints (anyio's default is 40)
+SYNC_ENDPOINT_THREADS = int(os.environ.get("BIOMETRIX_SYNC_THREADS", "40"))
+
+_process_pool = None
+_pool_lock = threading.Lock()
+_inference_pool = None
+_cpu_thread_pool = None
+
+
+def _init_worker(nice: int):
+    if nice and hasattr(os, "nice"):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        with _pool_lock:
+            if _process_pool is None:
+                # spawn, not fork: the parent runs an event loop and helper threads
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=max(1, PROCESS_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(WORKER_NICE,),
+                )
+    return _process_pool
+
+
+def get_inference_pool() -> ThreadPoolExecutor:
+    global _inference_pool
+    if _inference_pool is None:
+        with _pool_lock:
+            if _inference_pool is None:
+                _inference_pool = ThreadPoolExecutor(
+                    max_workers=max(1, INFERENCE_THREADS), thread_name_prefix="inference"
+                )
+    return _inference_pool
+
+
+def _get_cpu_thread_pool() -> ThreadPoolExecutor:
+    global _cpu_thread_pool
+    if _cpu_thread_pool is None:
+        with _pool_lock:
+            if _cpu_thread_pool is None:
+                _cpu_thread_pool = ThreadPoolExecutor(
+                    max_workers=max(1, PROCESS_WORKERS), thread_name_prefix="cpu"
+                )
+    return _cpu_thread_pool
+
+
+def get_cpu_pool():
+    return _get_cpu_thread_pool() if CPU_EXECUTOR == "thread" else get_process_pool()
+
+
+def shutdown():
+    global _process_pool, _inference_pool, _cpu_thread_pool
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+        if _inference_pool is not None:
+            _inference_pool.shutdown(wait=False, cancel_futures=True)
+            _inference_pool = None
+        if _cpu_thread_pool is not None:
+            _cpu_thread_pool.shutdown(wait=False, cancel_futures=True)
+            _cpu_thread_pool = None
+
+
+# --- Admission-controlled lanes ---
+
+class JobTimeout(Exception):
+    """Raised when a lane job doesn't finish within its timeout."""
+
+
+LANE_JOBS = REGISTRY.register(Gauge(
+    "biometrix_executor_jobs", "Jobs queued or running per executor lane.", ("lane",),
+))
+LANE_REJECTED = REGISTRY.register(Counter(
+    "biometrix_executor_rejected_total", "Jobs refused because the lane queue was full.", ("lane",),
+))
+LANE_TIMEOUTS = REGISTRY.register(Counter(
+    "biometrix_executor_timeouts_total", "Jobs whose caller gave up after the timeout.", ("lane",),
+))
+
+
+class _Lane:
+    def __init__(self, name: str, get_pool, limit: int):
+        self.name = name
+        self.get_pool = get_pool
+        self.limit = limit
+        self.jobs = 0
+        self._lock = threading.Lock()
+        LANE_JOBS.set(0, lane=name)
+
+    def _release(self, _future):
+        with self._lock:
+            self.jobs -= 1
+            LANE_JOBS.set(self.jobs, lane=self.name)
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.jobs >= self.limit:
+                LANE_REJECTED.inc(lane=self.name)
+                raise Overloaded(f"{self.name} lane has {self.jobs} jobs queued or running")
+            self.jobs += 1
+            LANE_JOBS.set(self.jobs, lane=self.name)
+        try:
+            future = self.get_pool().submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # Fires when the job really ends (or is cancelled before starting)
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, timeout_s: float = None):
+        future = self.submit(fn, *args)
+        try:
+            # Cancelling the wrapper on timeout cancels the job only if it hasn't started
+            timeout_s = JOB_TIMEOUT_S if timeout_s is None else timeout_s
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout_s)
+        except asyncio.TimeoutError:
+            LANE_TIMEOUTS.inc(lane=self.name)
+            raise JobTimeout(f"{getattr(fn, '__name__', 'job')} did not finish in time")
+
+
+_cpu_lane = _Lane("cpu", get_cpu_pool, CPU_QUEUE_LIMIT)
+_thread_lane = _Lane("thread", get_inference_pool, THREAD_QUEUE_LIMIT)
+
+
+async def run_cpu(fn, *args, timeout_s: float = None):
+    """Runs `fn(*args)` on the CPU lane (process pool by default)."""
+    return await _cpu_lane.run(fn, *args, timeout_s=timeout_s)
+
+
+def submit_cpu(fn, *args) -> Future:
+    """
+    `run_cpu` for code already running off the event loop (e.g. on the thread
+    lane): same admission limit and accounting, raising Overloaded when the
+    lane is full. The caller waits on the returned Future with its own timeout.
+    """
+    return _cpu_lane.submit(fn, *args)
+
+
+async def run_threaded(fn, *args, timeout_s: float = None):
+    """Runs `fn(*args)` on the inference thread lane."""
+    return await _thread_lane.run(fn, *args, timeout_s=timeout_s)
+
+
+def configure_sync_threads():
+    """Sizes Starlette's thread pool for `def` endpoints; call from the running event loop."""
+    import anyio.to_thread
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = max(1, SYNC_ENDPOINT_THREADS)
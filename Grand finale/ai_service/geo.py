@@ -0,0 +1,63 @@
+"""
+Vectorized great-circle (haversine) distances in kilometres over NumPy arrays.
+
+Every distance in the service goes through `haversine_km`; the helpers below
+only shape the inputs for the point-to-point, one-to-many and many-to-many
+cases so no caller needs a Python loop.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Element-wise haversine distance. Inputs are degrees and broadcast like any
+    NumPy ufunc, so scalars, 1-D arrays and (N, 1) x (1, M) grids all work.
+    """
+    phi1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    phi2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    lam1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lam2 = np.radians(np.asarray(lon2, dtype=np.float64))
+    # In-place ufuncs keep an N x M call down to two full-size temporaries
+    shape = np.broadcast_shapes(phi1.shape, phi2.shape, lam1.shape, lam2.shape)
+    a = np.empty(shape)
+    b = np.empty(shape)
+    np.subtract(phi2, phi1, out=a)
+    a *= 0.5
+    np.sin(a, out=a)
+    np.square(a, out=a)
+    np.subtract(lam2, lam1, out=b)
+    b *= 0.5
+    np.sin(b, out=b)
+    np.square(b, out=b)
+    b *= np.cos(phi1)
+    b *= np.cos(phi2)
+    a += b
+    np.clip(a, 0.0, 1.0, out=a)
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+    a *= 2 * EARTH_RADIUS_KM
+    return a[()]
+
+
+def point_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance between two points as a Python float."""
+    return float(haversine_km(lat1, lon1, lat2, lon2))
+
+
+def one_to_many(lat: float, lon: float, lats, lons) -> np.ndarray:
+    """Distances from one point to each of M points, shape (M,)."""
+    return haversine_km(lat, lon, lats, lons)
+
+
+def many_to_many(lats1, lons1, lats2, lons2) -> np.ndarray:
+    """N x M matrix of distances from each origin to each destination."""
+    lats1 = np.asarray(lats1, dtype=np.float64)
+    lons1 = np.asarray(lons1, dtype=np.float64)
+    return haversine_km(lats1[:, None], lons1[:, None], lats2, lons2)
+
+
+def distance_matrix(lats, lons) -> np.ndarray:
+    """Symmetric N x N distance matrix for one set of points."""
+    return many_to_many(lats, lons, lats, lons)
@@ -0,0 +1,348 @@
+"""
+Offline ingestion of Agmarknet-style mandi price dumps into a columnar store.
+
+    python ingest.py <dump_dir> [--store DIR]
+
+Reads every *.csv / *.html / *.htm / *.xls file under dump_dir (Agmarknet's
+"Excel" export is really an HTML table), streaming rows one at a time: CSV via
+csv.reader, HTML via lxml iterparse, clearing each <tr> once it is read.
+Commodity names go through crops.normalize_crop. Rows are buffered per crop
+and flushed as sorted (market, date) NumPy part files:
+
+    <store>/manifest.json          processed files, market/state dictionaries
+    <store>/<crop>/part-<file>-<seq>.npy
+
+Part files are plain .npy structured arrays, so readers memory-map them.
+A re-run skips files whose size and mtime are unchanged since their last
+ingestion. Readers only see parts whose file id the manifest has committed:
+every ingestion of a file writes under a fresh id (reserved in the manifest
+before the first part is written) and a changed file's old parts are dropped
+only after the new id is committed, so an interrupted run leaves the store
+as it was. Its orphaned parts are swept by the next run.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from crops import normalize_crop, normalize_region
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get(
+    "BIOMETRIX_PRICE_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "price_store"),
+)
+MANIFEST = "manifest.json"
+SOURCE_EXTENSIONS = (".csv", ".html", ".htm", ".xls")
+
+RECORD_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("market", np.int32),
+    ("state", np.int16),
+    ("min_price", np.float32),
+    ("max_price", np.float32),
+    ("modal_price", np.float32),
+    ("arrivals", np.float32),     # tonnes; NaN when the dump has no arrivals column
+])
+
+# Header spellings across Agmarknet reports and the data.gov.in price API
+_HEADER_ALIASES = {
+    "state": "state", "statename": "state",
+    "district": "district", "districtname": "district",
+    "market": "market", "marketname": "market",
+    "commodity": "commodity",
+    "minprice": "min_price", "minpricersquintal": "min_price", "minx0020price": "min_price",
+    "maxprice": "max_price", "maxpricersquintal": "max_price", "maxx0020price": "max_price",
+    "modalprice": "modal_price", "modalpricersquintal": "modal_price", "modalx0020price": "modal_price",
+    "pricedate": "date", "arrivaldate": "date", "reporteddate": "date", "date": "date",
+    "arrivals": "arrivals", "arrivalstonnes": "arrivals",
+}
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+_NAN = float("nan")
+_DATE_FORMATS = ("%d %b %Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d-%b-%Y", "%d %B %Y")
+
+
+def _header_key(name: str) -> Optional[str]:
+    return _HEADER_ALIASES.get(_NON_ALNUM.sub("", name.lower()))
+
+
+@lru_cache(maxsize=8192)
+def parse_date(text: str) -> Optional[np.datetime64]:
+    text = text.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return np.datetime64(datetime.strptime(text, fmt).date(), "D")
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _crop_key(commodity: str) -> str:
+    return normalize_crop(commodity)
+
+
+def _to_float(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        try:
+            return float(text.replace(",", "").strip())
+        except ValueError:
+            return _NAN
+
+
+class PriceRecord(NamedTuple):
+    crop: str
+    state: str
+    market: str
+    date: np.datetime64
+    min_price: float
+    max_price: float
+    modal_price: float
+    arrivals: float
+
+
+def _rows_to_records(rows: Iterator[List[str]]) -> Iterator[PriceRecord]:
+    """Maps raw table rows to records once a recognisable header row is seen."""
+    columns = None
+    for row in rows:
+        if columns is None:
+            keys = [_header_key(cell) for cell in row]
+            if "commodity" in keys and "modal_price" in keys and "date" in keys:
+                columns = {key: i for i, key in enumerate(keys) if key}
+                width = max(columns.values())
+                get = {key: columns.get(key) for key in ("state", "market", "min_price", "max_price", "arrivals")}
+                i_date, i_modal, i_crop = columns["date"], columns["modal_price"], columns["commodity"]
+            continue
+        if len(row) <= width:
+            continue
+        day = parse_date(row[i_date])
+        modal = _to_float(row[i_modal])
+        if day is None or modal != modal:
+            continue
+        yield PriceRecord(
+            _crop_key(row[i_crop]),
+            row[get["state"]].strip() if get["state"] is not None else "",
+            row[get["market"]].strip() if get["market"] is not None else "",
+            day,
+            _to_float(row[get["min_price"]]) if get["min_price"] is not None else modal,
+            _to_float(row[get["max_price"]]) if get["max_price"] is not None else modal,
+            modal,
+            _to_float(row[get["arrivals"]]) if get["arrivals"] is not None else _NAN,
+        )
+
+
+def _csv_rows(path: str) -> Iterator[List[str]]:
+    with open(path, newline="", encoding="utf-8", errors="replace") as fh:
+        yield from csv.reader(fh)
+
+
+def _html_rows(path: str) -> Iterator[List[str]]:
+    from lxml import etree
+
+    for _, tr in etree.iterparse(path, events=("end",), tag="tr", html=True, recover=True):
+        yield [
+            ((cell.text or "") if len(cell) == 0 else "".join(cell.itertext())).strip()
+            for cell in tr if cell.tag in ("td", "th")
+        ]
+        # Free the row and any already-processed siblings so memory stays flat
+        tr.clear()
+        while tr.getprevious() is not None:
+            del tr.getparent()[0]
+
+
+def iter_records(path: str) -> Iterator[PriceRecord]:
+    """Streams normalised price records out of one dump file."""
+    if path.lower().endswith(".csv"):
+        return _rows_to_records(_csv_rows(path))
+    return _rows_to_records(_html_rows(path))
+
+
+@dataclass
+class IngestStats:
+    files_seen: int = 0
+    files_ingested: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class PriceStore:
+    """Append-only store of per-crop .npy partitions plus a JSON manifest."""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        path = os.path.join(root, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as fh:
+                self.manifest = json.load(fh)
+        else:
+            self.manifest = {"files": {}, "markets": [], "states": [], "next_file_id": 0}
+        self._market_ids = {m: i for i, m in enumerate(self.manifest["markets"])}
+        self._state_ids = {s: i for i, s in enumerate(self.manifest["states"])}
+
+    @classmethod
+    def exists(cls, root: str = STORE_DIR) -> bool:
+        return os.path.exists(os.path.join(root, MANIFEST))
+
+    def market_id(self, name: str) -> int:
+        if name not in self._market_ids:
+            self._market_ids[name] = len(self.manifest["markets"])
+            self.manifest["markets"].append(name)
+        return self._market_ids[name]
+
+    def state_id(self, name: str) -> int:
+        state = self._state_ids.get(name)
+        if state is None:
+            key = normalize_region(name)
+            if key not in self._state_ids:
+                self._state_ids[key] = len(self.manifest["states"])
+                self.manifest["states"].append(key)
+            state = self._state_ids[name] = self._state_ids[key]
+        return state
+
+    def is_current(self, path: str) -> bool:
+        entry = self.manifest["files"].get(os.path.abspath(path))
+        st = os.stat(path)
+        return entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+    def write_part(self, crop: str, file_id: int, seq: int, records: np.ndarray):
+        records.sort(order=["market", "date"])
+        crop_dir = os.path.join(self.root, crop)
+        os.makedirs(crop_dir, exist_ok=True)
+        final = os.path.join(crop_dir, f"part-{file_id:06d}-{seq:04d}.npy")
+        tmp = final + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.save(fh, records)
+        os.replace(tmp, final)
+
+    def drop_file_parts(self, file_id: int):
+        suffix = f"part-{file_id:06d}-"
+        for crop in self.crops():
+            crop_dir = os.path.join(self.root, crop)
+            for name in os.listdir(crop_dir):
+                if name.startswith(suffix):
+                    os.remove(os.path.join(crop_dir, name))
+
+    def drop_uncommitted_parts(self):
+        """Removes parts left behind by interrupted runs."""
+        committed = {entry["file_id"] for entry in self.manifest["files"].values()}
+        for crop in self.crops():
+            crop_dir = os.path.join(self.root, crop)
+            for name in os.listdir(crop_dir):
+                if name.startswith("part-") and int(name.split("-")[1]) not in committed:
+                    os.remove(os.path.join(crop_dir, name))
+
+    def mark_ingested(self, path: str, file_id: int, rows: int):
+        st = os.stat(path)
+        self.manifest["files"][os.path.abspath(path)] = {
+            "file_id": file_id, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "rows": rows,
+        }
+        self.save_manifest()
+
+    def save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w") as fh:
+            json.dump(self.manifest, fh)
+        os.replace(path + ".tmp", path)
+
+    def crops(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def read(self, crop: str) -> np.ndarray:
+        """All records for a crop; parts are memory-mapped, then concatenated."""
+        crop_dir = os.path.join(self.root, crop)
+        committed = {entry["file_id"] for entry in self.manifest["files"].values()}
+        parts = [
+            np.load(os.path.join(crop_dir, name), mmap_mode="r")
+            for name in sorted(os.listdir(crop_dir))
+            if name.endswith(".npy") and int(name.split("-")[1]) in committed
+        ]
+        if not parts:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def ingest_file(self, path: str, batch_rows: int = 50_000) -> int:
+        previous = self.manifest["files"].get(os.path.abspath(path))
+        # Reserve a fresh id before writing any part, so a crash can never leave
+        # parts under an id a later run hands to another file
+        file_id = self.manifest["next_file_id"]
+        self.manifest["next_file_id"] += 1
+        self.save_manifest()
+        self.drop_file_parts(file_id)
+
+        buffers: Dict[str, List[tuple]] = {}
+        seq = 0
+        rows = 0
+        for rec in iter_records(path):
+            buf = buffers.setdefault(rec.crop, [])
+            buf.append((
+                rec.date, self.market_id(rec.market), self.state_id(rec.state),
+                rec.min_price, rec.max_price, rec.modal_price, rec.arrivals,
+            ))
+            rows += 1
+            if len(buf) >= batch_rows:
+                self.write_part(rec.crop, file_id, seq, np.array(buf, dtype=RECORD_DTYPE))
+                seq += 1
+                buf.clear()
+        for crop, buf in buffers.items():
+            if buf:
+                self.write_part(crop, file_id, seq, np.array(buf, dtype=RECORD_DTYPE))
+                seq += 1
+        # Only now is the file committed; parts of an interrupted run stay invisible to read()
+        self.mark_ingested(path, file_id, rows)
+        if previous is not None:
+            # Changed since last run: its old parts are superseded
+            self.drop_file_parts(previous["file_id"])
+        return rows
+
+
+def discover(source_dir: str) -> Iterator[str]:
+    for dirpath, _, filenames in os.walk(source_dir):
+        for name in sorted(filenames):
+            if name.lower().endswith(SOURCE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def ingest(source_dir: str, store_dir: str = STORE_DIR, batch_rows: int = 50_000) -> IngestStats:
+    """Ingests every new or changed dump under source_dir into the store."""
+    store = PriceStore(store_dir)
+    store.drop_uncommitted_parts()
+    stats = IngestStats()
+    started = time.perf_counter()
+    for path in discover(source_dir):
+        stats.files_seen += 1
+        if store.is_current(path):
+            continue
+        stats.rows += store.ingest_file(path, batch_rows)
+        stats.files_ingested += 1
+        logger.info("Ingested %s", path)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source_dir")
+    parser.add_argument("--store", default=STORE_DIR)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = ingest(args.source_dir, args.store)
+    print(f"{result.files_ingested}/{result.files_seen} files, {result.rows} rows, {result.rows_per_sec:,.0f} rows/s")
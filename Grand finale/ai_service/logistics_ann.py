@@ -0,0 +1,169 @@
+"""
+Logistics ANN (Distance, Weight -> Cost, ETA) with a versioned model artifact.
+
+The network is trained offline with ``python logistics_ann.py`` and saved as
+plain NumPy arrays (layer weights + scaler statistics) together with a
+SHA-256 checksum. Workers load that artifact lazily on first use and run the
+forward pass in NumPy, so scikit-learn is only needed when no artifact exists
+and the model has to be fitted in-process.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+from artifacts import ArtifactError, load_arrays, save_arrays
+from metrics import INFERENCE_ROWS, INFERENCE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+MODEL_DIR = os.environ.get(
+    "BIOMETRIX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"),
+)
+ARTIFACT_PATH = os.path.join(MODEL_DIR, f"logistics_ann-v{ARTIFACT_VERSION}.npz")
+
+# Synthetic training data based on Indian logistics standards
+# [Distance(km), Weight(tons)] -> [Cost(INR), ETA(hours)]
+TRAIN_X = np.array([
+    [50, 1], [100, 1], [200, 1], [500, 1], [1000, 1],
+    [50, 5], [100, 5], [200, 5], [500, 5], [1000, 5],
+    [50, 10], [100, 10], [200, 10], [500, 10], [1000, 10],
+    [1200, 15], [800, 20], [300, 2], [150, 0.5]
+])
+# Cost approx: Base 500 + (Dist * 15) + (Weight * 200)
+# ETA approx: Base 2 + (Dist / 40) + (Weight * 0.5)
+TRAIN_Y = np.array([
+    [1500, 4], [2500, 5], [4000, 8], [9000, 15], [17000, 28],
+    [2500, 5], [3500, 6], [5000, 9], [10000, 16], [18000, 29],
+    [3500, 6], [4500, 7], [6000, 10], [11000, 17], [19000, 30],
+    [25000, 35], [18000, 25], [6000, 10], [3000, 6]
+])
+
+
+class LogisticsANN:
+    def __init__(self, coefs, intercepts, x_mean, x_scale, y_mean, y_scale):
+        self.coefs = [np.asarray(c, dtype=np.float64) for c in coefs]
+        self.intercepts = [np.asarray(b, dtype=np.float64) for b in intercepts]
+        self.x_mean = np.asarray(x_mean, dtype=np.float64)
+        self.x_scale = np.asarray(x_scale, dtype=np.float64)
+        self.y_mean = np.asarray(y_mean, dtype=np.float64)
+        self.y_scale = np.asarray(y_scale, dtype=np.float64)
+
+    @classmethod
+    def train(cls):
+        """Fits the Multi-layer Perceptron on the synthetic dataset."""
+        from sklearn.neural_network import MLPRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        scaler_X = StandardScaler()
+        scaler_y = StandardScaler()
+
+        X_scaled = scaler_X.fit_transform(TRAIN_X)
+        y_scaled = scaler_y.fit_transform(TRAIN_Y)
+
+        model = MLPRegressor(
+            hidden_layer_sizes=(10, 8),
+            activation='relu',
+            solver='adam',
+            max_iter=1000,
+            random_state=42
+        )
+        model.fit(X_scaled, y_scaled)
+        return cls(
+            model.coefs_, model.intercepts_,
+            scaler_X.mean_, scaler_X.scale_,
+            scaler_y.mean_, scaler_y.scale_,
+        )
+
+    def _arrays(self) -> dict:
+        arrays = {
+            "x_mean": self.x_mean, "x_scale": self.x_scale,
+            "y_mean": self.y_mean, "y_scale": self.y_scale,
+        }
+        for i, (w, b) in enumerate(zip(self.coefs, self.intercepts)):
+            arrays[f"coef_{i}"] = w
+            arrays[f"intercept_{i}"] = b
+        return arrays
+
+    def save(self, path: str = ARTIFACT_PATH):
+        save_arrays(path, self._arrays(), ARTIFACT_VERSION)
+
+    @classmethod
+    def load(cls, path: str = ARTIFACT_PATH):
+        arrays = load_arrays(path, ARTIFACT_VERSION)
+        n_layers = sum(1 for key in arrays if key.startswith("coef_"))
+        return cls(
+            [arrays[f"coef_{i}"] for i in range(n_layers)],
+            [arrays[f"intercept_{i}"] for i in range(n_layers)],
+            arrays["x_mean"], arrays["x_scale"],
+            arrays["y_mean"], arrays["y_scale"],
+        )
+
+    def _forward(self, X: np.ndarray) -> np.ndarray:
+        # Same maths as MLPRegressor.predict: ReLU hidden layers, identity output
+        a = (X - self.x_mean) / self.x_scale
+        last = len(self.coefs) - 1
+        for i, (w, b) in enumerate(zip(self.coefs, self.intercepts)):
+            a = a @ w + b
+            if i != last:
+                np.maximum(a, 0, out=a)
+        return a * self.y_scale + self.y_mean
+
+    def predict_many(self, distances, weights) -> np.ndarray:
+        """
+        Scores N (distance, weight) pairs in one matrix pass.
+        Returns an (N, 2) float array of unrounded [cost, eta] predictions.
+        """
+        with INFERENCE_SECONDS.time(model="logistics_ann"):
+            X = np.column_stack((
+                np.asarray(distances, dtype=np.float64).ravel(),
+                np.asarray(weights, dtype=np.float64).ravel(),
+            ))
+            prediction = self._forward(X)
+        INFERENCE_ROWS.inc(len(X), model="logistics_ann")
+        return prediction
+
+    def predict(self, distance, weight):
+        prediction = self.predict_many([distance], [weight])
+        return {
+            "predicted_cost": round(float(prediction[0][0]), 2),
+            "predicted_eta": round(float(prediction[0][1]), 1)
+        }
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_logistics_ann() -> LogisticsANN:
+    """
+    Returns the process-wide model, loading the artifact on first use.
+    Falls back to training (and persisting) only when no valid artifact exists.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_or_train()
+    return _model
+
+
+def _load_or_train(path: str = ARTIFACT_PATH) -> LogisticsANN:
+    try:
+        return LogisticsANN.load(path)
+    except ArtifactError as e:
+        logger.warning("%s; training LogisticsANN in-process", e)
+    model = LogisticsANN.train()
+    try:
+        model.save(path)
+    except OSError as e:
+        logger.warning("Could not persist LogisticsANN artifact: %s", e)
+    return model
+
+
+if __name__ == "__main__":
+    LogisticsANN.train().save(ARTIFACT_PATH)
+    print(f"Saved {ARTIFACT_PATH}")
@@ -0,0 +1,416 @@
+"""
+Monthly market rollups behind /demand-supply.
+
+For every (crop, region, month) the store keeps running sums of modal price,
+price observations, mandi arrivals and imports (tonnes). Sources are folded
+in as partitions:
+
+    price store part files (see ingest.py)    modal prices and arrivals
+    <trade dir>/*.csv                          month, crop, region, arrivals_tonnes, imports_tonnes
+
+The sample price history and data/oilseed_trade_sample.csv stand in when
+there is no price store or trade directory. Each partition is folded in once
+(one bincount per field), and the sums are persisted with the list of folded
+partitions, so a refresh reads only partitions that landed since the last
+one. A partition that changed or disappeared forces a full rebuild.
+
+What a request needs is derived from the sums in one vectorised pass per
+refresh: price z-scores against the trailing 12 months, arrivals against
+their seasonal norm, and prefix sums of arrivals and imports. A query is then
+a few array lookups, whatever the length of the history.
+
+    python market_rollups.py [--rebuild]
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from artifacts import ArtifactError, load_arrays, save_arrays
+from crops import normalize_crop, normalize_region
+from ingest import STORE_DIR, PriceStore
+from price_forecast import HISTORY_PATH, NATIONAL_REGION
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ROLLUP_PATH = os.environ.get("BIOMETRIX_ROLLUP_PATH", os.path.join(DATA_DIR, "rollups", "market_rollups-v1.npz"))
+TRADE_DIR = os.environ.get("BIOMETRIX_TRADE_DIR", os.path.join(DATA_DIR, "trade"))
+TRADE_SAMPLE = os.path.join(DATA_DIR, "oilseed_trade_sample.csv")
+# How often requests may trigger a scan for new partitions
+REFRESH_S = float(os.environ.get("BIOMETRIX_ROLLUP_REFRESH_S", "60"))
+VERSION = 1
+
+PRICE_SUM, PRICE_N, ARRIVALS, IMPORTS = range(4)
+_FIELDS = 4
+
+ZSCORE_WINDOW = 12
+_ZSCORE_MIN_MONTHS = 6
+# High demand: prices well above the trailing year, or moderately above it
+# while arrivals fall short of their usual level for that month
+HIGH_DEMAND_Z = 1.0
+TIGHT_SUPPLY_Z = 0.5
+TIGHT_SUPPLY_RATIO = 0.8
+# Imports as a share of national supply (imports + mandi arrivals)
+DEPENDENCY_LEVELS = ((0.5, "High"), (0.2, "Medium"), (0.0, "Low"))
+DEFAULT_MONTHS = 12
+
+
+class Partition(NamedTuple):
+    key: str
+    path: str
+    kind: str               # "store", "history" or "trade"
+    signature: List[int]    # [size, mtime_ns]
+
+
+def _signature(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def discover(store_dir: str = STORE_DIR, trade_dir: str = TRADE_DIR,
+             history_path: str = HISTORY_PATH, trade_sample: str = TRADE_SAMPLE) -> List[Partition]:
+    """Every partition the rollups should currently contain."""
+    partitions = []
+    if PriceStore.exists(store_dir):
+        store = PriceStore(store_dir)
+        committed = {entry["file_id"] for entry in store.manifest["files"].values()}
+        for crop in store.crops():
+            crop_dir = os.path.join(store_dir, crop)
+            for name in sorted(os.listdir(crop_dir)):
+                if name.endswith(".npy") and int(name.split("-")[1]) in committed:
+                    path = os.path.join(crop_dir, name)
+                    partitions.append(Partition(f"store/{crop}/{name}", path, "store", _signature(path)))
+    elif os.path.exists(history_path):
+        partitions.append(Partition("history/" + os.path.basename(history_path), history_path, "history",
+                                    _signature(history_path)))
+
+    if os.path.isdir(trade_dir):
+        trade_files = [os.path.join(trade_dir, n) for n in sorted(os.listdir(trade_dir)) if n.endswith(".csv")]
+    else:
+        trade_files = [trade_sample] if os.path.exists(trade_sample) else []
+    for path in trade_files:
+        partitions.append(Partition("trade/" + os.path.basename(path), path, "trade", _signature(path)))
+    return partitions
+
+
+def read_partition(partition: Partition, store_dir: str = STORE_DIR):
+    """(crops, regions, months, price, arrivals, imports) columns; NaN where a field is absent."""
+    import pandas as pd
+
+    if partition.kind == "store":
+        crop = partition.key.split("/")[1]
+        states = np.array(PriceStore(store_dir).manifest["states"] or [""], dtype=object)
+        records = np.load(partition.path)
+        n = len(records)
+        return (np.full(n, crop, dtype=object), states[records["state"]],
+                records["date"].astype("datetime64[M]").astype(np.int64),
+                records["modal_price"].astype(np.float64), records["arrivals"].astype(np.float64),
+                np.full(n, np.nan))
+
+    if partition.kind == "history":
+        df = pd.read_csv(partition.path, usecols=["date", "crop", "region", "modal_price"], parse_dates=["date"])
+        price = df["modal_price"].to_numpy(dtype=np.float64)
+        arrivals = imports = np.full(len(df), np.nan)
+        months = df["date"].values.astype("datetime64[M]").astype(np.int64)
+    else:
+        df = pd.read_csv(partition.path, dtype={"month": str})
+        price = np.full(len(df), np.nan)
+        arrivals = pd.to_numeric(df.get("arrivals_tonnes"), errors="coerce").to_numpy(dtype=np.float64)
+        imports = pd.to_numeric(df.get("imports_tonnes"), errors="coerce").to_numpy(dtype=np.float64)
+        months = pd.to_datetime(df["month"]).values.astype("datetime64[M]").astype(np.int64)
+    crops = df["crop"].map(normalize_crop).to_numpy(dtype=object)
+    regions = df["region"].map(normalize_region).to_numpy(dtype=object)
+    return crops, regions, months, price, arrivals, imports
+
+
+class MarketRollups:
+    """(crop, region, month, field) sums plus the partitions folded into them."""
+
+    def __init__(self):
+        self.crops: List[str] = []
+        self.regions: List[str] = [NATIONAL_REGION]
+        self.month0 = 0                     # months since 1970-01 of sums[:, :, 0]
+        self.sums = np.zeros((0, 1, 0, _FIELDS))
+        self.partitions: Dict[str, List[int]] = {}
+
+    @property
+    def n_months(self) -> int:
+        return self.sums.shape[2]
+
+    @classmethod
+    def load(cls, path: str = ROLLUP_PATH) -> "MarketRollups":
+        arrays = load_arrays(path, VERSION)
+        meta = json.loads(arrays["meta"].tobytes().decode())
+        rollups = cls()
+        rollups.crops, rollups.regions = meta["crops"], meta["regions"]
+        rollups.month0, rollups.partitions = meta["month0"], meta["partitions"]
+        rollups.sums = arrays["sums"]
+        return rollups
+
+    def save(self, path: str = ROLLUP_PATH):
+        meta = {"crops": self.crops, "regions": self.regions, "month0": self.month0, "partitions": self.partitions}
+        save_arrays(path, {"sums": self.sums, "meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)},
+                    VERSION)
+
+    def _ids(self, names: np.ndarray, table: List[str]) -> np.ndarray:
+        import pandas as pd
+
+        # Hash-based factorize: far cheaper than sorting object arrays of names
+        codes, unique = pd.factorize(names)
+        index = {name: i for i, name in enumerate(table)}
+        for name in unique.tolist():
+            if name not in index:
+                index[name] = len(table)
+                table.append(name)
+        return np.array([index[name] for name in unique.tolist()], dtype=np.int64)[codes]
+
+    def _grow(self, first_month: int, last_month: int):
+        n_crops, n_regions, n_months, _ = self.sums.shape
+        if n_months == 0:
+            self.month0, before, after = first_month, 0, last_month - first_month + 1
+        else:
+            before = max(self.month0 - first_month, 0)
+            after = max(last_month - (self.month0 + n_months - 1), 0)
+        pad = ((0, len(self.crops) - n_crops), (0, len(self.regions) - n_regions), (before, after), (0, 0))
+        if any(p != (0, 0) for p in pad):
+            self.sums = np.pad(self.sums, pad)
+            self.month0 -= before
+
+    def fold(self, crops, regions, months, price, arrivals, imports):
+        """Adds one partition's rows to the sums."""
+        if len(months) == 0:
+            return
+        c = self._ids(crops, self.crops)
+        r = self._ids(regions, self.regions)
+        self._grow(int(months.min()), int(months.max()))
+        n_crops, n_regions, n_months, _ = self.sums.shape
+        flat = (c * n_regions + r) * n_months + (months - self.month0)
+        size = n_crops * n_regions * n_months
+        has_price = np.isfinite(price)
+        for field, idx, weights in (
+            (PRICE_SUM, flat[has_price], price[has_price]),
+            (PRICE_N, flat[has_price], None),
+            (ARRIVALS, flat, np.nan_to_num(arrivals)),
+            (IMPORTS, flat, np.nan_to_num(imports)),
+        ):
+            self.sums[..., field] += np.bincount(idx, weights=weights, minlength=size).reshape(
+                n_crops, n_regions, n_months)
+
+    def refresh(self, partitions: Optional[List[Partition]] = None, store_dir: str = STORE_DIR) -> int:
+        """Folds in partitions not seen before; returns how many were read."""
+        if partitions is None:
+            partitions = discover(store_dir)
+        current = {p.key: list(p.signature) for p in partitions}
+        if any(current.get(key) != sig for key, sig in self.partitions.items()):
+            # Sums can't un-fold a replaced partition: start over
+            logger.info("Market rollup partitions changed or were removed; rebuilding")
+            self.__init__()
+        new = [p for p in partitions if p.key not in self.partitions]
+        for partition in new:
+            self.fold(*read_partition(partition, store_dir))
+            self.partitions[partition.key] = list(partition.signature)
+        return len(new)
+
+    def view(self) -> "RollupView":
+        return RollupView(self)
+
+
+def _trailing_zscore(values: np.ndarray, window: int = ZSCORE_WINDOW) -> np.ndarray:
+    """z-score of each month against the `window` months before it (NaN-aware, along the last axis)."""
+    valid = np.isfinite(values)
+    filled = np.where(valid, values, 0.0)
+    zeros = np.zeros(values.shape[:-1] + (1,))
+    csum = np.concatenate([zeros, np.cumsum(filled, axis=-1)], axis=-1)
+    csq = np.concatenate([zeros, np.cumsum(filled * filled, axis=-1)], axis=-1)
+    cnt = np.concatenate([zeros, np.cumsum(valid, axis=-1)], axis=-1)
+    n_months = values.shape[-1]
+    end = np.arange(n_months)                  # window is [t - window, t)
+    start = np.maximum(end - window, 0)
+    n = cnt[..., end] - cnt[..., start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (csum[..., end] - csum[..., start]) / n
+        std = np.sqrt(np.maximum((csq[..., end] - csq[..., start]) / n - mean * mean, 0.0))
+        z = (values - mean) / std
+    z[(n < _ZSCORE_MIN_MONTHS) | ~(std > 0) | ~valid] = np.nan
+    return z
+
+
+def _dependency_level(share: Optional[float]) -> str:
+    if share is None:
+        return "Unknown"
+    return next(level for bound, level in DEPENDENCY_LEVELS if share >= bound)
+
+
+class RollupView:
+    """Immutable per-request view derived from MarketRollups in one vectorised pass."""
+
+    def __init__(self, rollups: MarketRollups):
+        self.crops = list(rollups.crops)
+        self.crop_ids = {c: i for i, c in enumerate(self.crops)}
+        self.region_ids = {r: i for i, r in enumerate(rollups.regions)}
+        self.regions = list(rollups.regions)
+        self.month0 = rollups.month0
+        self.n_months = rollups.n_months
+        nat = self.region_ids[NATIONAL_REGION]
+        sums = rollups.sums
+        price_sum, price_n = sums[..., PRICE_SUM].copy(), sums[..., PRICE_N].copy()
+        arrivals, imports = sums[..., ARRIVALS], sums[..., IMPORTS]
+
+        # National price: the explicit national series where there is one,
+        # otherwise the mean over every market's observations
+        explicit = price_n[:, nat] > 0
+        price_sum[:, nat] = np.where(explicit, price_sum[:, nat], price_sum.sum(axis=1))
+        price_n[:, nat] = np.where(explicit, price_n[:, nat], price_n.sum(axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.price = np.where(price_n > 0, price_sum / price_n, np.nan)
+        self.price_z = _trailing_zscore(self.price)
+
+        # National arrivals sum the regions; imports are national whichever row carries them
+        supply = arrivals.copy()
+        supply[:, nat] = arrivals.sum(axis=1)
+        observed = np.where(supply > 0, supply, np.nan)
+        norm = np.full(supply.shape, np.nan)
+        month_of_year = (self.month0 + np.arange(self.n_months)) % 12
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for moy in range(12):
+                cols = month_of_year == moy
+                same_month = observed[..., cols]
+                seen = np.isfinite(same_month).sum(axis=-1, keepdims=True)
+                norm[..., cols] = np.where(seen > 0, np.nansum(same_month, axis=-1, keepdims=True) / seen, np.nan)
+            supply_ratio = supply / norm
+        self.high_demand = (self.price_z >= HIGH_DEMAND_Z) | (
+            (self.price_z >= TIGHT_SUPPLY_Z) & (supply_ratio <= TIGHT_SUPPLY_RATIO))
+
+        zeros = np.zeros((len(self.crops), 1))
+        # Arrivals per (crop, region); imports are only known nationally
+        self.cum_arrivals = np.concatenate([np.zeros(supply.shape[:2] + (1,)), np.cumsum(supply, axis=2)], axis=2)
+        self.cum_imports = np.concatenate([zeros, np.cumsum(imports.sum(axis=1), axis=1)], axis=1)
+        has_data = (price_n.sum(axis=1) > 0) | (supply[:, nat] > 0)      # (crops, months)
+        months_with_data = np.flatnonzero(has_data.any(axis=0))
+        self.last_month = int(months_with_data[-1]) if len(months_with_data) else -1
+        self.crops_with_data = sorted(c for i, c in enumerate(self.crops) if has_data[i].any())
+        self.labels = [
+            np.datetime64(self.month0 + i, "M").astype(object).strftime("%B %Y") for i in range(self.n_months)
+        ]
+
+    def month_index(self, month: np.datetime64) -> int:
+        return int(month.astype("datetime64[M]").astype(np.int64)) - self.month0
+
+    def query(self, crop: Optional[str] = None, region: Optional[str] = None,
+              start: Optional[np.datetime64] = None, end: Optional[np.datetime64] = None) -> List[dict]:
+        """
+        One row per crop for months start..end inclusive (default: the last
+        DEFAULT_MONTHS months with data). Unknown regions fall back to the
+        national series. Arrivals, price z-scores and high-demand months are
+        the region's; imports and the import share are national (there are
+        no per-region import figures). Raises KeyError for a crop with no data.
+        """
+        nat = self.region_ids[NATIONAL_REGION]
+        if crop is not None:
+            key = normalize_crop(crop)
+            if key not in self.crops_with_data:
+                raise KeyError(crop)
+            crops = [key]
+        else:
+            crops = self.crops_with_data
+        region_key = normalize_region(region) if region else NATIONAL_REGION
+        r = self.region_ids.get(region_key, nat)
+
+        b = self.last_month + 1 if end is None else self.month_index(end) + 1
+        a = b - DEFAULT_MONTHS if start is None else self.month_index(start)
+        a, b = min(max(a, 0), self.n_months), min(max(b, 0), self.n_months)
+
+        rows = []
+        for key in crops:
+            c = self.crop_ids[key]
+            imports = float(self.cum_imports[c, b] - self.cum_imports[c, a])
+            arrivals = float(self.cum_arrivals[c, r, b] - self.cum_arrivals[c, r, a])
+            national_arrivals = float(self.cum_arrivals[c, nat, b] - self.cum_arrivals[c, nat, a])
+            supply = imports + national_arrivals
+            share = imports / supply if supply > 0 else None
+            latest_z = float(self.price_z[c, r, b - 1]) if b > a else float("nan")
+            rows.append({
+                "crop": key.title(),
+                "region": self.regions[r].title(),
+                "high_demand_periods": [self.labels[m] for m in (np.flatnonzero(self.high_demand[c, r, a:b]) + a)],
+                "import_dependency_level": _dependency_level(share),
+                "import_share": None if share is None else round(share, 3),
+                "import_scope": "national",
+                "arrivals_tonnes": round(arrivals, 1),
+                "national_arrivals_tonnes": round(national_arrivals, 1),
+                "imports_tonnes": round(imports, 1),
+                "price_zscore": round(latest_z, 2) if np.isfinite(latest_z) else None,
+                "period_start": str(np.datetime64(self.month0 + a, "M")) if b > a else None,
+                "period_end": str(np.datetime64(self.month0 + b - 1, "M")) if b > a else None,
+            })
+        return rows
+
+
+_rollups: Optional[MarketRollups] = None
+_view: Optional[RollupView] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _load_or_build(path: str = ROLLUP_PATH) -> MarketRollups:
+    try:
+        return MarketRollups.load(path)
+    except ArtifactError as e:
+        logger.info("%s; building market rollups from scratch", e)
+        return MarketRollups()
+
+
+def _refresh_locked():
+    global _rollups, _view, _checked_at
+    if _rollups is None:
+        _rollups = _load_or_build()
+    folded = _rollups.refresh()
+    if folded:
+        logger.info("Folded %d new partition(s) into the market rollups", folded)
+        try:
+            _rollups.save()
+        except OSError as e:
+            logger.warning("Could not persist market rollups: %s", e)
+    if folded or _view is None:
+        _view = _rollups.view()
+    _checked_at = time.monotonic()
+
+
+def get_rollup_view() -> RollupView:
+    """
+    The current view. At most every REFRESH_S a request scans for new
+    partitions; other requests keep serving the previous view meanwhile.
+    """
+    if _view is None or time.monotonic() - _checked_at > REFRESH_S:
+        # Only the very first caller has to wait for a refresh
+        if _lock.acquire(blocking=_view is None):
+            try:
+                if _view is None or time.monotonic() - _checked_at > REFRESH_S:
+                    _refresh_locked()
+            finally:
+                _lock.release()
+    return _view
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rebuild", action="store_true", help="ignore the persisted rollups")
+    parser.add_argument("--path", default=ROLLUP_PATH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    rollups = MarketRollups() if args.rebuild else _load_or_build(args.path)
+    started = time.perf_counter()
+    folded = rollups.refresh()
+    rollups.save(args.path)
+    print(f"{folded} new partition(s) folded in {time.perf_counter() - started:.2f} s; "
+          f"{len(rollups.crops)} crops x {len(rollups.regions)} regions x {rollups.n_months} months -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
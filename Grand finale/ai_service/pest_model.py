@@ -0,0 +1,336 @@
+"""
+Leaf-image pest classifier for /pest-detect.
+
+Uploads are decoded with Pillow (JPEG draft mode lets the decoder downscale
+while decompressing), resized to 64x64 RGB and written into a per-thread
+preallocated float32 batch buffer. Each image is reduced to colour and texture
+features (channel statistics, excess-green index, fractions of white / yellow /
+brown / dark pixels, gradient energy and Laplacian speckle) that a multinomial
+logistic regression scores in one matrix product per batch. Weights ship as a
+versioned artifact (see artifacts.py); scikit-learn is only needed to train.
+
+    python pest_model.py [--images DIR]
+
+retrains the artifact from labelled photos in DIR/<label>/ (none, aphids,
+whitefly, armyworm) or, without --images, from synthetic leaf renderings.
+"""
+import argparse
+import io
+import logging
+import os
+import threading
+from typing import List, Tuple
+
+import numpy as np
+
+from artifacts import ArtifactError, load_arrays, save_arrays
+from metrics import INFERENCE_ROWS, INFERENCE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+MODEL_DIR = os.environ.get(
+    "BIOMETRIX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"),
+)
+ARTIFACT_PATH = os.path.join(MODEL_DIR, f"pest_classifier-v{ARTIFACT_VERSION}.npz")
+
+IMAGE_SIZE = 64
+MAX_BATCH = 32
+MAX_PIXELS = 40_000_000  # reject decompression bombs before decoding
+
+LABELS = ("None", "Aphids", "Whitefly", "Armyworm")
+REMEDIES = {
+    "Aphids": "Spray Neem Oil (2%) or use Ladybird beetles as natural predators.",
+    "Whitefly": "Use Yellow Sticky Traps and spray Imidacloprid.",
+    "Armyworm": "Apply Bacillus thuringiensis (Bt) or Spinosad.",
+}
+
+_GRAY = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+class ImageDecodeError(ValueError):
+    """Raised when an upload is not a decodable image."""
+
+
+def decode_into(data: bytes, out: np.ndarray):
+    """Decodes one upload into `out`, an (IMAGE_SIZE, IMAGE_SIZE, 3) float32 slot in [0, 1]."""
+    from PIL import Image
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.width * img.height > MAX_PIXELS:
+            raise ImageDecodeError(f"Image has more than {MAX_PIXELS} pixels")
+        img.draft("RGB", (IMAGE_SIZE, IMAGE_SIZE))
+        img = img.convert("RGB").resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        if isinstance(e, ImageDecodeError):
+            raise
+        raise ImageDecodeError(f"Could not decode image ({type(e).__name__})") from e
+    np.multiply(np.asarray(img), np.float32(1 / 255), out=out, casting="unsafe")
+
+
+def extract_features(images: np.ndarray) -> np.ndarray:
+    """(N, S, S, 3) float images in [0, 1] -> (N, 18) feature matrix."""
+    n = len(images)
+    flat = images.reshape(n, -1, 3)
+    r, g, b = flat[..., 0], flat[..., 1], flat[..., 2]
+    v = flat.max(axis=2)
+    sat = (v - flat.min(axis=2)) / (v + 1e-6)
+    exg = 2 * g - r - b
+
+    gray = images @ _GRAY
+    dx = np.abs(np.diff(gray, axis=2))
+    dy = np.abs(np.diff(gray, axis=1))
+    lap = (4 * gray[:, 1:-1, 1:-1] - gray[:, :-2, 1:-1] - gray[:, 2:, 1:-1]
+           - gray[:, 1:-1, :-2] - gray[:, 1:-1, 2:])
+
+    return np.column_stack([
+        flat.mean(axis=1),
+        flat.std(axis=1),
+        exg.mean(axis=1),
+        exg.std(axis=1),
+        sat.mean(axis=1),
+        ((v > 0.75) & (sat < 0.25)).mean(axis=1),                          # white specks
+        ((r > 0.45) & (g > 0.45) & (b < 0.35)).mean(axis=1),               # chlorosis
+        ((r > g) & (g > b) & (sat > 0.3) & (v > 0.15) & (v < 0.65)).mean(axis=1),  # necrosis
+        (v < 0.15).mean(axis=1),                                           # holes, frass
+        dx.mean(axis=(1, 2)),
+        dy.mean(axis=(1, 2)),
+        lap.std(axis=(1, 2)),
+        (np.abs(lap) > 0.3).mean(axis=(1, 2)),                             # speckle density
+        (np.abs(lap) > 0.8).mean(axis=(1, 2)),
+    ]).astype(np.float32)
+
+# --- Synthetic training data ---
+
+def _spots(img, rng, yy, xx, centres, radii, colour, jitter=0.03):
+    for (cy, cx), radius in zip(centres, radii):
+        mask = (yy - cy) ** 2 + (xx - cx) ** 2 < radius ** 2
+        img[mask] = np.clip(colour + rng.normal(0, jitter, 3), 0, 1)
+
+
+def _clustered(rng, n_clusters, per_cluster, spread):
+    centres = rng.uniform(8, IMAGE_SIZE - 8, (n_clusters, 2))
+    points = np.repeat(centres, per_cluster, axis=0) + rng.normal(0, spread, (n_clusters * per_cluster, 2))
+    return np.clip(points, 0, IMAGE_SIZE - 1)
+
+
+def render_leaf(label: int, rng: np.random.Generator) -> np.ndarray:
+    """One synthetic (S, S, 3) uint8 leaf image showing the given pest class."""
+    yy, xx = np.mgrid[0:IMAGE_SIZE, 0:IMAGE_SIZE].astype(np.float32)
+    base = np.array([rng.uniform(0.15, 0.35), rng.uniform(0.4, 0.65), rng.uniform(0.08, 0.22)])
+    light = 1 + 0.15 * (rng.uniform(-1, 1) * xx + rng.uniform(-1, 1) * yy) / IMAGE_SIZE
+    img = base * light[..., None] + rng.normal(0, 0.03, (IMAGE_SIZE, IMAGE_SIZE, 3))
+    # Midrib
+    tilt = rng.uniform(-0.4, 0.4)
+    img[np.abs(xx - IMAGE_SIZE / 2 - tilt * (yy - IMAGE_SIZE / 2)) < 1.0] += 0.08
+    if rng.random() < 0.3:
+        # Natural blemishes on healthy and infested leaves alike
+        _spots(img, rng, yy, xx, rng.uniform(0, IMAGE_SIZE, (rng.integers(1, 3), 2)),
+               rng.uniform(1.5, 3, 2), np.array([0.45, 0.4, 0.15]))
+
+    if LABELS[label] == "Aphids":
+        patch = rng.uniform(10, IMAGE_SIZE - 10, 2)
+        weight = np.exp(-((yy - patch[0]) ** 2 + (xx - patch[1]) ** 2) / (2 * rng.uniform(8, 16) ** 2))
+        img += rng.uniform(0.3, 0.7) * weight[..., None] * (np.array([0.75, 0.7, 0.2]) - img)
+        points = _clustered(rng, rng.integers(2, 5), rng.integers(8, 20), rng.uniform(2, 5))
+        colour = np.array([0.08, 0.15, 0.05]) if rng.random() < 0.6 else np.array([0.55, 0.7, 0.2])
+        _spots(img, rng, yy, xx, points, rng.uniform(0.8, 1.5, len(points)), colour)
+    elif LABELS[label] == "Whitefly":
+        n = rng.integers(15, 60)
+        _spots(img, rng, yy, xx, rng.uniform(0, IMAGE_SIZE, (n, 2)), rng.uniform(0.7, 1.4, n),
+               np.array([0.93, 0.93, 0.88]))
+        if rng.random() < 0.4:
+            # Sooty mould on honeydew
+            patch = rng.uniform(0, IMAGE_SIZE, 2)
+            weight = np.exp(-((yy - patch[0]) ** 2 + (xx - patch[1]) ** 2) / (2 * 10.0 ** 2))
+            img *= 1 - 0.5 * weight[..., None]
+    elif LABELS[label] == "Armyworm":
+        n = rng.integers(2, 6)
+        centres = rng.uniform(4, IMAGE_SIZE - 4, (n, 2))
+        radii = rng.uniform(3, 9, n)
+        background = [np.array([0.45, 0.33, 0.2]), np.array([0.05, 0.05, 0.05]), np.array([0.8, 0.8, 0.75])]
+        _spots(img, rng, yy, xx, centres, radii + 1.5, np.array([0.45, 0.3, 0.12]))
+        _spots(img, rng, yy, xx, centres, radii, background[rng.integers(len(background))], jitter=0.01)
+        frass = rng.integers(5, 15)
+        _spots(img, rng, yy, xx, rng.uniform(0, IMAGE_SIZE, (frass, 2)), rng.uniform(1, 2, frass),
+               np.array([0.15, 0.1, 0.05]))
+
+    img *= rng.uniform(0.7, 1.2)
+    if rng.random() < 0.5:
+        img = img[:, ::-1]
+    return (np.clip(img, 0, 1) * 255).astype(np.uint8)
+
+
+def _camera_roundtrip(img: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Upscales to a photo-like size, JPEG-encodes and decodes back like an upload."""
+    from PIL import Image
+
+    size = (int(rng.integers(96, 800)), int(rng.integers(96, 800)))
+    buf = io.BytesIO()
+    Image.fromarray(img).resize(size, Image.BICUBIC).save(buf, "JPEG", quality=int(rng.integers(60, 96)))
+    out = np.empty((IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    decode_into(buf.getvalue(), out)
+    return (out * 255).astype(np.uint8)
+
+
+def synthetic_leaves(n_per_class: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    labels = np.repeat(np.arange(len(LABELS)), n_per_class)
+    images = np.stack([_camera_roundtrip(render_leaf(label, rng), rng) for label in labels])
+    return images, labels
+
+
+def load_image_dir(root: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Labelled photos from root/<label>/*; folder names match LABELS case-insensitively."""
+    by_name = {label.lower(): i for i, label in enumerate(LABELS)}
+    paths, labels = [], []
+    for name in sorted(os.listdir(root)):
+        if name.lower() in by_name and os.path.isdir(os.path.join(root, name)):
+            for file in sorted(os.listdir(os.path.join(root, name))):
+                paths.append(os.path.join(root, name, file))
+                labels.append(by_name[name.lower()])
+    images = np.empty((len(paths), IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    keep = []
+    for i, path in enumerate(paths):
+        with open(path, "rb") as fh:
+            try:
+                decode_into(fh.read(), images[i])
+                keep.append(i)
+            except ImageDecodeError as e:
+                logger.warning("Skipping %s: %s", path, e)
+    return (images[keep] * 255).astype(np.uint8), np.array(labels)[keep]
+
+# --- Model ---
+
+class PestClassifier:
+    def __init__(self, coef, intercept, x_mean, x_scale):
+        self.coef = np.asarray(coef, dtype=np.float32)
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.x_mean = np.asarray(x_mean, dtype=np.float32)
+        self.x_scale = np.asarray(x_scale, dtype=np.float32)
+
+    @classmethod
+    def train(cls, images: np.ndarray = None, labels: np.ndarray = None, seed: int = 0):
+        """Fits on (N, S, S, 3) uint8 images; defaults to synthetic leaves."""
+        from sklearn.linear_model import LogisticRegression
+
+        if images is None:
+            images, labels = synthetic_leaves(300, seed)
+        X = extract_features(images.astype(np.float32) / 255)
+        x_mean = X.mean(axis=0)
+        x_scale = X.std(axis=0)
+        x_scale[x_scale == 0] = 1.0
+        model = LogisticRegression(C=1.0, max_iter=2000)
+        model.fit((X - x_mean) / x_scale, labels)
+        return cls(model.coef_, model.intercept_, x_mean, x_scale)
+
+    def save(self, path: str = ARTIFACT_PATH):
+        save_arrays(path, {
+            "coef": self.coef, "intercept": self.intercept,
+            "x_mean": self.x_mean, "x_scale": self.x_scale,
+            "labels": np.array(LABELS),
+        }, ARTIFACT_VERSION)
+
+    @classmethod
+    def load(cls, path: str = ARTIFACT_PATH):
+        arrays = load_arrays(path, ARTIFACT_VERSION)
+        if tuple(arrays["labels"].tolist()) != LABELS:
+            raise ArtifactError(f"Artifact labels {arrays['labels'].tolist()} != {list(LABELS)}")
+        return cls(arrays["coef"], arrays["intercept"], arrays["x_mean"], arrays["x_scale"])
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """(N, F) features -> (N, len(LABELS)) class probabilities."""
+        with INFERENCE_SECONDS.time(model="pest_classifier"):
+            logits = ((features - self.x_mean) / self.x_scale) @ self.coef.T + self.intercept
+            logits -= logits.max(axis=1, keepdims=True)
+            np.exp(logits, out=logits)
+            logits /= logits.sum(axis=1, keepdims=True)
+        INFERENCE_ROWS.inc(len(logits), model="pest_classifier")
+        return logits
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_pest_classifier() -> PestClassifier:
+    """Process-wide classifier, loaded from the artifact on first use (trained if missing)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_or_train()
+    return _model
+
+
+def _load_or_train(path: str = ARTIFACT_PATH) -> PestClassifier:
+    try:
+        return PestClassifier.load(path)
+    except ArtifactError as e:
+        logger.warning("%s; training PestClassifier in-process", e)
+    model = PestClassifier.train()
+    try:
+        model.save(path)
+    except OSError as e:
+        logger.warning("Could not persist PestClassifier artifact: %s", e)
+    return model
+
+# --- Batch inference ---
+
+_buffers = threading.local()
+
+
+def _batch_buffer() -> np.ndarray:
+    # One buffer per inference thread, allocated on its first batch
+    buffer = getattr(_buffers, "images", None)
+    if buffer is None:
+        buffer = _buffers.images = np.empty((MAX_BATCH, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    return buffer
+
+
+def classify_batch(uploads: List[bytes]) -> List[object]:
+    """
+    Decodes and classifies raw uploads. Returns one (label, confidence) tuple
+    per upload, or an ImageDecodeError for uploads that are not images.
+    """
+    model = get_pest_classifier()
+    buffer = _batch_buffer()
+    results: List[object] = [None] * len(uploads)
+    for start in range(0, len(uploads), MAX_BATCH):
+        decoded = []
+        for i in range(start, min(start + MAX_BATCH, len(uploads))):
+            try:
+                decode_into(uploads[i], buffer[len(decoded)])
+                decoded.append(i)
+            except ImageDecodeError as e:
+                results[i] = e
+        if not decoded:
+            continue
+        proba = model.predict_proba(extract_features(buffer[:len(decoded)]))
+        best = proba.argmax(axis=1)
+        for i, k, p in zip(decoded, best.tolist(), proba[np.arange(len(decoded)), best].tolist()):
+            results[i] = (LABELS[k], p)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the pest classifier artifact")
+    parser.add_argument("--images", help="directory of labelled photos, one sub-folder per label")
+    parser.add_argument("--out", default=ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    if args.images:
+        images, labels = load_image_dir(args.images)
+    else:
+        images, labels = synthetic_leaves(300, seed=0)
+    order = np.random.default_rng(1).permutation(len(labels))
+    split = int(len(order) * 0.8)
+    held_out = PestClassifier.train(images[order[:split]], labels[order[:split]])
+    X_test = extract_features(images[order[split:]].astype(np.float32) / 255)
+    accuracy = (held_out.predict_proba(X_test).argmax(axis=1) == labels[order[split:]]).mean()
+    print(f"Held-out accuracy: {accuracy:.3f} on {len(order) - split} images")
+
+    PestClassifier.train(images, labels).save(args.out)
+    print(f"Saved {args.out}")
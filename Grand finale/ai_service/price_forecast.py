@@ -0,0 +1,337 @@
+"""
+Oilseed price forecasting for /forecast-price.
+
+Weekly modal prices per (crop, region) come from the ingested price store
+(see ingest.py) or, when none exists, from a sample CSV (date, crop, region,
+modal_price; see data/mandi_prices.csv). Each series is
+split into a 52-week seasonal profile (classical decomposition around a 2x52
+centred moving average) and a deseasonalised remainder fitted with damped
+Holt exponential smoothing. The smoothing constants are picked by grid search
+with every candidate evaluated in the same array pass. Fitted parameters are
+kept in a TTL-bounded LRU cache so repeated dashboard hits never refit.
+"""
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import AsyncIterator, Dict, List, Tuple
+
+import numpy as np
+
+from crops import BASE_PRICES, DEFAULT_BASE_PRICE, normalize_crop, normalize_region
+from ingest import STORE_DIR, PriceStore
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = os.environ.get(
+    "BIOMETRIX_PRICE_HISTORY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "mandi_prices.csv"),
+)
+NATIONAL_REGION = "all india"
+SEASON = 52
+FORECAST_WEEKS = 26
+PRICE_FLOOR = 0.2           # simulated prices never drop below this share of the point forecast
+
+# Holt smoothing grid: level, trend and damping constants
+_ALPHAS = np.linspace(0.05, 0.95, 19)
+_BETAS = np.linspace(0.01, 0.4, 14)
+_PHIS = np.array([0.9, 0.95, 0.98, 1.0])
+
+
+@dataclass(frozen=True, eq=False)
+class FittedModel:
+    level: float
+    trend: float
+    phi: float
+    sigma: float                # std-dev of one-step-ahead errors (INR)
+    seasonal: np.ndarray        # (52,) additive week-of-year profile
+    last_date: np.datetime64
+    n_obs: int
+    alpha: float = 1.0          # smoothing constants, for simulating forecast paths
+    beta: float = 0.0
+
+
+def week_of_year(dates: np.ndarray) -> np.ndarray:
+    days = dates.astype("datetime64[D]")
+    doy = (days - days.astype("datetime64[Y]")).astype(np.int64)
+    return np.minimum(doy // 7, SEASON - 1)
+
+
+def fit_series(dates: np.ndarray, prices: np.ndarray) -> FittedModel:
+    """Fits seasonal profile + damped Holt smoothing to one weekly series."""
+    prices = np.asarray(prices, dtype=np.float64)
+    woy = week_of_year(dates)
+    n = len(prices)
+
+    seasonal = np.zeros(SEASON)
+    if n >= 2 * SEASON:
+        kernel = np.r_[0.5, np.ones(SEASON - 1), 0.5] / SEASON
+        trend_cycle = np.convolve(prices, kernel, mode="valid")
+        offset = SEASON // 2
+        detrended = prices[offset:offset + len(trend_cycle)] - trend_cycle
+        weeks = woy[offset:offset + len(trend_cycle)]
+        sums = np.bincount(weeks, weights=detrended, minlength=SEASON)
+        counts = np.bincount(weeks, minlength=SEASON)
+        seasonal = np.divide(sums, counts, out=np.zeros(SEASON), where=counts > 0)
+        seasonal[counts > 0] -= seasonal[counts > 0].mean()
+
+    y = prices - seasonal[woy]
+    if n < 3:
+        return FittedModel(float(y[-1]), 0.0, 1.0, 0.0, seasonal, dates[-1], n)
+
+    alpha, beta, phi = (g.ravel() for g in np.meshgrid(_ALPHAS, _BETAS, _PHIS, indexing="ij"))
+    level = np.full(alpha.shape, y[0])
+    trend = np.full(alpha.shape, np.mean(np.diff(y[:min(n, 5)])))
+    sse = np.zeros(alpha.shape)
+    for t in range(1, n):
+        pred = level + phi * trend
+        err = y[t] - pred
+        sse += err * err
+        new_level = alpha * y[t] + (1 - alpha) * pred
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+
+    best = int(np.argmin(sse))
+    return FittedModel(
+        level=float(level[best]),
+        trend=float(trend[best]),
+        phi=float(phi[best]),
+        sigma=float(np.sqrt(sse[best] / (n - 1))),
+        seasonal=seasonal,
+        last_date=dates[-1],
+        n_obs=n,
+        alpha=float(alpha[best]),
+        beta=float(beta[best]),
+    )
+
+
+def flat_model(crop_key: str, today: date) -> FittedModel:
+    """Fallback for crops without history: the reference price, no seasonality."""
+    base = float(BASE_PRICES.get(crop_key, DEFAULT_BASE_PRICE))
+    return FittedModel(base, 0.0, 1.0, 0.0, np.zeros(SEASON), np.datetime64(today, "D"), 0)
+
+
+def project(model: FittedModel, start: date, weeks: int = FORECAST_WEEKS) -> Tuple[np.ndarray, np.ndarray]:
+    """Weekly forecast dates (from `start`) and prices for a fitted model."""
+    dates = np.datetime64(start, "D") + 7 * np.arange(weeks)
+    steps = np.maximum(1.0, (dates - model.last_date).astype(np.int64) / 7.0)
+    if model.phi == 1.0:
+        damped = steps
+    else:
+        damped = model.phi * (1 - model.phi ** steps) / (1 - model.phi)
+    prices = model.level + damped * model.trend + model.seasonal[week_of_year(dates)]
+    return dates, prices
+
+
+def simulate(model: FittedModel, start: date, weeks: int, n_paths: int,
+             rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weekly dates and (weeks + 1, n_paths) float32 price paths from `start`.
+    Row 0 is the current price (the point forecast for `start`); later rows
+    add the model's own forecast errors: for damped Holt, the error h weeks
+    ahead is e_h + sum_j c_(h-j) e_j with c_i = alpha * (1 + beta * (phi + ... + phi^i))
+    and e ~ N(0, sigma), so every path comes out of one matrix product.
+    Prices are floored at PRICE_FLOOR of the point forecast.
+    """
+    dates, mean = project(model, start, weeks + 1)
+    lag = np.arange(weeks)[:, None] - np.arange(weeks)[None, :]
+    steps = np.arange(weeks, dtype=np.float64)
+    damped = steps if model.phi == 1.0 else model.phi * (1 - model.phi ** steps) / (1 - model.phi)
+    c = model.alpha * (1 + model.beta * damped)
+    kernel = np.where(lag > 0, c[np.maximum(lag, 0)], (lag == 0).astype(np.float64)).astype(np.float32)
+    shocks = rng.standard_normal((weeks, n_paths), dtype=np.float32)
+    shocks *= np.float32(model.sigma)
+    paths = np.empty((weeks + 1, n_paths), dtype=np.float32)
+    paths[0] = mean[0]
+    np.matmul(kernel, shocks, out=paths[1:])
+    paths[1:] += mean[1:, None].astype(np.float32)
+    np.maximum(paths, (PRICE_FLOOR * mean[:, None]).astype(np.float32), out=paths)
+    return dates, paths
+
+
+def _store_frame(store_dir: str):
+    import pandas as pd
+
+    store = PriceStore(store_dir)
+    states = np.array(store.manifest["states"] or [""], dtype=object)
+    frames = []
+    for crop in store.crops():
+        records = store.read(crop)
+        frames.append(pd.DataFrame({
+            "date": records["date"],
+            "crop": crop,
+            "region": states[records["state"]],
+            "modal_price": records["modal_price"].astype(np.float64),
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def load_history(path: str = HISTORY_PATH, store_dir: str = STORE_DIR) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Weekly (dates, prices) arrays per (crop, region). Reads the ingested price
+    store when one exists (see ingest.py), otherwise the sample CSV.
+    """
+    import pandas as pd
+
+    if PriceStore.exists(store_dir):
+        df = _store_frame(store_dir)
+    elif os.path.exists(path):
+        df = pd.read_csv(path, usecols=["date", "crop", "region", "modal_price"], parse_dates=["date"])
+        df["crop"] = df["crop"].map(normalize_crop)
+        df["region"] = df["region"].map(normalize_region)
+    else:
+        df = None
+    if df is None or df.empty:
+        logger.warning("No price history in %s or %s; forecasts use reference prices", store_dir, path)
+        return {}
+
+    if not (df["region"] == NATIONAL_REGION).any():
+        # Market-level dumps have no national series: average across all markets
+        df = pd.concat([df, df.assign(region=NATIONAL_REGION)], ignore_index=True)
+
+    series = {}
+    for (crop, region), group in df.groupby(["crop", "region"], sort=False):
+        weekly = group.set_index("date")["modal_price"].resample("W-MON").mean().interpolate()
+        series[(crop, region)] = (
+            weekly.index.values.astype("datetime64[D]"),
+            weekly.to_numpy(dtype=np.float64),
+        )
+    return series
+
+
+class PriceForecaster:
+    def __init__(self, history_path: str = HISTORY_PATH, store_dir: str = STORE_DIR,
+                 maxsize: int = 512, ttl: float = 6 * 3600):
+        self.history_path = history_path
+        self.store_dir = store_dir
+        self.models = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._history = None
+        self._history_lock = threading.Lock()
+
+    @property
+    def history(self):
+        if self._history is None:
+            with self._history_lock:
+                if self._history is None:
+                    self._history = load_history(self.history_path, self.store_dir)
+        return self._history
+
+    def resolve(self, crop: str, region: str) -> Tuple[str, str]:
+        """Series key for a request; unknown regions fall back to the national series."""
+        crop_key = normalize_crop(crop)
+        region_key = normalize_region(region)
+        if (crop_key, region_key) in self.history:
+            return crop_key, region_key
+        return crop_key, NATIONAL_REGION
+
+    def get_model(self, crop: str, region: str) -> FittedModel:
+        key = self.resolve(crop, region)
+
+        def fit():
+            series = self.history.get(key)
+            if series is None:
+                return flat_model(key[0], date.today())
+            return fit_series(*series)
+
+        return self.models.get_or_set(key, fit)
+
+    def forecast(self, crop: str, region: str, start: date, weeks: int = FORECAST_WEEKS) -> Tuple[List[date], List[float]]:
+        dates, prices = project(self.get_model(crop, region), start, weeks)
+        return dates.astype(object).tolist(), np.round(prices, 2).tolist()
+
+    async def forecast_async(self, crop: str, region: str, start: date, run_fit,
+                             weeks: int = FORECAST_WEEKS) -> Tuple[List[date], List[float]]:
+        """
+        `forecast` for the event loop: a cache miss is fitted with
+        `await run_fit(fit_series, dates, prices)` (e.g. executors.run_cpu)
+        instead of on the calling thread.
+        """
+        history = self._history
+        if history is None:
+            history = await asyncio.get_running_loop().run_in_executor(None, lambda: self.history)
+        key = self.resolve(crop, region)
+        model = self.models.get(key)
+        if model is None:
+            series = history.get(key)
+            model = flat_model(key[0], date.today()) if series is None else await run_fit(fit_series, *series)
+            self.models.set(key, model)
+        dates, prices = project(model, start, weeks)
+        return dates.astype(object).tolist(), np.round(prices, 2).tolist()
+
+    async def stream_forecasts(self, crops: List[str], regions: List[str], horizons: List[int],
+                               start: date, run_fit, max_in_flight: int = 1) -> AsyncIterator[dict]:
+        """
+        Forecasts every crop x region x horizon combination, yielding each row as
+        soon as its model is ready. Cached fits are served first; the remaining
+        series (one fit per distinct series, shared by every request row that
+        resolves to it) go through `await run_fit(fit_series, dates, prices)`
+        (e.g. executors.run_cpu), at most `max_in_flight` at a time so one big
+        batch cannot fill the shared lane.
+        """
+        loop = asyncio.get_running_loop()
+        history = await loop.run_in_executor(None, lambda: self.history)
+
+        rows_by_key: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for crop in crops:
+            for region in regions:
+                rows_by_key.setdefault(self.resolve(crop, region), []).append((crop, region))
+
+        def rows(key, model):
+            for crop, region in rows_by_key[key]:
+                for weeks in horizons:
+                    dates, prices = project(model, start, weeks)
+                    yield {
+                        "crop": crop,
+                        "region": region,
+                        "horizon_weeks": weeks,
+                        "dates": [d.isoformat() for d in dates.astype(object).tolist()],
+                        "predicted_prices": np.round(prices, 2).tolist(),
+                        "trend": "Upward" if prices[-1] > prices[0] else "Downward",
+                    }
+
+        to_fit = []
+        for key in rows_by_key:
+            model = self.models.get(key)
+            if model is None and key not in history:
+                model = flat_model(key[0], date.today())
+                self.models.set(key, model)
+            if model is not None:
+                for row in rows(key, model):
+                    yield row
+            else:
+                to_fit.append(key)
+
+        pending = {}
+        try:
+            while to_fit or pending:
+                while to_fit and len(pending) < max(1, max_in_flight):
+                    key = to_fit.pop(0)
+                    pending[asyncio.ensure_future(run_fit(fit_series, *history[key]))] = key
+                done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    try:
+                        model = future.result()
+                    except Exception as e:   # including Overloaded / JobTimeout from the lane
+                        for crop, region in rows_by_key[key]:
+                            yield {"crop": crop, "region": region, "error": str(e) or type(e).__name__}
+                        continue
+                    self.models.set(key, model)
+                    for row in rows(key, model):
+                        yield row
+        finally:
+            # Client went away: don't leave queued fits holding lane slots
+            for future in pending:
+                future.cancel()
+
+    def warm(self):
+        """Fits every series in the history so the first requests hit the cache."""
+        for crop, region in list(self.history):
+            self.get_model(crop, region)
+        logger.info("Warmed %d price models", len(self.models))
+
+
+price_forecaster = PriceForecaster()
@@ -0,0 +1,116 @@
+"""
+Opt-in sampling profiler that dumps stacks of slow requests.
+
+Enabled by setting BIOMETRIX_PROFILE_SLOW_MS. A daemon thread then samples
+every thread's Python stack (sys._current_frames) every
+BIOMETRIX_PROFILE_INTERVAL_MS into a short ring buffer. When a request takes
+longer than the threshold, the samples taken while it ran are written to
+BIOMETRIX_PROFILE_DIR as folded stacks ("outer;inner;leaf count"), the input
+format of flamegraph.pl, speedscope and inferno.
+
+Samples cover the whole process, so concurrent requests show up in each
+other's profiles. Idle threads (parked in locks, queues or the selector) are
+dropped.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from metrics import REGISTRY, Counter as MetricCounter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SLOW_MS = float(os.environ.get("BIOMETRIX_PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("BIOMETRIX_PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.environ.get("BIOMETRIX_PROFILE_DIR", "profiles")
+HISTORY_SECONDS = 60.0
+
+_IDLE_FILES = {"threading.py", "selectors.py", "queue.py"}
+
+PROFILES_WRITTEN = REGISTRY.register(MetricCounter(
+    "biometrix_slow_request_profiles_total", "Folded-stack profiles written for slow requests.", ("route",),
+))
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_s: float, interval_s: float = PROFILE_INTERVAL_MS / 1000,
+                 out_dir: str = PROFILE_DIR):
+        self.threshold_s = threshold_s
+        self.interval_s = interval_s
+        self.out_dir = out_dir
+        self._samples = deque(maxlen=max(1, int(HISTORY_SECONDS / interval_s)))  # (time, folded stack)
+        self._slow = deque()        # (method, route, start, end) waiting to be written
+        self._names = {}            # code object -> frame label
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """The configured profiler, or None when BIOMETRIX_PROFILE_SLOW_MS is unset."""
+        return cls(PROFILE_SLOW_MS / 1000) if PROFILE_SLOW_MS > 0 else None
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def on_request(self, method: str, route: str, start: float, elapsed: float):
+        """MetricsMiddleware hook; cheap enough to call for every request."""
+        if elapsed >= self.threshold_s:
+            self._slow.append((method, route, start, start + elapsed))
+
+    # --- Sampler thread ---
+
+    def _label(self, code) -> str:
+        label = self._names.get(code)
+        if label is None:
+            label = self._names[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(";", ",")
+        return label
+
+    def _fold(self, frame):
+        if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+            return None
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    folded = self._fold(frame)
+                    if folded is not None:
+                        self._samples.append((now, folded))
+            while self._slow:
+                self._write(*self._slow.popleft())
+
+    def _write(self, method: str, route: str, start: float, end: float):
+        counts = Counter(stack for t, stack in list(self._samples) if start <= t <= end)
+        if not counts:
+            return
+        name = re.sub(r"[^A-Za-z0-9]+", "_", f"{method}{route}").strip("_")
+        path = os.path.join(self.out_dir, f"{time.strftime('%Y%m%dT%H%M%S')}-{int((end - start) * 1000)}ms-{name}.folded")
+        try:
+            with open(path, "w") as fh:
+                fh.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", path, e)
+            return
+        PROFILES_WRITTEN.inc(route=route)
+        logger.info("Slow request %s %s took %.0f ms; profile written to %s", method, route, (end - start) * 1000, path)
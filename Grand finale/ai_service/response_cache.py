@@ -0,0 +1,307 @@
+"""
+Response cache for deterministic JSON endpoints.
+
+Endpoints opt in by passing `openapi_extra=cacheable(ttl)` to their route
+decorator, which also documents the TTL as `x-cache-ttl` in the OpenAPI
+schema. Everything else (live feeds, stateful storage endpoints, uploads,
+streams) passes through untouched. For an opted-in route the ASGI
+middleware reads the request body, canonicalizes it (JSON key order,
+whitespace and integral floats like 2.0 vs 2 don't matter) and hashes
+method + path + query + body into the cache key. Only JSON representations
+are cached: requests negotiating another format (see serialization.py) pass
+through.
+
+Lookups go through an in-process LRU/TTL tier (ttl_cache.TTLCache) and then,
+when BIOMETRIX_RESPONSE_CACHE_DB is set, a SQLite file shared by every worker
+on the host. Cached and fresh responses carry a content ETag, and a matching
+If-None-Match gets an empty 304. Hit/miss counters are in `ResponseCache.stats()`.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from serialization import wants_json
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("BIOMETRIX_RESPONSE_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.environ.get("BIOMETRIX_RESPONSE_CACHE_SIZE", "4096"))
+SQLITE_PATH = os.environ.get("BIOMETRIX_RESPONSE_CACHE_DB")
+MAX_BODY_BYTES = 64 * 1024      # larger requests/responses (batch calls) are not cached
+
+_TTL_EXTENSION = "x-cache-ttl"
+
+
+def cacheable(ttl: float = 3600.0) -> dict:
+    """
+    `openapi_extra` marking a route as a pure function of its request,
+    safe to cache for `ttl` seconds.
+    """
+    return {_TTL_EXTENSION: ttl}
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+
+
+def _canonical(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def request_key(method: str, path: str, query: bytes, body: bytes) -> Optional[str]:
+    """Canonical hash of a JSON request, or None when the body isn't JSON."""
+    try:
+        payload = _canonical(json.loads(body)) if body else None
+    except ValueError:
+        return None
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256(f"{method} {path}?{query.decode('latin-1')}\n".encode())
+    digest.update(canonical.encode())
+    return digest.hexdigest()
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in tags)
+
+
+class SQLiteTier:
+    """Cross-process tier: one row per key in a WAL-mode SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, expires REAL, status INTEGER,"
+                " headers TEXT, body BLOB, etag TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[CachedResponse, float]]:
+        row = self._connect().execute(
+            "SELECT expires, status, headers, body, etag FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] <= time.time():
+            return None
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in json.loads(row[2])]
+        return CachedResponse(row[1], headers, row[3], row[4]), row[0] - time.time()
+
+    def set(self, key: str, response: CachedResponse, ttl: float):
+        conn = self._connect()
+        headers = json.dumps([(k.decode("latin-1"), v.decode("latin-1")) for k, v in response.headers])
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, time.time() + ttl, response.status, headers, response.body, response.etag),
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            conn.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM responses")
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = MAX_ENTRIES, sqlite_path: Optional[str] = SQLITE_PATH):
+        self.memory = TTLCache(maxsize=maxsize, ttl=3600.0)
+        self.shared = SQLiteTier(sqlite_path) if sqlite_path else None
+        self.counters: Dict[str, int] = {
+            "hits_memory": 0, "hits_shared": 0, "misses": 0, "not_modified": 0, "stores": 0, "uncacheable": 0,
+        }
+
+    def count(self, name: str):
+        self.counters[name] += 1
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Memory tier only; safe to call on the event loop."""
+        return self.memory.get(key)
+
+    def get_shared(self, key: str) -> Optional[CachedResponse]:
+        """Shared tier (blocking I/O); promotes hits into memory for their remaining TTL."""
+        if self.shared is None:
+            return None
+        try:
+            found = self.shared.get(key)
+        except sqlite3.Error as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+        if found is None:
+            return None
+        response, remaining = found
+        self.memory.set(key, response, ttl=remaining)
+        return response
+
+    def set(self, key: str, response: CachedResponse, ttl: float):
+        self.memory.set(key, response, ttl=ttl)
+
+    def set_shared(self, key: str, response: CachedResponse, ttl: float):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(key, response, ttl)
+        except sqlite3.Error as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits_memory"] + self.counters["hits_shared"] + self.counters["misses"]
+        hits = self.counters["hits_memory"] + self.counters["hits_shared"]
+        return dict(
+            self.counters,
+            entries=len(self.memory),
+            hit_ratio=round(hits / lookups, 4) if lookups else 0.0,
+            shared_tier=self.shared.path if self.shared else None,
+        )
+
+
+class ResponseCacheMiddleware:
+    """Pure ASGI middleware; add it inside CORS so cached responses still get CORS headers."""
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+        self._ttls = None
+
+    def _route_ttls(self, scope) -> Dict[Tuple[str, str], float]:
+        if self._ttls is None:
+            ttls = {}
+            for path, operations in scope["app"].openapi().get("paths", {}).items():
+                for method, operation in operations.items():
+                    if _TTL_EXTENSION in operation:
+                        ttls[(method.upper(), path)] = float(operation[_TTL_EXTENSION])
+            self._ttls = ttls
+        return self._ttls
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        ttl = self._route_ttls(scope).get((scope["method"], scope["path"]))
+        if ttl is None:
+            return await self.app(scope, receive, send)
+        if not wants_json(scope["headers"]):
+            self.cache.count("uncacheable")
+            return await self.app(scope, receive, send)
+
+        from starlette.concurrency import run_in_threadpool
+
+        body, more = b"", True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        key = request_key(scope["method"], scope["path"], scope.get("query_string", b""), body) \
+            if len(body) <= MAX_BODY_BYTES else None
+        if key is None:
+            self.cache.count("uncacheable")
+            return await self.app(scope, replay, send)
+
+        if_none_match = next(
+            (v.decode("latin-1") for k, v in scope["headers"] if k == b"if-none-match"), None
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.count("hits_memory")
+        elif self.cache.shared is not None:
+            cached = await run_in_threadpool(self.cache.get_shared, key)
+            if cached is not None:
+                self.cache.count("hits_shared")
+        if cached is not None:
+            return await self._send_cached(cached, b"HIT", if_none_match, send)
+        self.cache.count("misses")
+
+        start, chunks = None, []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(key, ttl, start, b"".join(chunks), if_none_match, send)
+
+        await self.app(scope, replay, capture)
+
+    async def _finish(self, key, ttl, start, body, if_none_match, send):
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"content-length", b"etag")]
+        content_type = next((v for k, v in headers if k.lower() == b"content-type"), b"")
+        storable = (
+            start["status"] == 200 and content_type.startswith(b"application/json")
+            and len(body) <= MAX_BODY_BYTES
+            and not any(k.lower() == b"set-cookie" for k, _ in headers)
+        )
+        response = CachedResponse(start["status"], headers, body, etag_for(body))
+        if storable:
+            from starlette.concurrency import run_in_threadpool
+
+            self.cache.set(key, response, ttl)
+            self.cache.count("stores")
+            if self.cache.shared is not None:
+                await run_in_threadpool(self.cache.set_shared, key, response, ttl)
+            await self._send_cached(response, b"MISS", if_none_match, send)
+        else:
+            await send({"type": "http.response.start", "status": start["status"],
+                        "headers": start.get("headers", [])})
+            await send({"type": "http.response.body", "body": body})
+
+    async def _send_cached(self, cached: CachedResponse, state: bytes, if_none_match, send):
+        etag = cached.etag.encode("latin-1")
+        if if_none_match is not None and etag_matches(if_none_match, cached.etag):
+            self.cache.count("not_modified")
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": [(b"etag", etag), (b"x-cache", state)]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = cached.headers + [
+            (b"content-length", str(len(cached.body)).encode()), (b"etag", etag), (b"x-cache", state),
+        ]
+        await send({"type": "http.response.start", "status": cached.status, "headers": headers})
+        await send({"type": "http.response.body", "body": cached.body})
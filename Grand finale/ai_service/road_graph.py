@@ -0,0 +1,629 @@
+"""
+Road-network travel times over a preprocessed, memory-mapped road graph.
+
+    python road_graph.py osm <roads.osm> [--graph DIR]
+    python road_graph.py synthetic [--nodes 500000] [--graph DIR]
+
+The graph is built offline, either from an OSM XML extract already filtered
+to highways (e.g. ``osmium tags-filter state.osm.pbf w/highway -o roads.osm``)
+or as a synthetic state-sized network for benchmarks, into a directory of
+plain .npy arrays next to a meta.json:
+
+    fwd_indptr, fwd_head, fwd_time, fwd_length    outgoing edges (CSR)
+    rev_indptr, rev_head, rev_time, rev_length    incoming edges (CSR)
+    node_lat, node_lon                            float32 coordinates
+    lm_from, lm_to                                (N, L) landmark travel times
+    cell_start                                    grid cell -> first node
+
+Only the largest strongly connected component is kept, so every pair of
+snapped nodes has a route. Nodes are numbered in row-major grid-cell order:
+a cell's nodes are one contiguous id range (the snapping index is just
+`cell_start`) and nodes that are close on the map share pages. The arrays
+are opened with mmap_mode="r", so loading is a few file opens and the
+CPU-lane worker processes share one copy through the page cache.
+
+Point-to-point queries run bidirectional A* with ALT bounds (triangle
+inequality over precomputed landmark travel times), using the symmetric
+average potential so both searches see the same reduced edge costs.
+Matrices for /optimize-route and one-to-many ETAs run SciPy's Dijkstra from
+each source over the subgraph inside the points' bounding box plus a margin.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from heapq import heappop, heappush
+from operator import itemgetter, sub
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from geo import haversine_km
+
+logger = logging.getLogger(__name__)
+
+GRAPH_DIR = os.environ.get(
+    "BIOMETRIX_ROAD_GRAPH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "road_graph"),
+)
+FORMAT_VERSION = 1
+META = "meta.json"
+
+N_LANDMARKS = 8
+# Landmarks consulted per query: the ones giving the best origin->destination bound
+ACTIVE_LANDMARKS = 4
+# Points farther than this from every node are treated as off the network
+SNAP_MAX_KM = float(os.environ.get("BIOMETRIX_ROAD_SNAP_KM", "10"))
+# Speed over the straight leg between a point and its snapped node
+ACCESS_KMPH = 15.0
+# Road km per straight-line km (and average speed) where the graph has no answer
+ROAD_DETOUR_FACTOR = 1.3
+FALLBACK_KMPH = 40.0
+# Matrix searches stay inside the points' bounding box grown by this much
+MATRIX_MARGIN_KM = 25.0
+# Average nodes per snapping grid cell
+_NODES_PER_CELL = 4
+_KM_PER_DEG = 111.2
+_MIN_EDGE_S = 0.1
+_MIN_EDGE_M = 1.0
+
+# Free-flow goods-vehicle speeds by OSM highway class (km/h), capped maxspeed otherwise
+HIGHWAY_SPEEDS = {
+    "motorway": 80, "motorway_link": 45, "trunk": 65, "trunk_link": 40,
+    "primary": 55, "primary_link": 35, "secondary": 45, "secondary_link": 30,
+    "tertiary": 35, "tertiary_link": 25, "unclassified": 25, "road": 25,
+    "residential": 20, "living_street": 10, "service": 15, "track": 12,
+}
+TRUCK_MAX_KMPH = 80
+
+_ARRAYS = (
+    "node_lat", "node_lon", "cell_start",
+    "fwd_indptr", "fwd_head", "fwd_time", "fwd_length",
+    "rev_indptr", "rev_head", "rev_time", "rev_length",
+    "lm_from", "lm_to",
+)
+
+
+class RoadGraphError(Exception):
+    """Raised when a road graph directory is missing, stale or incomplete."""
+
+
+@dataclass
+class RoadRoute:
+    time_s: float       # including the off-network legs to and from the snapped nodes
+    length_m: float
+    access_km: float    # straight-line origin->node plus node->destination
+    settled: int        # nodes settled by the search
+
+
+class RoadGraph:
+    """Directed road graph with travel-time and length edge weights."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: dict):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.n_nodes = len(self.node_lat)
+        self.n_edges = len(self.fwd_head)
+        self.n_landmarks = self.lm_from.shape[1]
+        grid = meta["grid"]
+        self._lat0, self._lon0 = grid["lat0"], grid["lon0"]
+        self._cell, self._nx, self._ny = grid["cell_deg"], grid["nx"], grid["ny"]
+
+    @classmethod
+    def load(cls, path: str = GRAPH_DIR) -> "RoadGraph":
+        meta_path = os.path.join(path, META)
+        if not os.path.exists(meta_path):
+            raise RoadGraphError(f"No road graph at {path}")
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get("version") != FORMAT_VERSION:
+            raise RoadGraphError(f"Road graph format {meta.get('version')} != {FORMAT_VERSION}")
+        try:
+            # Plain ndarray views of the maps: np.memmap's Python-level __getitem__ costs
+            # more than the search itself on per-node slicing
+            arrays = {name: np.asarray(np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+                      for name in _ARRAYS}
+        except (OSError, ValueError) as e:
+            raise RoadGraphError(f"Incomplete road graph at {path}: {e}")
+        return cls(arrays, meta)
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    # --- Snapping ---
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        iy = min(max(int((lat - self._lat0) // self._cell), 0), self._ny - 1)
+        ix = min(max(int((lon - self._lon0) // self._cell), 0), self._nx - 1)
+        return iy, ix
+
+    def _ring(self, iy: int, ix: int, r: int) -> np.ndarray:
+        """Node ids in the cells at Chebyshev distance r from (iy, ix)."""
+        nx, starts = self._nx, self.cell_start
+        x0, x1 = max(ix - r, 0), min(ix + r, nx - 1)
+        ranges = []
+        for y in range(max(iy - r, 0), min(iy + r, self._ny - 1) + 1):
+            if r == 0 or abs(y - iy) == r:
+                # Whole row of the ring: one contiguous id range
+                ranges.append((starts[y * nx + x0], starts[y * nx + x1 + 1]))
+            else:
+                for x in (ix - r, ix + r):
+                    if 0 <= x < nx:
+                        ranges.append((starts[y * nx + x], starts[y * nx + x + 1]))
+        return np.concatenate([np.arange(a, b) for a, b in ranges]) if ranges else np.empty(0, dtype=np.int64)
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Nearest node and its distance in km; (-1, inf) when none is within SNAP_MAX_KM."""
+        iy, ix = self._cell_of(lat, lon)
+        # Narrowest cell side in km: nodes in ring r are at least (r - 1) cells away
+        cell_km = self._cell * _KM_PER_DEG * max(math.cos(math.radians(abs(lat) + self._cell)), 0.05)
+        max_ring = int(SNAP_MAX_KM / cell_km) + 2
+        best, best_km = -1, math.inf
+        for r in range(max_ring + 1):
+            if best_km <= (r - 1) * cell_km:
+                break
+            nodes = self._ring(iy, ix, r)
+            if len(nodes):
+                dist = haversine_km(lat, lon, self.node_lat[nodes], self.node_lon[nodes])
+                k = int(np.argmin(dist))
+                if dist[k] < best_km:
+                    best, best_km = int(nodes[k]), float(dist[k])
+        if best_km > SNAP_MAX_KM:
+            return -1, math.inf
+        return best, best_km
+
+    def snap_many(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        snapped = [self.snap(lat, lon) for lat, lon in zip(np.asarray(lats).tolist(), np.asarray(lons).tolist())]
+        nodes = np.fromiter((s[0] for s in snapped), dtype=np.int64, count=len(snapped))
+        km = np.fromiter((s[1] for s in snapped), dtype=np.float64, count=len(snapped))
+        return nodes, km
+
+    # --- Point to point: bidirectional ALT ---
+
+    def _potential(self, s: int, t: int):
+        """
+        p(v) = (lower bound d(v, t) - lower bound d(s, v)) / 2, from the landmarks
+        with the tightest s -> t bound. The forward search keys on d + p and the
+        backward search on d - p, which gives both the same reduced costs.
+        """
+        lm_from, lm_to = self.lm_from, self.lm_to
+        from_s, to_s, from_t, to_t = lm_from[s], lm_to[s], lm_from[t], lm_to[t]
+        bound = np.maximum(from_t - from_s, to_s - to_t)
+        active = np.argsort(-bound, kind="stable")[:ACTIVE_LANDMARKS].tolist()
+        pick = itemgetter(*active) if len(active) > 1 else (lambda row: (row[active[0]],))
+        from_s, to_s, from_t, to_t = (pick(row.tolist()) for row in (from_s, to_s, from_t, to_t))
+        cache = {}
+
+        def potential(v: int) -> float:
+            p = cache.get(v)
+            if p is None:
+                from_v, to_v = pick(lm_from[v].tolist()), pick(lm_to[v].tolist())
+                # d(v,t) >= d(L,t) - d(L,v) and d(v,L) - d(t,L); d(s,v) likewise
+                ahead = max(max(map(sub, from_t, from_v)), max(map(sub, to_v, to_t)), 0.0)
+                behind = max(max(map(sub, from_v, from_s)), max(map(sub, to_s, to_v)), 0.0)
+                p = cache[v] = 0.5 * (ahead - behind)
+            return p
+
+        return potential
+
+    def shortest(self, s: int, t: int, use_landmarks: bool = True) -> Tuple[float, float, int]:
+        """(travel time in s, length in m, nodes settled) of the fastest path s -> t."""
+        if s == t:
+            return 0.0, 0.0, 0
+        potential = self._potential(s, t) if use_landmarks and self.n_landmarks else (lambda v: 0.0)
+        inf = math.inf
+        dist = ({s: 0.0}, {t: 0.0})
+        length = ({s: 0.0}, {t: 0.0})
+        heaps = ([(potential(s), s)], [(-potential(t), t)])
+        edges = (
+            (self.fwd_indptr, self.fwd_head, self.fwd_time, self.fwd_length),
+            (self.rev_indptr, self.rev_head, self.rev_time, self.rev_length),
+        )
+        best, best_length, settled = inf, 0.0, 0
+        while heaps[0] and heaps[1]:
+            # Keys are reduced distances, so top_f + top_b >= best proves optimality
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            sign = 1.0 if side == 0 else -1.0
+            heap, d_own, l_own = heaps[side], dist[side], length[side]
+            d_other, l_other = dist[1 - side], length[1 - side]
+            key, u = heappop(heap)
+            du = d_own[u]
+            if du + sign * potential(u) < key - 1e-6:
+                continue                        # superseded heap entry
+            settled += 1
+            indptr, head, weight, edge_length = edges[side]
+            a, b = int(indptr[u]), int(indptr[u + 1])
+            lu = l_own[u]
+            for v, w, el in zip(head[a:b].tolist(), weight[a:b].tolist(), edge_length[a:b].tolist()):
+                nd = du + w
+                if nd < d_own.get(v, inf):
+                    d_own[v] = nd
+                    l_own[v] = lu + el
+                    heappush(heap, (nd + sign * potential(v), v))
+                    dv = d_other.get(v)
+                    if dv is not None and nd + dv < best:
+                        best, best_length = nd + dv, l_own[v] + l_other[v]
+        return best, best_length, settled
+
+    def route(self, origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float) -> Optional[RoadRoute]:
+        """Fastest road route between two points, or None when either is off the network."""
+        s, s_km = self.snap(origin_lat, origin_lon)
+        t, t_km = self.snap(dest_lat, dest_lon)
+        if s < 0 or t < 0:
+            return None
+        time_s, length_m, settled = self.shortest(s, t)
+        access_km = s_km + t_km
+        return RoadRoute(
+            time_s=time_s + access_km / ACCESS_KMPH * 3600,
+            length_m=length_m + access_km * 1000,
+            access_km=access_km,
+            settled=settled,
+        )
+
+    # --- Many to many: Dijkstra over a windowed subgraph ---
+
+    def _window(self, nodes: np.ndarray) -> np.ndarray:
+        """Sorted ids of the nodes inside the bounding box of `nodes` plus the margin."""
+        lat, lon = self.node_lat[nodes], self.node_lon[nodes]
+        margin_lat = MATRIX_MARGIN_KM / _KM_PER_DEG
+        margin_lon = margin_lat / max(math.cos(math.radians(float(np.abs(lat).max()) + margin_lat)), 0.05)
+        lat0, lat1 = float(lat.min()) - margin_lat, float(lat.max()) + margin_lat
+        lon0, lon1 = float(lon.min()) - margin_lon, float(lon.max()) + margin_lon
+        # Nodes are in row-major cell order, so the latitude band is one id range
+        y0, _ = self._cell_of(lat0, lon0)
+        y1, _ = self._cell_of(lat1, lon0)
+        a, b = int(self.cell_start[y0 * self._nx]), int(self.cell_start[(y1 + 1) * self._nx])
+        band_lat, band_lon = self.node_lat[a:b], self.node_lon[a:b]
+        inside = (band_lat >= lat0) & (band_lat <= lat1) & (band_lon >= lon0) & (band_lon <= lon1)
+        return np.flatnonzero(inside) + a
+
+    def node_matrix(self, sources: np.ndarray, targets: np.ndarray, weight: str = "time") -> np.ndarray:
+        """
+        (S, T) shortest costs between nodes: seconds for weight="time", metres
+        for "length". inf where no path stays inside the search window.
+        """
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        window = self._window(np.concatenate([sources, targets]))
+        k = len(window)
+        starts = self.fwd_indptr[window].astype(np.int64)
+        counts = self.fwd_indptr[window + 1].astype(np.int64) - starts
+        # Edge ids of every window node's out-edges, without a Python loop
+        offsets = np.cumsum(counts) - counts
+        edge_ids = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        heads = self.fwd_head[edge_ids]
+        cols = np.minimum(np.searchsorted(window, heads), k - 1)
+        keep = window[cols] == heads
+        rows = np.repeat(np.arange(k), counts)[keep]
+        cost = (self.fwd_time if weight == "time" else self.fwd_length)[edge_ids][keep].astype(np.float64)
+        graph = csr_matrix((cost, (rows, cols[keep])), shape=(k, k))
+
+        unique_sources, inverse = np.unique(np.searchsorted(window, sources), return_inverse=True)
+        dist = dijkstra(graph, directed=True, indices=unique_sources)
+        return dist[inverse][:, np.searchsorted(window, targets)]
+
+    def cost_matrix(self, lats1, lons1, lats2, lons2, weight: str = "time") -> np.ndarray:
+        """
+        (N, M) travel seconds (weight="time") or road km ("length") between
+        points, including the off-network legs. Pairs with a point off the
+        network or no route in the window fall back to haversine x
+        ROAD_DETOUR_FACTOR (at FALLBACK_KMPH for times).
+        """
+        src, src_km = self.snap_many(lats1, lons1)
+        dst, dst_km = self.snap_many(lats2, lons2)
+        fallback = haversine_km(np.asarray(lats1, dtype=np.float64)[:, None], np.asarray(lons1, dtype=np.float64)[:, None],
+                                np.asarray(lats2, dtype=np.float64), np.asarray(lons2, dtype=np.float64))
+        fallback *= ROAD_DETOUR_FACTOR
+        if weight == "time":
+            fallback *= 3600 / FALLBACK_KMPH
+        out = fallback
+        on_src, on_dst = np.flatnonzero(src >= 0), np.flatnonzero(dst >= 0)
+        if len(on_src) and len(on_dst):
+            road = self.node_matrix(src[on_src], dst[on_dst], weight)
+            access = src_km[on_src][:, None] + dst_km[on_dst]
+            if weight == "time":
+                road = road + access / ACCESS_KMPH * 3600
+            else:
+                road = road / 1000 + access
+            block = out[np.ix_(on_src, on_dst)]
+            np.copyto(block, road, where=np.isfinite(road))
+            out[np.ix_(on_src, on_dst)] = block
+        return out
+
+
+_graph = None
+_graph_loaded = False
+_graph_lock = threading.Lock()
+
+
+def get_road_graph() -> Optional[RoadGraph]:
+    """Process-wide graph, memory-mapped on first use; None when none is installed."""
+    global _graph, _graph_loaded
+    if not _graph_loaded:
+        with _graph_lock:
+            if not _graph_loaded:
+                try:
+                    _graph = RoadGraph.load(GRAPH_DIR)
+                    logger.info("Road graph: %d nodes, %d edges from %s", _graph.n_nodes, _graph.n_edges, GRAPH_DIR)
+                except RoadGraphError as e:
+                    logger.info("%s; ETAs fall back to haversine", e)
+                _graph_loaded = True
+    return _graph
+
+
+def road_eta(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float) -> Optional[RoadRoute]:
+    """Module-level entry point for the CPU lane: each worker maps the graph once."""
+    graph = get_road_graph()
+    return None if graph is None else graph.route(origin_lat, origin_lon, dest_lat, dest_lon)
+
+
+def road_cost_matrix(lats1, lons1, lats2, lons2, weight: str = "time") -> Optional[np.ndarray]:
+    graph = get_road_graph()
+    return None if graph is None else graph.cost_matrix(lats1, lons1, lats2, lons2, weight)
+
+
+# --- Offline build ---
+
+def build_graph(lats, lons, tails, heads, length_m, speed_kmph,
+                n_landmarks: int = N_LANDMARKS, seed: int = 0) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Arrays and meta for directed edges tails[k] -> heads[k] between nodes at (lats, lons)."""
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    tails = np.asarray(tails, dtype=np.int64)
+    heads = np.asarray(heads, dtype=np.int64)
+    length_m = np.maximum(np.asarray(length_m, dtype=np.float64), _MIN_EDGE_M)
+    time_s = np.maximum(length_m / (np.asarray(speed_kmph, dtype=np.float64) / 3.6), _MIN_EDGE_S)
+
+    # Parallel edges (dual carriageways mapped twice, repeated OSM segments): keep the fastest
+    keep = tails != heads
+    tails, heads, length_m, time_s = tails[keep], heads[keep], length_m[keep], time_s[keep]
+    order = np.lexsort((time_s, heads, tails))
+    tails, heads, length_m, time_s = tails[order], heads[order], length_m[order], time_s[order]
+    first = np.ones(len(tails), dtype=bool)
+    first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+    tails, heads, length_m, time_s = tails[first], heads[first], length_m[first], time_s[first]
+
+    n = len(lats)
+    adjacency = csr_matrix((np.ones(len(tails)), (tails, heads)), shape=(n, n))
+    _, labels = connected_components(adjacency, directed=True, connection="strong")
+    component = labels == np.bincount(labels).argmax()
+
+    # Renumber the kept nodes in row-major grid-cell order
+    kept = np.flatnonzero(component)
+    lat, lon = lats[kept], lons[kept]
+    lat0, lon0 = float(lat.min()), float(lon.min())
+    span = max((float(lat.max()) - lat0) * (float(lon.max()) - lon0), 1e-6)
+    cell = max(math.sqrt(span * _NODES_PER_CELL / len(kept)), 1e-4)
+    ny = int((float(lat.max()) - lat0) // cell) + 1
+    nx = int((float(lon.max()) - lon0) // cell) + 1
+    cells = ((lat - lat0) // cell).astype(np.int64) * nx + ((lon - lon0) // cell).astype(np.int64)
+    order = np.argsort(cells, kind="stable")
+    kept, cells = kept[order], cells[order]
+    new_id = np.full(n, -1, dtype=np.int64)
+    new_id[kept] = np.arange(len(kept))
+    cell_start = np.searchsorted(cells, np.arange(nx * ny + 1)).astype(np.int64)
+
+    both = component[tails] & component[heads]
+    tails, heads = new_id[tails[both]], new_id[heads[both]]
+    length_m, time_s = length_m[both], time_s[both]
+    m = len(kept)
+
+    arrays = {
+        "node_lat": lats[kept].astype(np.float32),
+        "node_lon": lons[kept].astype(np.float32),
+        "cell_start": cell_start,
+    }
+    for prefix, frm, to in (("fwd", tails, heads), ("rev", heads, tails)):
+        order = np.lexsort((to, frm))
+        arrays[f"{prefix}_indptr"] = np.searchsorted(frm[order], np.arange(m + 1)).astype(np.int64)
+        arrays[f"{prefix}_head"] = to[order].astype(np.int32)
+        arrays[f"{prefix}_time"] = time_s[order].astype(np.float32)
+        arrays[f"{prefix}_length"] = length_m[order].astype(np.float32)
+
+    forward = csr_matrix((time_s, (tails, heads)), shape=(m, m))
+    landmarks, arrays["lm_from"], arrays["lm_to"] = _select_landmarks(forward, n_landmarks, seed)
+    meta = {
+        "version": FORMAT_VERSION,
+        "nodes": m,
+        "edges": int(len(tails)),
+        "dropped_nodes": int(n - m),
+        "landmarks": landmarks,
+        "grid": {"lat0": lat0, "lon0": lon0, "cell_deg": cell, "nx": nx, "ny": ny},
+    }
+    return arrays, meta
+
+
+def _select_landmarks(forward, k: int, seed: int):
+    """
+    Farthest-point landmarks: each new landmark maximises its round-trip time
+    to the closest landmark so far. Returns ids and (N, k) float32 travel times
+    from and to each landmark.
+    """
+    from scipy.sparse.csgraph import dijkstra
+
+    n = forward.shape[0]
+    if k <= 0 or n < 2:
+        empty = np.zeros((n, 0), dtype=np.float32)
+        return [], empty, empty
+    backward = forward.T.tocsr()
+    start = int(np.random.default_rng(seed).integers(n))
+    candidate = int(np.argmax(dijkstra(forward, directed=True, indices=start)))
+    closest = np.full(n, np.inf)
+    ids, from_rows, to_rows = [], [], []
+    for _ in range(min(k, n)):
+        ids.append(candidate)
+        from_rows.append(dijkstra(forward, directed=True, indices=candidate))
+        to_rows.append(dijkstra(backward, directed=True, indices=candidate))
+        np.minimum(closest, from_rows[-1] + to_rows[-1], out=closest)
+        candidate = int(np.argmax(closest))
+    return (ids, np.column_stack(from_rows).astype(np.float32), np.column_stack(to_rows).astype(np.float32))
+
+
+def save_graph(arrays: Dict[str, np.ndarray], meta: dict, path: str = GRAPH_DIR):
+    """Writes a graph directory, swapping it in whole so readers never see a mix."""
+    tmp = f"{path.rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in _ARRAYS:
+        np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(arrays[name]))
+    with open(os.path.join(tmp, META), "w") as fh:
+        json.dump(dict(meta, built_at=time.time()), fh, indent=1)
+    # Processes that already mapped the old files keep reading them until they reload
+    old = f"{path.rstrip(os.sep)}.{os.getpid()}.old"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _maxspeed(value: Optional[str]) -> Optional[float]:
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(mph)?", value or "")
+    if not match:
+        return None
+    speed = float(match.group(1)) * (1.609 if match.group(2) else 1.0)
+    return speed if speed > 0 else None
+
+
+def read_osm(path: str):
+    """
+    Directed road segments of an OSM XML extract as (lats, lons, tails, heads,
+    length_m, speed_kmph). Ways are read first, then only the coordinates of
+    the nodes they use, clearing each element once it is read.
+    """
+    from lxml import etree
+
+    tails, heads, speeds = [], [], []
+    for _, elem in etree.iterparse(path, events=("end",), tag=("node", "way")):
+        if elem.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in elem.iterfind("tag")}
+            highway = tags.get("highway")
+            if highway in HIGHWAY_SPEEDS and tags.get("access") not in ("no", "private"):
+                refs = [int(nd.get("ref")) for nd in elem.iterfind("nd")]
+                speed = min(_maxspeed(tags.get("maxspeed")) or HIGHWAY_SPEEDS[highway], TRUCK_MAX_KMPH)
+                implied = "yes" if highway == "motorway" or tags.get("junction") == "roundabout" else "no"
+                oneway = tags.get("oneway", implied)
+                a, b = refs[:-1], refs[1:]
+                if oneway == "-1":
+                    a, b = b, a
+                tails += a
+                heads += b
+                if oneway not in ("yes", "true", "1", "-1"):
+                    tails += b
+                    heads += a
+                speeds += [speed] * (len(tails) - len(speeds))
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    ids = np.unique(np.array(tails + heads, dtype=np.int64))
+    coords = {}
+    wanted = set(ids.tolist())
+    for _, elem in etree.iterparse(path, events=("end",), tag=("node", "way")):
+        if elem.tag == "way":
+            break
+        node_id = int(elem.get("id"))
+        if node_id in wanted:
+            coords[node_id] = (float(elem.get("lat")), float(elem.get("lon")))
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    # Segments touching nodes missing from the extract are dropped
+    tails = np.array(tails, dtype=np.int64)
+    heads = np.array(heads, dtype=np.int64)
+    speeds = np.array(speeds, dtype=np.float64)
+    ids = np.array(sorted(coords), dtype=np.int64)
+    inside = np.isin(tails, ids) & np.isin(heads, ids)
+    tails = np.searchsorted(ids, tails[inside])
+    heads = np.searchsorted(ids, heads[inside])
+    lats = np.array([coords[i][0] for i in ids.tolist()])
+    lons = np.array([coords[i][1] for i in ids.tolist()])
+    length_m = haversine_km(lats[tails], lons[tails], lats[heads], lons[heads]) * 1000
+    return lats, lons, tails, heads, length_m, speeds[inside]
+
+
+def synthetic_network(n_nodes: int = 500_000, bbox=(21.1, 26.9, 74.0, 82.8), seed: int = 0):
+    """
+    A jittered-grid road network over a state-sized bounding box (default
+    roughly Madhya Pradesh) with a highway every 40 rows/columns, a major road
+    every 10th and local roads in between, some of them missing or one-way.
+    Same output as read_osm.
+    """
+    rng = np.random.default_rng(seed)
+    lat0, lat1, lon0, lon1 = bbox
+    aspect = (lon1 - lon0) * math.cos(math.radians((lat0 + lat1) / 2)) / (lat1 - lat0)
+    ny = max(int(round(math.sqrt(n_nodes / aspect))), 2)
+    nx = max(int(round(n_nodes / ny)), 2)
+    step_lat, step_lon = (lat1 - lat0) / (ny - 1), (lon1 - lon0) / (nx - 1)
+    iy, ix = np.divmod(np.arange(nx * ny), nx)
+    lats = lat0 + (iy + rng.uniform(-0.3, 0.3, nx * ny)) * step_lat
+    lons = lon0 + (ix + rng.uniform(-0.3, 0.3, nx * ny)) * step_lon
+
+    def road_class(line):
+        return np.where(line % 40 == 0, HIGHWAY_SPEEDS["trunk"],
+                        np.where(line % 10 == 0, HIGHWAY_SPEEDS["secondary"], HIGHWAY_SPEEDS["unclassified"]))
+
+    node = np.arange(nx * ny).reshape(ny, nx)
+    east = (node[:, :-1].ravel(), node[:, 1:].ravel(), road_class(np.repeat(np.arange(ny), nx - 1)))
+    north = (node[:-1, :].ravel(), node[1:, :].ravel(), road_class(np.tile(np.arange(nx), ny - 1)))
+    a = np.concatenate([east[0], north[0]])
+    b = np.concatenate([east[1], north[1]])
+    speed = np.concatenate([east[2], north[2]]).astype(np.float64)
+    local = speed == HIGHWAY_SPEEDS["unclassified"]
+    present = ~local | (rng.random(len(a)) > 0.2)
+    a, b, speed, local = a[present], b[present], speed[present], local[present]
+    one_way = local & (rng.random(len(a)) < 0.03)
+    tails = np.concatenate([a, b[~one_way]])
+    heads = np.concatenate([b, a[~one_way]])
+    speeds = np.concatenate([speed, speed[~one_way]])
+    # Roads wind: 5-35% longer than the straight segment
+    length_m = haversine_km(lats[tails], lons[tails], lats[heads], lons[heads]) * 1000
+    length_m *= rng.uniform(1.05, 1.35, len(tails))
+    return lats, lons, tails, heads, length_m, speeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--graph", default=GRAPH_DIR)
+    parser.add_argument("--landmarks", type=int, default=N_LANDMARKS)
+    sources = parser.add_subparsers(dest="source", required=True)
+    osm = sources.add_parser("osm", help="OSM XML extract filtered to highways")
+    osm.add_argument("path")
+    synthetic = sources.add_parser("synthetic", help="synthetic state-sized grid network")
+    synthetic.add_argument("--nodes", type=int, default=500_000)
+    synthetic.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    started = time.perf_counter()
+    if args.source == "osm":
+        network = read_osm(args.path)
+    else:
+        network = synthetic_network(args.nodes, seed=args.seed)
+    read_s = time.perf_counter() - started
+    arrays, meta = build_graph(*network, n_landmarks=args.landmarks)
+    meta["source"] = args.path if args.source == "osm" else f"synthetic:{args.nodes}:{args.seed}"
+    save_graph(arrays, meta, args.graph)
+    size_mb = sum(a.nbytes for a in arrays.values()) / 1e6
+    print(f"{meta['nodes']} nodes, {meta['edges']} edges ({meta['dropped_nodes']} nodes outside the largest "
+          f"component dropped), {size_mb:.1f} MB; read {read_s:.1f} s, "
+          f"built in {time.perf_counter() - started - read_s:.1f} s -> {args.graph}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Per-feature API routers.
+
+Each module exposes a FastAPI `router` and a `preload()` hook. Router modules
+only import FastAPI/pydantic at module level; NumPy, pandas, scikit-learn and
+the model modules are imported inside the handlers that need them, so a worker
+only pays for the features it actually serves. `preload()` imports and warms a
+feature ahead of the first request (see BIOMETRIX_PRELOAD in main.py).
+"""
@@ -0,0 +1,189 @@
+"""
+Farmer advisory endpoints: harvest-week crop advisory and weather alerts.
+"""
+import time
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+def preload():
+    from weather_alerts import get_alert_feed
+    from weather_grid import get_weather_grid
+
+    get_alert_feed()
+    get_weather_grid()
+
+# --- Data Models ---
+
+class AdvisoryRequest(BaseModel):
+    lat: float
+    lon: float
+    harvest_date: date
+
+class AdvisoryResponse(BaseModel):
+    risk_level: str
+    message: str
+    weather_forecast: str
+    # Harvest week aggregates over the forecast days that cover it
+    rainfall_mm: Optional[float] = None
+    max_daily_rainfall_mm: Optional[float] = None
+    rainy_days: Optional[int] = None
+    humidity_percent: Optional[float] = None
+    days_covered: int = 0
+    forecast_run: Optional[str] = None
+
+class BatchAdvisoryRequest(BaseModel):
+    # One array per AdvisoryRequest field, all the same length
+    farm_ids: Optional[List[str]] = None
+    lat: List[float]
+    lon: List[float]
+    harvest_date: List[date]
+
+class WeatherAlertResponse(BaseModel):
+    id: Optional[str] = None
+    title: str
+    description: str
+    severity: str
+    source: str
+    states: List[str] = [] # lowercase state names the alert covers
+
+# --- Endpoints ---
+
+# 3. Crop Advisory (gridded forecast, see weather_grid.py)
+@router.post("/crop-advisory", response_model=AdvisoryResponse)
+def crop_advisory(request: AdvisoryRequest):
+    """
+    Checks the weather forecast for the farm's tile over the harvest week
+    to flag post-harvest risks. "Unknown" when no forecast run covers it.
+    """
+    from weather_grid import ADVICE, HARVEST_WINDOW_DAYS, RISK_LEVELS, get_weather_grid, risk_codes
+
+    grid = get_weather_grid()
+    if grid is None:
+        return AdvisoryResponse(risk_level="Unknown", message=ADVICE["Unknown"],
+                                weather_forecast="No forecast available")
+    window = grid.harvest_window([request.lat], [request.lon], [request.harvest_date])
+    level = RISK_LEVELS[int(risk_codes(window)[0])]
+    covered = int(window["days_covered"][0])
+    if covered == 0:
+        return AdvisoryResponse(risk_level=level, message=ADVICE[level],
+                                weather_forecast="No forecast available", forecast_run=grid.run)
+    rain = float(window["rainfall_mm"][0])
+    rainy = int(window["rainy_days"][0])
+    humidity = float(window["humidity_percent"][0])
+    forecast = f"Rainfall: {rain:.0f}mm expected over {rainy} rainy day{'s' if rainy != 1 else ''}, " \
+               f"Humidity: {humidity:.0f}%"
+    if covered < HARVEST_WINDOW_DAYS:
+        forecast += f" ({covered} of {HARVEST_WINDOW_DAYS} days forecast)"
+    return AdvisoryResponse(
+        risk_level=level,
+        message=ADVICE[level],
+        weather_forecast=forecast,
+        rainfall_mm=round(rain, 1),
+        max_daily_rainfall_mm=round(float(window["max_daily_rainfall_mm"][0]), 1),
+        rainy_days=rainy,
+        humidity_percent=round(humidity, 1),
+        days_covered=covered,
+        forecast_run=grid.run,
+    )
+
+MAX_ADVISORY_BATCH = 200_000
+
+ADVISORY_BATCH_COLUMNS = ("farm_ids", "risk_level", "rainfall_mm", "max_daily_rainfall_mm",
+                          "rainy_days", "humidity_percent", "days_covered")
+
+def _advise_batch(req: BatchAdvisoryRequest, fmt: str):
+    import numpy as np
+
+    from serialization import render
+    from weather_grid import ADVICE, RISK_LEVELS, get_weather_grid, risk_codes
+
+    n = len(req.lat)
+    grid = get_weather_grid()
+    if grid is None:
+        window = {"rainfall_mm": np.full(n, np.nan), "max_daily_rainfall_mm": np.full(n, np.nan),
+                  "rainy_days": np.zeros(n, dtype=np.int64), "humidity_percent": np.full(n, np.nan),
+                  "days_covered": np.zeros(n, dtype=np.int64)}
+    else:
+        window = grid.harvest_window(req.lat, req.lon, req.harvest_date)
+    codes = risk_codes(window)
+    unknown = window["days_covered"] == 0
+    levels = np.array(RISK_LEVELS, dtype=object)[codes]
+    result = {
+        "count": n,
+        "forecast_run": grid.run if grid is not None else None,
+        "risk_counts": {level: int(count) for level, count
+                        in zip(RISK_LEVELS, np.bincount(codes, minlength=len(RISK_LEVELS))) if count},
+        "risk_level": levels,
+        "rainfall_mm": np.where(unknown, np.nan, window["rainfall_mm"]).round(1),
+        "max_daily_rainfall_mm": np.where(unknown, np.nan, window["max_daily_rainfall_mm"]).round(1),
+        "rainy_days": window["rainy_days"],
+        "humidity_percent": window["humidity_percent"].round(1),
+        "days_covered": window["days_covered"],
+        # Messages once per level rather than once per farm
+        "advice": {level: ADVICE[level] for level in RISK_LEVELS},
+    }
+    if req.farm_ids is not None:
+        result["farm_ids"] = req.farm_ids
+    return render(result, fmt, table=[name for name in ADVISORY_BATCH_COLUMNS if name in result])
+
+@router.post("/crop-advisory/batch")
+async def crop_advisory_batch(req: BatchAdvisoryRequest, request: Request):
+    """
+    Harvest-week advisories for a whole FPO's farm list against one
+    forecast run, computed with a single gather per weather variable.
+    Results are arrays in request order; `advice` maps each risk level to
+    its message.
+    """
+    import numpy as np
+
+    from executors import run_threaded
+    from serialization import negotiate
+
+    n = len(req.lat)
+    if len(req.lon) != n or len(req.harvest_date) != n or (req.farm_ids is not None and len(req.farm_ids) != n):
+        raise HTTPException(status_code=400, detail="all columns must have the same length")
+    if n > MAX_ADVISORY_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_ADVISORY_BATCH} farms")
+    if not (np.isfinite(req.lat).all() and np.isfinite(req.lon).all()):
+        raise HTTPException(status_code=400, detail="lat and lon must be finite")
+    return await run_threaded(_advise_batch, req, negotiate(request.headers.get("accept")))
+
+# 7. Real-time Weather Alerts (background-polled feed, see weather_alerts.py)
+@router.get("/weather-alerts", response_model=List[WeatherAlertResponse])
+async def get_weather_alerts(state: Optional[str] = None):
+    """
+    Current weather alerts, optionally only those covering `state`, served
+    from the latest feed snapshot without any I/O. `X-Alerts-Stale: 1` marks
+    a snapshot whose refresh is overdue (the feed is down); it is still served.
+    """
+    from weather_alerts import get_alert_feed
+
+    feed = get_alert_feed()
+    snapshot = feed.snapshot
+    stale = feed.is_stale()
+    if stale:
+        feed.wake()
+    age = max(0, int(time.time() - snapshot.fetched_at)) if snapshot.fetched_at else 0
+    return Response(
+        content=snapshot.body_for(state),
+        media_type="application/json",
+        headers={
+            "Age": str(age),
+            "Cache-Control": f"public, max-age={max(0, int(feed.poll_s) - age)}, "
+                             f"stale-while-revalidate={int(feed.max_backoff_s)}",
+            "X-Alerts-Origin": snapshot.origin,
+            "X-Alerts-Stale": "1" if stale else "0",
+        },
+    )
+
+@router.get("/weather-alerts/status")
+def weather_alert_feed_status():
+    from weather_alerts import get_alert_feed
+
+    return get_alert_feed().status()
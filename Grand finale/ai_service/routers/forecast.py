@@ -0,0 +1,298 @@
+"""
+Market endpoints: price forecasts (single and streamed batch), demand-supply
+analysis and Monte Carlo sell-vs-hold decisions for stored lots.
+"""
+import math
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+def preload():
+    from market_rollups import get_rollup_view
+    from price_forecast import price_forecaster
+
+    price_forecaster.warm()
+    get_rollup_view()
+
+# --- Data Models ---
+
+class ForecastRequest(BaseModel):
+    crop: str
+    region: str
+
+class ForecastResponse(BaseModel):
+    dates: List[date]
+    predicted_prices: List[float]
+    trend: str
+
+class BatchForecastRequest(BaseModel):
+    crops: List[str]
+    regions: List[str]
+    horizons_weeks: List[int] = [26]
+
+class DemandSupplyResponse(BaseModel):
+    crop: str
+    high_demand_periods: List[str]
+    import_dependency_level: str # High / Medium / Low, or Unknown without trade data
+    region: Optional[str] = None
+    period_start: Optional[str] = None # YYYY-MM
+    period_end: Optional[str] = None
+    import_share: Optional[float] = None # national imports / (national imports + national mandi arrivals)
+    import_scope: str = "national" # imports and import_share are national whatever the region filter
+    arrivals_tonnes: Optional[float] = None # mandi arrivals in `region`
+    national_arrivals_tonnes: Optional[float] = None
+    imports_tonnes: Optional[float] = None # national
+    price_zscore: Optional[float] = None # last month vs the trailing 12
+
+class SellHoldLot(BaseModel):
+    crop: str
+    region: str
+    quantity_quintals: float
+    lot_id: Optional[str] = None
+    temperature_c: float = 25.0 # storage conditions, as for /predict/spoilage
+    humidity_percent: float = 65.0
+    degradation: float = 0.0 # 0 = fresh, 1 = end of shelf life (see /storage)
+    storage_cost_per_quintal_week: Optional[float] = None # INR; default sell_hold.DEFAULT_STORAGE_COST
+
+class SellHoldSettings(BaseModel):
+    horizon_weeks: int = 26
+    n_paths: int = 10000
+    seed: int = 0
+    annual_interest_rate: Optional[float] = None # default sell_hold.DEFAULT_INTEREST_RATE
+    risk_aversion: float = 0.0 # 0 = maximise expected revenue, 1 = maximise the 5th percentile
+
+class SellHoldRequest(SellHoldLot, SellHoldSettings):
+    pass
+
+class BatchSellHoldRequest(SellHoldSettings):
+    lots: List[SellHoldLot]
+    fpo_id: Optional[str] = None
+
+class SellHoldResponse(BaseModel):
+    lot_id: Optional[str]
+    crop: str
+    region: str
+    recommendation: str # "Sell now" / "Hold N weeks"
+    best_horizon_weeks: int
+    current_price: float
+    # One entry per horizon, week 0 (sell now) .. horizon_weeks
+    dates: List[date]
+    expected_price: List[float]
+    expected_revenue: List[float] # INR, net of storage cost and spoilage, discounted to today
+    revenue_p5: List[float]
+    revenue_std: List[float]
+    prob_beats_selling_now: List[float]
+    degradation: List[float]
+    spoilage_risk_level: List[str]
+
+# --- Endpoints ---
+
+# 1. Price Forecasting (Seasonal decomposition + damped Holt smoothing, see price_forecast.py)
+@router.post("/forecast-price", response_model=ForecastResponse)
+async def forecast_price(request: ForecastRequest, http_request: Request):
+    """
+    Predicts oilseed prices for the next 6 months from local mandi price history.
+    """
+    from executors import JobTimeout, Overloaded, run_cpu
+    from price_forecast import price_forecaster
+    from serialization import respond
+
+    try:
+        dates, prices = await price_forecaster.forecast_async(request.crop, request.region, date.today(), run_cpu)
+        trend_direction = "Upward" if prices[-1] > prices[0] else "Downward"
+
+        return respond(http_request, {
+            "dates": dates,
+            "predicted_prices": prices,
+            "trend": trend_direction,
+        }, table=("dates", "predicted_prices"))
+    except (Overloaded, JobTimeout):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+MAX_FORECAST_BATCH_ROWS = 5000
+
+@router.post("/forecast-price/batch")
+async def forecast_price_batch(request: BatchForecastRequest):
+    """
+    Forecasts the crops x regions x horizons cross product in one call.
+    Results stream back as NDJSON, one line per combination, in completion order;
+    uncached model fits run in parallel on the CPU lane, one per worker at a time.
+    """
+    if any(h < 1 or h > 104 for h in request.horizons_weeks):
+        raise HTTPException(status_code=400, detail="horizons_weeks must be between 1 and 104")
+    n_rows = len(request.crops) * len(request.regions) * len(request.horizons_weeks)
+    if n_rows > MAX_FORECAST_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_FORECAST_BATCH_ROWS} rows")
+
+    from executors import PROCESS_WORKERS, run_cpu
+    from price_forecast import price_forecaster
+    from serialization import dumps
+
+    async def lines():
+        async for row in price_forecaster.stream_forecasts(
+            request.crops, request.regions, request.horizons_weeks, date.today(), run_cpu, PROCESS_WORKERS
+        ):
+            yield dumps(row) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# 2. Demand-Supply Analysis (monthly rollups, see market_rollups.py)
+def _month(value: Optional[str], name: str):
+    import numpy as np
+
+    if value is None:
+        return None
+    try:
+        return np.datetime64(value[:7], "M")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a YYYY-MM month")
+
+@router.get("/demand-supply", response_model=List[DemandSupplyResponse])
+def analyze_demand_supply(crop: Optional[str] = None, region: Optional[str] = None,
+                          start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Analyzes import vs domestic production to flag High Demand periods.
+    Filters: crop, region (unknown regions use the national series) and a
+    start/end month range (default: the latest 12 months with data).
+    Arrivals and price signals are the region's; imports and the import
+    share are national.
+    """
+    from market_rollups import get_rollup_view
+
+    start_month, end_month = _month(start, "start"), _month(end, "end")
+    if start_month is not None and end_month is not None and start_month > end_month:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        rows = get_rollup_view().query(crop, region, start_month, end_month)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No market data for crop {crop!r}")
+    return [DemandSupplyResponse(**row) for row in rows]
+
+
+# 3. Sell vs hold (Monte Carlo price paths x storage cost x spoilage, see sell_hold.py)
+MAX_SELL_HOLD_LOTS = 1000
+MAX_SELL_HOLD_PATHS = 50000
+MAX_SELL_HOLD_CELLS = 100_000_000 # lots x paths x horizons
+
+def _check_sell_hold(settings: SellHoldSettings, lots: List[SellHoldLot]):
+    if not 1 <= settings.horizon_weeks <= 52:
+        raise HTTPException(status_code=400, detail="horizon_weeks must be between 1 and 52")
+    if not 100 <= settings.n_paths <= MAX_SELL_HOLD_PATHS:
+        raise HTTPException(status_code=400, detail=f"n_paths must be between 100 and {MAX_SELL_HOLD_PATHS}")
+    if not (0 <= settings.risk_aversion < math.inf and 0 <= (settings.annual_interest_rate or 0) <= 1):
+        raise HTTPException(status_code=400, detail="risk_aversion must not be negative and "
+                                                    "annual_interest_rate must be within 0..1")
+    for lot in lots:
+        if not (0 < lot.quantity_quintals < math.inf and 0 <= lot.degradation < math.inf
+                and 0 <= (lot.storage_cost_per_quintal_week or 0) < math.inf):
+            raise HTTPException(status_code=400, detail="quantity must be positive; degradation and "
+                                                        "storage cost finite and not negative")
+        if not (-20 <= lot.temperature_c <= 60 and 0 <= lot.humidity_percent <= 100):
+            raise HTTPException(status_code=400, detail="temperature_c must be within -20..60 and "
+                                                        "humidity_percent within 0..100")
+    if len(lots) > MAX_SELL_HOLD_LOTS \
+            or len(lots) * settings.n_paths * (settings.horizon_weeks + 1) > MAX_SELL_HOLD_CELLS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_SELL_HOLD_LOTS} lots "
+                                                    f"or {MAX_SELL_HOLD_CELLS} lot x path x week cells")
+
+def _simulate_lots(settings: SellHoldSettings, lots: List[SellHoldLot]):
+    import sell_hold
+
+    return sell_hold.evaluate(
+        [lot.crop for lot in lots], [lot.region for lot in lots],
+        [lot.quantity_quintals for lot in lots],
+        [lot.temperature_c for lot in lots], [lot.humidity_percent for lot in lots],
+        [lot.degradation for lot in lots],
+        [sell_hold.DEFAULT_STORAGE_COST if lot.storage_cost_per_quintal_week is None
+         else lot.storage_cost_per_quintal_week for lot in lots],
+        lot_ids=[lot.lot_id if lot.lot_id is not None else str(i) for i, lot in enumerate(lots)],
+        weeks=settings.horizon_weeks, n_paths=settings.n_paths, seed=settings.seed,
+        interest_rate=(sell_hold.DEFAULT_INTEREST_RATE if settings.annual_interest_rate is None
+                       else settings.annual_interest_rate),
+        risk_aversion=settings.risk_aversion,
+    )
+
+def _sell_hold_one(req: SellHoldRequest) -> SellHoldResponse:
+    import sell_hold
+
+    r = _simulate_lots(req, [req])
+    best = int(r.best_horizon[0])
+    return SellHoldResponse(
+        lot_id=req.lot_id,
+        crop=req.crop,
+        region=req.region,
+        recommendation=sell_hold.recommendation(best),
+        best_horizon_weeks=best,
+        current_price=round(float(r.current_price[0]), 2),
+        dates=r.dates.astype(object).tolist(),
+        expected_price=r.expected_price[0].round(2).tolist(),
+        expected_revenue=r.expected_revenue[0].round(2).tolist(),
+        revenue_p5=r.revenue_p5[0].round(2).tolist(),
+        revenue_std=r.revenue_std[0].round(2).tolist(),
+        prob_beats_selling_now=r.prob_beats_now[0].round(4).tolist(),
+        degradation=r.degradation[0].round(4).tolist(),
+        spoilage_risk_level=sell_hold.risk_band(r.degradation[0]),
+    )
+
+SELL_HOLD_LOT_COLUMNS = ("lot_ids", "recommendation", "best_horizon_weeks", "current_price", "expected_price",
+                         "expected_revenue", "revenue_p5", "revenue_std", "prob_beats_selling_now", "degradation")
+
+def _sell_hold_batch(req: BatchSellHoldRequest, fmt: str):
+    import numpy as np
+
+    import sell_hold
+    from serialization import render
+
+    r = _simulate_lots(req, req.lots)
+    return render({
+        "fpo_id": req.fpo_id,
+        "count": len(req.lots),
+        "lot_ids": [lot.lot_id for lot in req.lots],
+        "dates": np.datetime_as_string(r.dates),
+        "recommendation": [sell_hold.recommendation(weeks) for weeks in r.best_horizon.tolist()],
+        "best_horizon_weeks": r.best_horizon,
+        "current_price": r.current_price.round(2),
+        # Nested [lot][week]
+        "expected_price": r.expected_price.round(2),
+        "expected_revenue": r.expected_revenue.round(2),
+        "revenue_p5": r.revenue_p5.round(2),
+        "revenue_std": r.revenue_std.round(2),
+        "prob_beats_selling_now": r.prob_beats_now.round(4),
+        "degradation": r.degradation.round(4),
+        # Every lot sold at its recommended week, summed path by path
+        "portfolio": {name: round(value, 4 if name.startswith("prob") else 2)
+                      for name, value in r.portfolio.items()},
+    }, fmt, table=SELL_HOLD_LOT_COLUMNS)
+
+@router.post("/sell-hold", response_model=SellHoldResponse)
+async def sell_or_hold(req: SellHoldRequest):
+    """
+    Expected net revenue and downside risk of selling a stored lot now vs
+    holding it 1..horizon_weeks weeks, over n_paths simulated price paths
+    (seeded, reproducible) with storage cost, interest and spoilage.
+    """
+    from executors import run_threaded
+
+    _check_sell_hold(req, [req])
+    return await run_threaded(_sell_hold_one, req)
+
+@router.post("/sell-hold/batch")
+async def sell_or_hold_batch(req: BatchSellHoldRequest, request: Request):
+    """
+    Sell-vs-hold for every lot an FPO holds in one call. Lots of the same
+    crop/region share price paths, so the portfolio totals reflect their
+    correlation. Per-lot results are arrays in request order.
+    """
+    from executors import run_threaded
+    from serialization import negotiate
+
+    _check_sell_hold(req, req.lots)
+    return await run_threaded(_sell_hold_batch, req, negotiate(request.headers.get("accept")))
@@ -0,0 +1,376 @@
+"""
+Logistics endpoints: ANN cost/ETA estimates, distance matrices, road-network
+ETAs and single/fleet pickup route optimisation.
+
+Large results are encoded by serialization.respond (orjson, or MessagePack /
+Arrow when the client asks for them) rather than re-validated against their
+response_model, which still documents the JSON shape.
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel, ValidationError
+
+from response_cache import cacheable
+
+router = APIRouter()
+
+
+def preload():
+    import executors
+    import road_graph
+    import routing
+    from logistics_ann import get_logistics_ann
+
+    get_logistics_ann()
+    road_graph.get_road_graph()
+    routing.solve_route([0.0, 0.1, 0.2], [0.0, 0.1, 0.0], time_budget_s=0.0)
+    # Spawn a CPU-lane worker and import routing there before the first request
+    pool = executors.get_cpu_pool()
+    pool.submit(routing.solve_route, [0.0, 0.1, 0.2], [0.0, 0.1, 0.0], 0.0).result()
+    # ...and map the road graph there too (a point pair far off any network)
+    pool.submit(road_graph.road_eta, 0.0, 0.0, 0.0, 0.0).result()
+
+# --- ANN Model for Logistics ---
+# Weights are loaded from the versioned artifact on first use (see logistics_ann.py)
+
+class LogisticsPredictionRequest(BaseModel):
+    distance_km: float
+    weight_tons: float
+
+@router.post("/logistics/predict", openapi_extra=cacheable())
+async def predict_logistics(req: LogisticsPredictionRequest):
+    from logistics_ann import get_logistics_ann
+
+    # One NumPy forward pass (tens of microseconds): cheaper inline than a thread hop
+    return get_logistics_ann().predict(req.distance_km, req.weight_tons)
+
+MAX_LOGISTICS_BATCH = 10000
+
+class LogisticsBatchRequest(BaseModel):
+    # Rows are validated individually so one bad row doesn't reject the batch
+    items: List[Any]
+
+@router.post("/logistics/predict/batch")
+async def predict_logistics_batch(req: LogisticsBatchRequest, request: Request):
+    """
+    Scores many (distance, weight) pairs in one ANN matrix pass.
+    Invalid rows come back with an `error` instead of failing the whole batch.
+    """
+    from executors import run_threaded
+    from serialization import respond
+
+    if len(req.items) > MAX_LOGISTICS_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_LOGISTICS_BATCH} items")
+    # Row validation plus the forward pass, off the event loop
+    return respond(request, await run_threaded(_score_logistics_batch, req.items), table=("results",))
+
+def _score_logistics_batch(items: List[Any]) -> Dict[str, Any]:
+    from logistics_ann import get_logistics_ann
+
+    results: List[Dict[str, Any]] = [None] * len(items)
+    valid_idx, distances, weights = [], [], []
+    for i, row in enumerate(items):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("item must be an object with distance_km and weight_tons")
+            item = LogisticsPredictionRequest(**row)
+            if not (math.isfinite(item.distance_km) and math.isfinite(item.weight_tons)):
+                raise ValueError("distance_km and weight_tons must be finite")
+            if item.distance_km < 0 or item.weight_tons < 0:
+                raise ValueError("distance_km and weight_tons must be non-negative")
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results[i] = {"index": i, "error": detail}
+            continue
+        except (ValueError, TypeError) as e:
+            results[i] = {"index": i, "error": str(e)}
+            continue
+        valid_idx.append(i)
+        distances.append(item.distance_km)
+        weights.append(item.weight_tons)
+
+    if valid_idx:
+        predictions = get_logistics_ann().predict_many(distances, weights)
+        for i, (cost, eta) in zip(valid_idx, predictions.tolist()):
+            results[i] = {"index": i, "predicted_cost": round(cost, 2), "predicted_eta": round(eta, 1)}
+
+    return {"results": results, "count": len(results), "errors": len(results) - len(valid_idx)}
+
+# --- End ANN Model ---
+
+# --- Data Models ---
+
+class Location(BaseModel):
+    id: str
+    lat: float
+    lon: float
+
+class RouteRequest(BaseModel):
+    warehouse: Location
+    farmers: List[Location]
+    time_budget_ms: float = 500.0 # Wall-clock cap for the 2-opt/Or-opt improvement
+    metric: str = "road" # "road" (road graph distances when installed) or "haversine"
+
+class RouteResponse(BaseModel):
+    ordered_path: List[Location]
+    total_distance_km: float
+    greedy_distance_km: Optional[float] = None
+    improvement_pct: Optional[float] = None
+    solve_time_ms: Optional[float] = None
+    metric: Optional[str] = None # the distances actually used
+
+class PickupLocation(Location):
+    load_tons: float = 0.0
+
+class Vehicle(BaseModel):
+    id: str
+    capacity_tons: float
+
+class FleetRouteRequest(BaseModel):
+    warehouse: Location
+    farmers: List[PickupLocation]
+    fleet: List[Vehicle]
+    time_budget_ms: float = 1000.0 # Wall-clock cap for the per-vehicle improvement; route construction always completes
+
+class VehicleRoute(BaseModel):
+    vehicle_id: str
+    ordered_path: List[Location]
+    load_tons: float
+    distance_km: float
+    predicted_cost: float # LogisticsANN estimate for this distance/load
+    predicted_eta: float
+
+class FleetRouteResponse(BaseModel):
+    routes: List[VehicleRoute]
+    unassigned_farmers: List[str]
+    total_distance_km: float
+    total_predicted_cost: float
+    solve_time_ms: float
+
+class LogisticsETARequest(BaseModel):
+    origin_lat: float
+    origin_lon: float
+    dest_lat: float
+    dest_lon: float
+    avg_speed_kmph: float = 40.0
+
+class LogisticsETAResponse(BaseModel):
+    eta_hours: float
+    traffic_factor: float = 1.0 # no live traffic feed is applied yet, so always 1.0
+    distance_km: float
+    detour_factor: Optional[float] = None # road km per straight-line km assumed by the haversine fallback
+    source: str = "haversine" # "road_graph" when routed over the road network
+    access_km: Optional[float] = None # straight-line legs to/from the snapped road nodes
+
+class LogisticsOneToManyRequest(BaseModel):
+    origin_lat: float
+    origin_lon: float
+    # Columnar destinations
+    dest_lats: List[float]
+    dest_lons: List[float]
+
+class DistanceMatrixRequest(BaseModel):
+    # Columnar coordinates; destinations default to the origins
+    origin_lats: List[float]
+    origin_lons: List[float]
+    dest_lats: Optional[List[float]] = None
+    dest_lons: Optional[List[float]] = None
+
+# --- Helper Functions ---
+
+def calculate_distance(loc1: Location, loc2: Location) -> float:
+    import geo
+
+    return geo.point_distance(loc1.lat, loc1.lon, loc2.lat, loc2.lon)
+
+def _coordinates(stops):
+    import numpy as np
+
+    lats = np.fromiter((s.lat for s in stops), dtype=np.float64, count=len(stops))
+    lons = np.fromiter((s.lon for s in stops), dtype=np.float64, count=len(stops))
+    return lats, lons
+
+# --- Endpoints ---
+
+# Logistics Optimization (Nearest-neighbour + 2-opt/Or-opt, see routing.py)
+MAX_ROUTE_BUDGET_MS = 10000
+ROUTE_METRICS = ("road", "haversine")
+
+@router.post("/optimize-route", response_model=RouteResponse)
+async def optimize_route(request: RouteRequest, http_request: Request):
+    if request.metric not in ROUTE_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(ROUTE_METRICS)}")
+
+    from executors import JobTimeout, Overloaded, run_cpu
+    from routing import solve_road_route, solve_route
+    from serialization import respond
+
+    try:
+        stops = [request.warehouse] + request.farmers
+        lats, lons = _coordinates(stops)
+        budget_ms = min(max(request.time_budget_ms, 0.0), MAX_ROUTE_BUDGET_MS)
+
+        # The road matrix is built in the worker, which maps the graph itself
+        solve = solve_road_route if request.metric == "road" else solve_route
+        solution = await run_cpu(solve, lats, lons, budget_ms / 1000)
+        path = [{"id": stops[i].id, "lat": stops[i].lat, "lon": stops[i].lon} for i in solution.tour]
+
+        return respond(http_request, {
+            "ordered_path": path,
+            "total_distance_km": round(solution.distance_km, 2),
+            "greedy_distance_km": round(solution.greedy_distance_km, 2),
+            "improvement_pct": round(solution.improvement_pct, 2),
+            "solve_time_ms": round(solution.solve_time_s * 1000, 2),
+            "metric": solution.metric,
+        }, table=("ordered_path",))
+    except (Overloaded, JobTimeout):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Capacitated multi-vehicle pickups (Clarke-Wright savings + per-vehicle 2-opt/Or-opt)
+@router.post("/optimize-route/fleet", response_model=FleetRouteResponse)
+async def optimize_fleet_route(request: FleetRouteRequest, http_request: Request):
+    if not request.fleet:
+        raise HTTPException(status_code=400, detail="fleet must contain at least one vehicle")
+    if any(v.capacity_tons <= 0 for v in request.fleet):
+        raise HTTPException(status_code=400, detail="capacity_tons must be positive")
+    if any(f.load_tons < 0 for f in request.farmers):
+        raise HTTPException(status_code=400, detail="load_tons must be non-negative")
+
+    import numpy as np
+    from executors import PROCESS_WORKERS, JobTimeout, Overloaded, run_threaded, submit_cpu
+    from logistics_ann import get_logistics_ann
+    from routing import solve_fleet
+    from serialization import respond
+
+    try:
+        stops = [request.warehouse] + request.farmers
+        lats, lons = _coordinates(stops)
+        loads = np.array([0.0] + [f.load_tons for f in request.farmers])
+        budget_ms = min(max(request.time_budget_ms, 0.0), MAX_ROUTE_BUDGET_MS)
+
+        # Threaded, not the CPU lane: solve_fleet fans its per-vehicle improvement
+        # out to the CPU lane itself, one job per worker at most
+        solution = await run_threaded(
+            solve_fleet, lats, lons, loads,
+            [v.capacity_tons for v in request.fleet],
+            budget_ms / 1000, submit_cpu, PROCESS_WORKERS
+        )
+        estimates = get_logistics_ann().predict_many(
+            [r.distance_km for r in solution.routes],
+            [r.load for r in solution.routes]
+        )
+
+        routes = []
+        for r, (cost, eta) in zip(solution.routes, estimates.tolist()):
+            routes.append({
+                "vehicle_id": request.fleet[r.vehicle].id,
+                "ordered_path": [{"id": stops[i].id, "lat": stops[i].lat, "lon": stops[i].lon} for i in r.tour],
+                "load_tons": round(r.load, 3),
+                "distance_km": round(r.distance_km, 2),
+                "predicted_cost": round(cost, 2),
+                "predicted_eta": round(eta, 1),
+            })
+        return respond(http_request, {
+            "routes": routes,
+            "unassigned_farmers": [stops[i].id for i in solution.unassigned],
+            "total_distance_km": round(sum(r.distance_km for r in solution.routes), 2),
+            "total_predicted_cost": round(sum(r["predicted_cost"] for r in routes), 2),
+            "solve_time_ms": round(solution.solve_time_s * 1000, 2),
+        })
+    except (Overloaded, JobTimeout):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Road ETAs: bidirectional A* with landmarks over the road graph (see road_graph.py).
+# Without a graph, or for points off it, the haversine distance is driven at
+# avg_speed_kmph with a fixed detour factor.
+MAX_ETA_DESTINATIONS = 5000
+
+@router.post("/logistics/eta", response_model=LogisticsETAResponse, openapi_extra=cacheable())
+async def calculate_eta(req: LogisticsETARequest):
+    if req.avg_speed_kmph <= 0:
+        raise HTTPException(status_code=400, detail="avg_speed_kmph must be positive")
+
+    import geo
+    from executors import run_cpu
+    from road_graph import ROAD_DETOUR_FACTOR, get_road_graph, road_eta
+
+    if get_road_graph() is not None:
+        route = await run_cpu(road_eta, req.origin_lat, req.origin_lon, req.dest_lat, req.dest_lon)
+        if route is not None:
+            # Edge speeds are free-flow; no live traffic feed is applied on top
+            return LogisticsETAResponse(
+                eta_hours=round(route.time_s / 3600, 2),
+                distance_km=round(route.length_m / 1000, 2),
+                source="road_graph",
+                access_km=round(route.access_km, 2)
+            )
+
+    distance = geo.point_distance(req.origin_lat, req.origin_lon, req.dest_lat, req.dest_lon)
+    eta = (distance / req.avg_speed_kmph) * ROAD_DETOUR_FACTOR
+    return LogisticsETAResponse(
+        eta_hours=round(eta, 2),
+        distance_km=round(distance, 2),
+        detour_factor=ROAD_DETOUR_FACTOR
+    )
+
+@router.post("/logistics/eta/one-to-many")
+async def calculate_eta_one_to_many(req: LogisticsOneToManyRequest, request: Request):
+    """ETAs from one origin to many destinations in one road-graph search."""
+    if len(req.dest_lats) != len(req.dest_lons):
+        raise HTTPException(status_code=400, detail="lat and lon arrays must have equal length")
+    if len(req.dest_lats) > MAX_ETA_DESTINATIONS:
+        raise HTTPException(status_code=413, detail=f"Request exceeds {MAX_ETA_DESTINATIONS} destinations")
+
+    import geo
+    from executors import run_cpu
+    from road_graph import FALLBACK_KMPH, ROAD_DETOUR_FACTOR, get_road_graph, road_cost_matrix
+    from serialization import respond
+
+    seconds, source = None, "haversine"
+    if get_road_graph() is not None and req.dest_lats:
+        seconds = await run_cpu(road_cost_matrix, [req.origin_lat], [req.origin_lon], req.dest_lats, req.dest_lons)
+        source = "road_graph"
+    if seconds is None:
+        distance = geo.one_to_many(req.origin_lat, req.origin_lon, req.dest_lats, req.dest_lons)
+        hours = distance * (ROAD_DETOUR_FACTOR / FALLBACK_KMPH)
+    else:
+        hours = seconds[0] / 3600
+    return respond(request, {"count": len(req.dest_lats), "source": source, "eta_hours": hours.round(2)},
+                   table=("eta_hours",))
+
+MAX_MATRIX_CELLS = 4_000_000 # 32 MB of float64
+
+@router.post("/logistics/distance-matrix")
+def logistics_distance_matrix(req: DistanceMatrixRequest, request: Request):
+    """
+    N x M haversine distance matrix (km).
+    Send `Accept: application/octet-stream` to get raw little-endian float64
+    bytes in row-major order (shape in the X-Matrix-Rows/X-Matrix-Cols headers)
+    instead of nested JSON lists.
+    """
+    import geo
+    from serialization import respond
+
+    dest_lats = req.origin_lats if req.dest_lats is None else req.dest_lats
+    dest_lons = req.origin_lons if req.dest_lons is None else req.dest_lons
+    if len(req.origin_lats) != len(req.origin_lons) or len(dest_lats) != len(dest_lons):
+        raise HTTPException(status_code=400, detail="lat and lon arrays must have equal length")
+    rows, cols = len(req.origin_lats), len(dest_lats)
+    if rows * cols > MAX_MATRIX_CELLS:
+        raise HTTPException(status_code=413, detail=f"Matrix exceeds {MAX_MATRIX_CELLS} cells")
+
+    matrix = geo.many_to_many(req.origin_lats, req.origin_lons, dest_lats, dest_lons)
+
+    if "application/octet-stream" in request.headers.get("accept", ""):
+        return Response(
+            content=matrix.astype("<f8", copy=False).tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Matrix-Rows": str(rows), "X-Matrix-Cols": str(cols), "X-Matrix-Dtype": "<f8"}
+        )
+    return respond(request, {"rows": rows, "cols": cols, "distances_km": matrix.round(3)}, table=("distances_km",))
@@ -0,0 +1,95 @@
+"""
+Pest detection from uploaded leaf images.
+
+Uploads are read in chunks up to MAX_UPLOAD_BYTES, then queued on a
+micro-batcher: requests arriving within BATCH_WINDOW_MS of each other are
+decoded and classified together on the bounded inference thread pool
+(see pest_model.py), keeping the event loop free. The batcher does its own
+admission control (MAX_PENDING_IMAGES), and callers give up after the
+executor job timeout.
+"""
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from pydantic import BaseModel
+
+router = APIRouter()
+
+MAX_UPLOAD_BYTES = int(os.environ.get("BIOMETRIX_MAX_UPLOAD_MB", "8")) * 1024 * 1024
+BATCH_WINDOW_MS = float(os.environ.get("BIOMETRIX_PEST_BATCH_WINDOW_MS", "4"))
+MAX_PENDING_IMAGES = 256
+_READ_CHUNK = 64 * 1024
+
+_batcher = None
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        from batching import MicroBatcher
+        from executors import get_inference_pool
+        from pest_model import MAX_BATCH, classify_batch
+
+        _batcher = MicroBatcher(
+            classify_batch, max_batch=MAX_BATCH, max_wait_ms=BATCH_WINDOW_MS,
+            max_pending=MAX_PENDING_IMAGES, executor=get_inference_pool,
+        )
+    return _batcher
+
+
+def preload():
+    from pest_model import get_pest_classifier
+
+    get_pest_classifier()
+    get_batcher()
+
+class PestDetectionResponse(BaseModel):
+    detected: bool
+    pest_type: Optional[str]
+    confidence: float
+    remedy: Optional[str]
+
+async def _read_capped(file: UploadFile) -> bytearray:
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    data = bytearray()
+    while True:
+        chunk = await file.read(_READ_CHUNK)
+        if not chunk:
+            return data
+        data += chunk
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+# 4. Pest Detection (colour/texture features + logistic regression, see pest_model.py)
+@router.post("/pest-detect", response_model=PestDetectionResponse)
+async def detect_pest(file: UploadFile = File(...)):
+    """
+    Analyzes uploaded leaf image to detect pests.
+    """
+    from batching import Overloaded
+    from executors import JOB_TIMEOUT_S
+    from pest_model import REMEDIES, ImageDecodeError
+
+    data = await _read_capped(file)
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    try:
+        label, confidence = await asyncio.wait_for(get_batcher().submit(data), JOB_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Pest detection timed out")
+    except Overloaded:
+        raise HTTPException(status_code=503, detail="Pest detector is busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    detected = label != "None"
+    return PestDetectionResponse(
+        detected=detected,
+        pest_type=label if detected else None,
+        confidence=round(confidence, 4),
+        remedy=REMEDIES.get(label)
+    )
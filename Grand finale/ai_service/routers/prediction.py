@@ -0,0 +1,218 @@
+"""
+Yield and storage spoilage predictions.
+
+Yield comes from the gradient-boosted model in yield_model.py, per field,
+as columnar batches, or over a district x crop x rainfall scenario grid.
+"""
+import math
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from response_cache import cacheable
+
+router = APIRouter()
+
+
+def preload():
+    from yield_model import get_yield_model
+
+    model = get_yield_model()
+    model.explain(model.grid(["other"], [0.0], ["other"], [0.0]))
+
+class YieldPredictionRequest(BaseModel):
+    crop: str
+    acreage: float
+    state: str
+    rainfall_mm: float
+    soil_nitrogen: float
+
+class YieldPredictionResponse(BaseModel):
+    predicted_yield_quintals: float
+    confidence_score: float
+    factors: Dict[str, float] # Explainable AI
+
+class BatchYieldPredictionRequest(BaseModel):
+    # One array per YieldPredictionRequest field, all the same length
+    field_ids: Optional[List[str]] = None
+    crop: List[str]
+    acreage: List[float]
+    state: List[str]
+    rainfall_mm: List[float]
+    soil_nitrogen: List[float]
+    include_factors: bool = True
+
+class GridDistrict(BaseModel):
+    name: str
+    state: str
+    soil_nitrogen: float
+    acreage: float = 1.0
+
+class YieldGridRequest(BaseModel):
+    districts: List[GridDistrict]
+    crops: List[str]
+    rainfall_mm: List[float]   # scenarios, e.g. deficit / normal / excess monsoon
+    include_factors: bool = False
+
+def _factor_columns(model, contrib, shape=None) -> Dict[str, object]:
+    """Scalar `Base Yield` plus one array of contributions (qtl/acre) per feature."""
+    from yield_model import BASE_FACTOR, FACTOR_NAMES
+
+    factors = {BASE_FACTOR: round(model.bias, 2)}
+    for j, name in enumerate(FACTOR_NAMES):
+        column = contrib[:, j].round(2)
+        factors[name] = column if shape is None else column.reshape(shape)
+    return factors
+
+@router.post("/predict/yield", response_model=YieldPredictionResponse, openapi_extra=cacheable())
+def predict_yield(req: YieldPredictionRequest):
+    """
+    Gradient-boosted yield estimate. `factors` are additive per-acre
+    contributions: `Base Yield` plus the other entries gives the yield per acre.
+    """
+    from yield_model import get_yield_model
+
+    if not all(math.isfinite(v) for v in (req.acreage, req.rainfall_mm, req.soil_nitrogen)):
+        raise HTTPException(status_code=400, detail="acreage, rainfall_mm and soil_nitrogen must be finite")
+    model = get_yield_model()
+    per_acre, contrib = model.explain(model.encode({
+        "crop": [req.crop], "state": [req.state],
+        "rainfall_mm": [req.rainfall_mm], "soil_nitrogen": [req.soil_nitrogen],
+    }))
+    factors = {name: value if isinstance(value, float) else float(value[0])
+               for name, value in _factor_columns(model, contrib).items()}
+    return YieldPredictionResponse(
+        predicted_yield_quintals=round(max(0.0, float(per_acre[0])) * req.acreage, 2),
+        confidence_score=round(model.r2, 2),
+        factors=factors
+    )
+
+MAX_YIELD_BATCH = 200_000
+MAX_YIELD_GRID_CELLS = 250_000
+
+YIELD_BATCH_COLUMNS = ("field_ids", "predicted_yield_quintals", "yield_per_acre")
+
+def _score_yield_batch(req: BatchYieldPredictionRequest, fmt: str):
+    import numpy as np
+
+    from serialization import render
+    from yield_model import get_yield_model
+
+    model = get_yield_model()
+    X = model.encode({"crop": req.crop, "state": req.state,
+                      "rainfall_mm": req.rainfall_mm, "soil_nitrogen": req.soil_nitrogen})
+    acreage = np.asarray(req.acreage, dtype=np.float64)
+    if not (np.isfinite(X[:, 2:]).all() and np.isfinite(acreage).all()):
+        raise HTTPException(status_code=400, detail="numeric columns must be finite")
+    per_acre, contrib = model.explain(X, contributions=req.include_factors)
+    per_acre = np.maximum(per_acre, 0.0)
+    result = {
+        "count": len(X),
+        "confidence_score": round(model.r2, 2),
+        "predicted_yield_quintals": (per_acre * acreage).round(2),
+        "yield_per_acre": per_acre.round(2),
+    }
+    if req.include_factors:
+        result["factors"] = _factor_columns(model, contrib)
+    if req.field_ids is not None:
+        result["field_ids"] = req.field_ids
+    return render(result, fmt, table=[name for name in YIELD_BATCH_COLUMNS if name in result])
+
+@router.post("/predict/yield/batch")
+async def predict_yield_batch(req: BatchYieldPredictionRequest, request: Request):
+    """
+    Scores many fields in one vectorized pass. Results are arrays in request
+    order; `factors` holds one array per factor (plus the scalar `Base Yield`).
+    """
+    from executors import run_threaded
+    from serialization import negotiate
+
+    n = len(req.crop)
+    if any(len(col) != n for col in (req.acreage, req.state, req.rainfall_mm, req.soil_nitrogen)) \
+            or (req.field_ids is not None and len(req.field_ids) != n):
+        raise HTTPException(status_code=400, detail="all columns must have the same length")
+    if n > MAX_YIELD_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_YIELD_BATCH} rows")
+    return await run_threaded(_score_yield_batch, req, negotiate(request.headers.get("accept")))
+
+def _score_yield_grid(req: YieldGridRequest, fmt: str):
+    import numpy as np
+
+    from serialization import render
+    from yield_model import get_yield_model
+
+    model = get_yield_model()
+    shape = (len(req.districts), len(req.crops), len(req.rainfall_mm))
+    X = model.grid([d.state for d in req.districts], [d.soil_nitrogen for d in req.districts],
+                   req.crops, req.rainfall_mm)
+    acreage = np.array([d.acreage for d in req.districts], dtype=np.float64)
+    if not (np.isfinite(X[:, 2:]).all() and np.isfinite(acreage).all()):
+        raise HTTPException(status_code=400, detail="numeric inputs must be finite")
+    per_acre, contrib = model.explain(X, contributions=req.include_factors)
+    per_acre = np.maximum(per_acre, 0.0).reshape(shape)
+    result = {
+        "shape": list(shape),
+        "districts": [d.name for d in req.districts],
+        "crops": req.crops,
+        "rainfall_mm": req.rainfall_mm,
+        "confidence_score": round(model.r2, 2),
+        # Nested [district][crop][rainfall]
+        "predicted_yield_quintals": (per_acre * acreage[:, None, None]).round(2),
+        "yield_per_acre": per_acre.round(2),
+    }
+    if req.include_factors:
+        result["factors"] = _factor_columns(model, contrib, shape)
+    return render(result, fmt)
+
+@router.post("/predict/yield/grid")
+async def predict_yield_grid(req: YieldGridRequest, request: Request):
+    """
+    Evaluates every district x crop x rainfall-scenario cell in one
+    vectorized call. Each district's state, soil nitrogen and acreage apply
+    across its row of the cube.
+    """
+    from executors import run_threaded
+    from serialization import negotiate
+
+    cells = len(req.districts) * len(req.crops) * len(req.rainfall_mm)
+    if cells > MAX_YIELD_GRID_CELLS:
+        raise HTTPException(status_code=413, detail=f"Grid exceeds {MAX_YIELD_GRID_CELLS} cells")
+    return await run_threaded(_score_yield_grid, req, negotiate(request.headers.get("accept")))
+
+class SpoilageRiskRequest(BaseModel):
+    temperature_c: float
+    humidity_percent: float
+    storage_days: int
+    crop_type: str
+
+class SpoilageRiskResponse(BaseModel):
+    risk_probability: float # 0.0 to 1.0
+    risk_level: str # Low, Medium, High, Critical
+    estimated_shelf_life_days: int
+
+@router.post("/predict/spoilage", response_model=SpoilageRiskResponse, openapi_extra=cacheable())
+def predict_spoilage(req: SpoilageRiskRequest):
+    # Logistic Regression Simulation
+    # High Temp + High Humidity = High Risk
+    
+    risk_score = 0.0
+    if req.temperature_c > 25: risk_score += 0.3
+    if req.temperature_c > 35: risk_score += 0.3
+    if req.humidity_percent > 65: risk_score += 0.3
+    if req.storage_days > 90: risk_score += 0.2
+    
+    risk_score = min(risk_score, 1.0)
+    
+    level = "Low"
+    if risk_score > 0.3: level = "Medium"
+    if risk_score > 0.6: level = "High"
+    if risk_score > 0.8: level = "Critical"
+    
+    shelf_life = max(0, 180 - (req.temperature_c * 2) - (req.humidity_percent * 0.5))
+    
+    return SpoilageRiskResponse(
+        risk_probability=round(risk_score, 2),
+        risk_level=level,
+        estimated_shelf_life_days=int(shelf_life)
+    )
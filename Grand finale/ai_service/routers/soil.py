@@ -0,0 +1,117 @@
+"""
+Soil-based crop recommendation, per sample or for whole soil-health-card campaigns.
+"""
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from response_cache import cacheable
+from soil_rules import get_rule_table
+
+router = APIRouter()
+
+
+def preload():
+    table = get_rule_table()
+    for rule in table.soils:
+        _recommendations(rule.key)
+    table.assess_many({t.field: [0.0] for t in table.thresholds})
+
+class SoilRecommendationRequest(BaseModel):
+    soil_type: str # Black, Alluvial, Red, Sandy, Lateritic, Saline
+    nitrogen: float
+    phosphorus: float
+    potassium: float
+    ph_level: float
+
+class CropRecommendation(BaseModel):
+    crop_name: str
+    suitability_score: float # 0-100
+    expected_yield_per_acre: float
+    fertilizer_plan: str
+    irrigation_schedule: str
+    risk_factors: List[str]
+
+class SoilRecommendationResponse(BaseModel):
+    recommended_crops: List[CropRecommendation]
+    soil_health_status: str
+    amendment_suggestions: List[str]
+
+class BatchSoilRecommendationRequest(BaseModel):
+    # One array per SoilRecommendationRequest field, all the same length
+    sample_ids: Optional[List[str]] = None
+    soil_type: List[str]
+    nitrogen: List[float]
+    phosphorus: List[float]
+    potassium: List[float]
+    ph_level: List[float]
+
+@lru_cache(maxsize=None)
+def _recommendations(rule_key: str) -> List[dict]:
+    # Validated once per rule; responses share these read-only dicts
+    return [CropRecommendation(**crop._asdict()).model_dump() for crop in get_rule_table().by_key[rule_key].crops]
+
+@router.post("/recommend/soil", response_model=SoilRecommendationResponse, openapi_extra=cacheable())
+def recommend_crops_by_soil(req: SoilRecommendationRequest, request: Request):
+    """
+    AI Engine to recommend oilseed crops based on soil parameters.
+    Uses agro-climatic logic and nutrient analysis (rule table in data/soil_rules.json).
+    """
+    from serialization import respond
+
+    table = get_rule_table()
+    soil_status, amendments = table.assess({"ph_level": req.ph_level, "nitrogen": req.nitrogen,
+                                            "phosphorus": req.phosphorus, "potassium": req.potassium})
+    return respond(request, {
+        "recommended_crops": _recommendations(table.resolve(req.soil_type).key),
+        "soil_health_status": soil_status,
+        "amendment_suggestions": amendments,
+    }, table=("recommended_crops",))
+
+MAX_SOIL_BATCH = 500_000
+SOIL_BATCH_COLUMNS = ("sample_ids", "soil_rule", "soil_health_status", "amendment_suggestions")
+
+@router.post("/recommend/soil/batch")
+def recommend_crops_by_soil_batch(req: BatchSoilRecommendationRequest, request: Request):
+    """
+    Scores many soil samples at once. Per-sample results come back as arrays in
+    request order; each sample's `soil_rule` points into `crops_by_rule`, so
+    the crop catalogue is sent once rather than repeated per sample.
+    """
+    import numpy as np
+
+    from serialization import respond
+
+    n = len(req.soil_type)
+    columns = {"nitrogen": req.nitrogen, "phosphorus": req.phosphorus,
+               "potassium": req.potassium, "ph_level": req.ph_level}
+    if any(len(col) != n for col in columns.values()) or (req.sample_ids is not None and len(req.sample_ids) != n):
+        raise HTTPException(status_code=400, detail="all columns must have the same length")
+    if n > MAX_SOIL_BATCH:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_SOIL_BATCH} samples")
+
+    table = get_rule_table()
+    soil_types, inverse = np.unique(np.asarray(req.soil_type, dtype=object).astype(str), return_inverse=True)
+    keys = [table.resolve(s).key for s in soil_types.tolist()]
+    rule_keys = np.array(keys, dtype=object)[inverse.ravel()].tolist() if n else []
+
+    status, triggered = table.assess_many(columns)
+    # Each distinct combination of triggered thresholds maps to one shared suggestion list
+    codes = triggered.astype(np.int64) @ (1 << np.arange(len(table.thresholds), dtype=np.int64))
+    suggestions = {
+        code: [t.suggestion for j, t in enumerate(table.thresholds) if code >> j & 1]
+        for code in np.unique(codes).tolist()
+    }
+
+    result = {
+        "count": n,
+        "soil_rule": rule_keys,
+        "soil_health_status": status,
+        "amendment_suggestions": [suggestions[code] for code in codes.tolist()],
+        "crops_by_rule": {key: _recommendations(key) for key in set(keys)},
+    }
+    if req.sample_ids is not None:
+        result["sample_ids"] = req.sample_ids
+    return respond(request, result, table=[name for name in SOIL_BATCH_COLUMNS if name in result])
@@ -0,0 +1,134 @@
+"""
+Warehouse storage monitoring: streaming sensor ingest into the spoilage engine.
+
+Bays and lots are tracked by spoilage_engine.py. Events arrive as an NDJSON
+request body (POST /storage/events), applied in INGEST_BATCH_LINES chunks on
+the inference thread lane while the body is still streaming in, or over a
+WebSocket (/storage/ws) where each message is a batch. Responses carry only
+the alerts for lots that changed risk band.
+"""
+import json
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+
+router = APIRouter()
+
+INGEST_BATCH_LINES = 20_000
+MAX_RESPONSE_ALERTS = 1000
+MAX_RESPONSE_ERRORS = 100
+
+
+def preload():
+    from spoilage_engine import get_spoilage_engine
+
+    get_spoilage_engine()
+
+class _Totals:
+    """Merges per-chunk engine results into one capped response."""
+
+    def __init__(self):
+        self.accepted = self.rejected = self.alert_count = self.error_count = 0
+        self.alerts, self.errors = [], []
+
+    def add(self, result: dict, line_offset: int = 0):
+        self.accepted += result["accepted"]
+        self.rejected += result["rejected"]
+        self.alert_count += len(result["alerts"])
+        self.error_count += len(result["errors"])
+        self.alerts.extend(result["alerts"][:MAX_RESPONSE_ALERTS - len(self.alerts)])
+        for error in result["errors"][:MAX_RESPONSE_ERRORS - len(self.errors)]:
+            if "line" in error:
+                error = dict(error, line=error["line"] + line_offset)
+            self.errors.append(error)
+
+    def response(self) -> dict:
+        return {
+            "accepted": self.accepted, "rejected": self.rejected,
+            "alert_count": self.alert_count, "alerts": self.alerts,
+            "error_count": self.error_count, "errors": self.errors,
+        }
+
+@router.post("/storage/events")
+async def ingest_storage_events(request: Request):
+    """
+    Applies an NDJSON stream of readings / lot / dispatch events (see
+    spoilage_engine.py) in order. Returns counts, the alerts raised (first
+    MAX_RESPONSE_ALERTS; GET /storage/alerts has the rest) and line errors.
+    """
+    from executors import run_threaded
+    from spoilage_engine import get_spoilage_engine
+
+    engine = get_spoilage_engine()
+    totals = _Totals()
+    lines, pending, offset = [], b"", 0
+    async for chunk in request.stream():
+        parts = (pending + chunk).split(b"\n")
+        pending = parts.pop()
+        lines.extend(parts)
+        if len(lines) >= INGEST_BATCH_LINES:
+            totals.add(await run_threaded(engine.ingest_lines, lines), offset)
+            offset += len(lines)
+            lines = []
+    if pending:
+        lines.append(pending)
+    if lines:
+        totals.add(await run_threaded(engine.ingest_lines, lines), offset)
+    return totals.response()
+
+def _message_events(text: str) -> list:
+    text = text.strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+@router.websocket("/storage/ws")
+async def storage_stream(websocket: WebSocket):
+    """
+    Each message is a JSON array of events, one event, or NDJSON text; each
+    gets a reply with the same shape as POST /storage/events.
+    """
+    from executors import JobTimeout, Overloaded, run_threaded
+    from spoilage_engine import get_spoilage_engine
+
+    engine = get_spoilage_engine()
+    await websocket.accept()
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                events = _message_events(text)
+            except ValueError as e:
+                await websocket.send_json({"detail": f"invalid JSON: {e}"})
+                continue
+            totals = _Totals()
+            try:
+                totals.add(await run_threaded(engine.ingest_events, events))
+            except (Overloaded, JobTimeout) as e:
+                # Not applied (or, after a timeout, maybe applied later); the client may resend
+                await websocket.send_json({"detail": str(e), "retry": True})
+                continue
+            await websocket.send_json(totals.response())
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/storage/lots/{lot_id}")
+def storage_lot_status(lot_id: str):
+    from spoilage_engine import get_spoilage_engine
+
+    status = get_spoilage_engine().lot_status(lot_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown lot {lot_id!r}")
+    return status
+
+@router.get("/storage/summary")
+def storage_summary():
+    from spoilage_engine import get_spoilage_engine
+
+    return get_spoilage_engine().summary()
+
+@router.get("/storage/alerts")
+def storage_alerts(since: int = 0, limit: int = 1000):
+    """Recent band-crossing alerts with `seq` greater than `since`, oldest first."""
+    from spoilage_engine import get_spoilage_engine
+
+    return {"alerts": get_spoilage_engine().recent_alerts(since, max(0, min(limit, 10_000)))}
@@ -0,0 +1,482 @@
+"""
+Route engine for /optimize-route.
+
+Node 0 is always the depot (warehouse) and nodes 1..n are farmer stops.
+A greedy nearest-neighbour tour is built from a precomputed haversine
+matrix (or a BallTree for inputs too large for a dense matrix) and then
+improved with 2-opt and Or-opt moves until no move helps or the time
+budget runs out. Every move is scored for all candidate positions at
+once with NumPy, so one pass costs O(n) array operations, not O(n^2)
+Python iterations. `solve_road_route` runs the same search over road
+distances from the road graph (road_graph.py) when one is installed.
+
+The fleet mode splits stops across capacitated vehicles with Clarke-Wright
+savings and improves the vehicles' tours in parallel jobs on the caller's
+executor (the CPU lane for /optimize-route/fleet).
+"""
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from geo import distance_matrix, haversine_km
+
+# Largest node count for which the dense float64 matrix is built (~32 MB)
+DENSE_MATRIX_LIMIT = 2048
+# Neighbours kept per node from the BallTree before falling back to a full scan
+_KNN_MAX = 64
+_EPS = 1e-9
+
+
+class DistanceTable:
+    """Distances between depot + stops, dense when the matrix fits in memory."""
+
+    def __init__(self, lats, lons, dense: bool = None):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.n = len(self.lats)
+        if dense is None:
+            dense = self.n <= DENSE_MATRIX_LIMIT
+        self.matrix = distance_matrix(self.lats, self.lons) if dense else None
+        self.measured = False
+
+    @classmethod
+    def from_matrix(cls, lats, lons, matrix: np.ndarray) -> "DistanceTable":
+        """Table over a precomputed (road) km matrix, which tour lengths are then read from."""
+        table = cls.__new__(cls)
+        table.lats = np.asarray(lats, dtype=np.float64)
+        table.lons = np.asarray(lons, dtype=np.float64)
+        table.n = len(table.lats)
+        table.matrix = np.asarray(matrix, dtype=np.float64)
+        table.measured = True
+        return table
+
+    def row(self, i: int, idx: np.ndarray) -> np.ndarray:
+        """Distances from node i to every node in idx."""
+        if self.matrix is not None:
+            return self.matrix[i, idx]
+        return haversine_km(self.lats[i], self.lons[i], self.lats[idx], self.lons[idx])
+
+    def pairs(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Element-wise distances between nodes a[k] and b[k]."""
+        if self.matrix is not None:
+            return self.matrix[a, b]
+        return haversine_km(self.lats[a], self.lons[a], self.lats[b], self.lons[b])
+
+    def subset(self, nodes: np.ndarray) -> "DistanceTable":
+        """Table over a subset of nodes, sliced from the shared matrix when dense."""
+        sub = DistanceTable.__new__(DistanceTable)
+        sub.lats, sub.lons, sub.n = self.lats[nodes], self.lons[nodes], len(nodes)
+        sub.matrix = self.matrix[np.ix_(nodes, nodes)] if self.matrix is not None else None
+        sub.measured = self.measured
+        return sub
+
+    def tour_length(self, tour: np.ndarray) -> float:
+        if self.measured:
+            return float(self.matrix[tour[:-1], tour[1:]].sum())
+        # Exact float64 haversine, independent of the dense/sparse mode
+        return float(haversine_km(
+            self.lats[tour[:-1]], self.lons[tour[:-1]],
+            self.lats[tour[1:]], self.lons[tour[1:]],
+        ).sum())
+
+
+@dataclass
+class RouteSolution:
+    tour: np.ndarray            # node indices, starting and ending at the depot (0)
+    distance_km: float
+    greedy_distance_km: float
+    solve_time_s: float
+    metric: str = "haversine"
+
+    @property
+    def improvement_pct(self) -> float:
+        if self.greedy_distance_km <= 0:
+            return 0.0
+        return 100.0 * (self.greedy_distance_km - self.distance_km) / self.greedy_distance_km
+
+
+def nearest_neighbours(table: DistanceTable, k: int) -> np.ndarray:
+    """(n, k) indices of each node's k nearest nodes, nearest first (self included)."""
+    k = min(k, table.n)
+    if table.matrix is not None:
+        part = np.argpartition(table.matrix, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(table.matrix, part, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(part, order, axis=1)
+    # One batched BallTree query instead of a Python-level query per node
+    from sklearn.neighbors import BallTree
+    coords = np.radians(np.column_stack((table.lats, table.lons)))
+    _, neighbours = BallTree(coords, metric="haversine").query(coords, k=k)
+    return neighbours
+
+
+def greedy_tour(table: DistanceTable, start: int = 0) -> np.ndarray:
+    """Nearest-neighbour tour from the depot, returning to it at the end."""
+    n = table.n
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    tour = np.empty(n + 1, dtype=np.intp)
+    tour[0] = tour[n] = start
+    current = start
+
+    if table.matrix is not None:
+        for step in range(1, n):
+            row = np.where(visited, np.inf, table.matrix[current])
+            current = int(np.argmin(row))
+            visited[current] = True
+            tour[step] = current
+        return tour
+
+    neighbours = nearest_neighbours(table, _KNN_MAX)
+    for step in range(1, n):
+        candidates = neighbours[current]
+        free = candidates[~visited[candidates]]
+        if len(free):
+            current = int(free[0])
+        else:
+            # Local neighbourhood exhausted: scan the remaining stops directly
+            remaining = np.flatnonzero(~visited)
+            current = int(remaining[np.argmin(table.row(current, remaining))])
+        visited[current] = True
+        tour[step] = current
+    return tour
+
+
+def _two_opt(tour, edges, table, deadline) -> bool:
+    """One 2-opt sweep with best-improvement per anchor edge."""
+    m = len(tour)
+    improved = False
+    for i in range(m - 3):
+        if time.perf_counter() > deadline:
+            break
+        a, b = tour[i], tour[i + 1]
+        c, d = tour[i + 2:m - 1], tour[i + 3:m]
+        ac, bd = table.row(a, c), table.row(b, d)
+        delta = ac + bd - edges[i] - edges[i + 2:m - 1]
+        best = int(np.argmin(delta))
+        if delta[best] < -_EPS:
+            j = i + 2 + best
+            tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+            edges[i + 1:j] = edges[i + 1:j][::-1].copy()
+            edges[i], edges[j] = ac[best], bd[best]
+            improved = True
+    return improved
+
+
+def _or_opt(tour, edges, table, deadline, max_segment: int = 3):
+    """Relocates segments of 1..max_segment stops (optionally reversed)."""
+    improved = False
+    for seg_len in range(1, max_segment + 1):
+        i = 1
+        while i + seg_len < len(tour):
+            if time.perf_counter() > deadline:
+                return tour, edges, improved
+            m = len(tour)
+            p, s0, s1, nx = tour[i - 1], tour[i], tour[i + seg_len - 1], tour[i + seg_len]
+            gain = edges[i - 1] + edges[i + seg_len - 1] - table.row(p, np.array([nx]))[0]
+
+            # Candidate insertion edges (k, k+1) that don't touch the segment
+            k = np.concatenate((np.arange(0, i - 1), np.arange(i + seg_len, m - 1)))
+            if len(k) == 0:
+                i += 1
+                continue
+            c, d = tour[k], tour[k + 1]
+            fwd = table.row(s0, c) + table.row(s1, d) - edges[k]
+            rev = table.row(s1, c) + table.row(s0, d) - edges[k]
+            cost = np.minimum(fwd, rev)
+            best = int(np.argmin(cost))
+            if cost[best] - gain < -_EPS:
+                kb = int(k[best])
+                segment = tour[i:i + seg_len]
+                if rev[best] < fwd[best]:
+                    segment = segment[::-1]
+                rest = np.concatenate((tour[:i], tour[i + seg_len:]))
+                insert_at = kb + 1 if kb < i else kb + 1 - seg_len
+                tour = np.concatenate((rest[:insert_at], segment, rest[insert_at:]))
+                edges = table.pairs(tour[:-1], tour[1:])
+                improved = True
+            else:
+                i += 1
+    return tour, edges, improved
+
+
+def improve_tour(tour: np.ndarray, table: DistanceTable, time_budget_s: float) -> np.ndarray:
+    """Alternates 2-opt and Or-opt until a local optimum or the deadline."""
+    deadline = time.perf_counter() + time_budget_s
+    tour = tour.copy()
+    if len(tour) < 5:
+        return tour
+    edges = table.pairs(tour[:-1], tour[1:])
+    while time.perf_counter() < deadline:
+        while _two_opt(tour, edges, table, deadline) and time.perf_counter() < deadline:
+            pass
+        tour, edges, moved = _or_opt(tour, edges, table, deadline)
+        if not moved:
+            break
+    return tour
+
+
+def solve_route(lats, lons, time_budget_s: float = 0.5, table: DistanceTable = None) -> RouteSolution:
+    """Solves a single-vehicle tour over depot (index 0) + stops."""
+    started = time.perf_counter()
+    if table is None:
+        table = DistanceTable(lats, lons)
+    greedy = greedy_tour(table)
+    greedy_km = table.tour_length(greedy)
+    remaining = max(0.0, time_budget_s - (time.perf_counter() - started))
+    tour = improve_tour(greedy, table, remaining)
+    distance_km = table.tour_length(tour)
+    if distance_km > greedy_km:
+        # Float noise on near-ties must never make the answer worse than greedy
+        tour, distance_km = greedy, greedy_km
+    return RouteSolution(
+        tour=tour,
+        distance_km=distance_km,
+        greedy_distance_km=greedy_km,
+        solve_time_s=time.perf_counter() - started,
+    )
+
+
+def solve_road_route(lats, lons, time_budget_s: float = 0.5) -> RouteSolution:
+    """
+    solve_route over road distances from the installed road graph; haversine
+    when there is no graph or too many stops for a dense matrix.
+    """
+    from road_graph import road_cost_matrix
+
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    started = time.perf_counter()
+    matrix = road_cost_matrix(lats, lons, lats, lons, weight="length") if len(lats) <= DENSE_MATRIX_LIMIT else None
+    if matrix is None:
+        return solve_route(lats, lons, time_budget_s)
+    # One-way streets make road distances slightly asymmetric; the 2-opt/Or-opt
+    # moves assume a symmetric matrix, so tours are optimised on the mean
+    table = DistanceTable.from_matrix(lats, lons, (matrix + matrix.T) / 2)
+    remaining = max(0.0, time_budget_s - (time.perf_counter() - started))
+    solution = solve_route(lats, lons, remaining, table=table)
+    solution.solve_time_s = time.perf_counter() - started
+    solution.metric = "road"
+    return solution
+
+
+# --- Capacitated multi-vehicle mode ---
+
+# Savings are only evaluated between each stop and its nearest neighbours
+_SAVINGS_NEIGHBOURS = 40
+# Below this many stops a pool job costs more than it saves
+_PARALLEL_MIN_STOPS = 200
+
+
+@dataclass
+class VehicleTour:
+    vehicle: int                # index into the fleet
+    tour: np.ndarray            # node indices, depot (0) at both ends
+    load: float
+    distance_km: float
+
+
+@dataclass
+class FleetSolution:
+    routes: List[VehicleTour]
+    unassigned: List[int]       # stop indices that no vehicle could take
+    solve_time_s: float
+
+
+def clarke_wright(table: DistanceTable, loads: np.ndarray, capacity: float) -> List[List[int]]:
+    """
+    Clarke-Wright savings: start with one depot-stop-depot route per stop and
+    merge route ends in order of saving d(0,i) + d(0,j) - d(i,j) while the
+    merged load fits. Stops heavier than `capacity` are left out. Runs to
+    completion (O(n * neighbours) merges): a partial pass leaves singleton
+    routes that use up the fleet.
+    """
+    n = table.n
+    if n <= 1:
+        return []
+    neighbours = nearest_neighbours(table, _SAVINGS_NEIGHBOURS + 1)
+    i = np.repeat(np.arange(n), neighbours.shape[1])
+    j = neighbours.ravel()
+    keep = (i < j) & (i > 0)
+    i, j = i[keep], j[keep]
+    # Symmetric neighbour lists produce each pair twice
+    pair_ids = np.unique(i * n + j)
+    i, j = pair_ids // n, pair_ids % n
+    depot = table.row(0, np.arange(n))
+    savings = depot[i] + depot[j] - table.pairs(i, j)
+    order = np.argsort(-savings, kind="stable")
+
+    routes = {s: [s] for s in range(1, n) if loads[s] <= capacity}
+    route_of = {s: s for s in routes}
+    route_load = {s: float(loads[s]) for s in routes}
+
+    for k in order:
+        if savings[k] <= 0:
+            break
+        a, b = int(i[k]), int(j[k])
+        ra, rb = route_of.get(a), route_of.get(b)
+        if ra is None or rb is None or ra == rb:
+            continue
+        if route_load[ra] + route_load[rb] > capacity:
+            continue
+        A, B = routes[ra], routes[rb]
+        # Both stops must sit at an end of their route to be joined
+        if A[-1] == a and B[0] == b:
+            merged = A + B
+        elif A[0] == a and B[-1] == b:
+            merged = B + A
+        elif A[-1] == a and B[-1] == b:
+            merged = A + B[::-1]
+        elif A[0] == a and B[0] == b:
+            merged = A[::-1] + B
+        else:
+            continue
+        routes[ra] = merged
+        route_load[ra] += route_load.pop(rb)
+        del routes[rb]
+        for s in B:
+            route_of[s] = ra
+    return list(routes.values())
+
+
+def _improve_worker(tables: List[DistanceTable], deadline_epoch: float) -> List[np.ndarray]:
+    # Runs as one CPU-lane job: each sub-table holds depot (0) + one vehicle's
+    # stops, and the vehicles share the time left in proportion to their size.
+    # The deadline is wall-clock time so it means the same thing in every process.
+    tours = []
+    remaining = sum(table.n for table in tables)
+    for table in tables:
+        budget = max(0.0, deadline_epoch - time.time()) * table.n / max(remaining, 1)
+        tours.append(improve_tour(np.arange(table.n + 1) % table.n, table, budget))
+        remaining -= table.n
+    return tours
+
+
+def _balanced_jobs(subtables: List[DistanceTable], n_jobs: int) -> List[List[int]]:
+    """Vehicle indices per job, largest tours first onto the lightest job."""
+    jobs, sizes = [[] for _ in range(n_jobs)], [0] * n_jobs
+    for v in sorted(range(len(subtables)), key=lambda v: -subtables[v].n):
+        j = sizes.index(min(sizes))
+        jobs[j].append(v)
+        sizes[j] += subtables[v].n
+    return [job for job in jobs if job]
+
+
+def solve_fleet(lats, lons, loads, capacities, time_budget_s: float = 1.0,
+                submit: Optional[Callable] = None, max_jobs: int = 1) -> FleetSolution:
+    """
+    Splits depot (index 0) + stops across a heterogeneous fleet.
+    Savings routes are built in rounds against the largest free capacity and
+    assigned best-fit to vehicles; leftovers are inserted where capacity
+    remains, and each vehicle's stop order is then improved.
+    Construction always completes; `time_budget_s` caps the improvement.
+
+    With `submit(fn, *args) -> Future` (e.g. executors.submit_cpu) the
+    vehicles are improved in at most `max_jobs` parallel jobs; without it, or
+    for small fleets, on the calling thread. Errors from `submit` (such as
+    executors.Overloaded) propagate after cancelling the jobs already queued.
+    """
+    started = time.perf_counter()
+    table = DistanceTable(lats, lons)
+    loads = np.asarray(loads, dtype=np.float64)
+    capacities = np.asarray(capacities, dtype=np.float64)
+    if len(capacities) == 0:
+        return FleetSolution([], list(range(1, table.n)), time.perf_counter() - started)
+
+    # Each round builds savings routes for the stops still open against the
+    # largest free truck, then assigns them best-fit: heaviest route first,
+    # onto the smallest free vehicle that holds it. Later rounds pick up
+    # what the big trucks left behind with the smaller ones.
+    free = sorted(range(len(capacities)), key=lambda v: capacities[v])
+    open_stops = np.arange(1, table.n)
+    assigned = []
+    while len(open_stops) and free:
+        nodes = np.concatenate(([0], open_stops))
+        local_routes = clarke_wright(table.subset(nodes), loads[nodes], float(capacities[free[-1]]))
+        local_routes.sort(key=lambda r: -float(loads[nodes[r]].sum()))
+        placed = []
+        for local in local_routes:
+            stops = nodes[local]
+            load = float(loads[stops].sum())
+            vehicle = next((v for v in free if capacities[v] >= load), None)
+            if vehicle is not None:
+                free.remove(vehicle)
+                assigned.append((vehicle, np.concatenate(([0], stops)).astype(np.intp), load))
+                placed.extend(stops.tolist())
+        if not placed:
+            break
+        open_stops = np.setdiff1d(open_stops, placed)
+
+    # Bin-packing leftovers: cheapest insertion into any route with spare
+    # capacity. Every route's edges sit in one flat array (route by route, in
+    # tour order, each closing back to the depot), so a leftover is scored
+    # against all of them at once.
+    leftovers = open_stops[np.argsort(loads[open_stops], kind="stable")].tolist()
+    unassigned = []
+    if leftovers and assigned:
+        route_load = np.array([load for _, _, load in assigned])
+        route_capacity = capacities[[vehicle for vehicle, _, _ in assigned]]
+        edge_route = np.concatenate([np.full(len(nodes), r) for r, (_, nodes, _) in enumerate(assigned)])
+        head = np.concatenate([nodes for _, nodes, _ in assigned])
+        tail = np.concatenate([np.append(nodes[1:], 0) for _, nodes, _ in assigned])
+        length = table.pairs(head, tail)
+        for k, s in enumerate(leftovers):
+            fits = np.flatnonzero((route_capacity - route_load)[edge_route] >= loads[s])
+            if not len(fits):
+                # Leftovers come lightest first: none of the rest fits either
+                unassigned.extend(leftovers[k:])
+                break
+            extra = table.row(s, head[fits]) + table.row(s, tail[fits]) - length[fits]
+            e = int(fits[np.argmin(extra)])
+            # head[e] -> tail[e] becomes head[e] -> s -> tail[e]
+            r = edge_route[e]
+            route_load[r] += loads[s]
+            edge_route = np.insert(edge_route, e + 1, r)
+            head = np.insert(head, e + 1, s)
+            tail = np.insert(tail, e, s)
+            length[e] = table.pairs(head[e:e + 1], tail[e:e + 1])[0]
+            length = np.insert(length, e + 1, table.pairs(head[e + 1:e + 2], tail[e + 1:e + 2])[0])
+        starts = np.searchsorted(edge_route, np.arange(len(assigned) + 1))
+        assigned = [(vehicle, head[starts[r]:starts[r + 1]].astype(np.intp), float(route_load[r]))
+                    for r, (vehicle, _, _) in enumerate(assigned)]
+    else:
+        unassigned = leftovers
+    unassigned.sort()
+
+    subtables = [table.subset(nodes) for _, nodes, _ in assigned]
+    deadline_epoch = time.time() + max(0.0, time_budget_s)
+    if submit is not None and sum(len(nodes) for _, nodes, _ in assigned) >= _PARALLEL_MIN_STOPS:
+        jobs = _balanced_jobs(subtables, max(1, min(max_jobs, len(subtables))))
+        futures = []
+        try:
+            for job in jobs:
+                futures.append(submit(_improve_worker, [subtables[v] for v in job], deadline_epoch))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        local_tours = [None] * len(subtables)
+        for job, future in zip(jobs, futures):
+            try:
+                # Small grace period for result pickling; the jobs stop at the deadline
+                tours = future.result(timeout=max(0.0, deadline_epoch - time.time()) + 0.25)
+            except FuturesTimeout:
+                future.cancel()
+                tours = [np.arange(subtables[v].n + 1) % subtables[v].n for v in job]
+            for v, tour in zip(job, tours):
+                local_tours[v] = tour
+    else:
+        local_tours = _improve_worker(subtables, deadline_epoch)
+
+    routes = []
+    for (vehicle, nodes, load), sub, local in zip(assigned, subtables, local_tours):
+        routes.append(VehicleTour(
+            vehicle=vehicle,
+            tour=nodes[local],
+            load=load,
+            distance_km=sub.tour_length(local),
+        ))
+    routes.sort(key=lambda r: r.vehicle)
+    return FleetSolution(routes, unassigned, time.perf_counter() - started)
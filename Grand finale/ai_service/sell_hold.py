@@ -0,0 +1,170 @@
+"""
+Monte Carlo sell-vs-hold decisions for stored oilseed lots.
+
+For each distinct price series (crop, region as resolved by the price
+forecaster) n_paths weekly price paths are drawn in one matrix product from
+the fitted model's own error structure (price_forecast.simulate). Every lot
+on that series reuses the same paths, so an FPO's lots of one crop move
+together; separate series are drawn independently.
+
+Holding a lot for h weeks earns
+
+    net_h = (q * P_h * value(D_h) - q * storage_cost * h) / (1 + r) ** (h / 52)
+
+where D_h is the spoilage engine's degradation (d0 + crop_rate *
+env(T, RH) * 7h, see spoilage_engine.py) with a per-path log-normal
+multiplier on the rate for storage conditions drifting from the stated
+means. value() keeps full price while the lot is in the Low band and falls
+linearly to SALVAGE_VALUE at the end of shelf life. Selling now (h = 0) is
+riskless: today's price and today's quality.
+
+Lots are evaluated LOT_CHUNK at a time as (lots, horizons, paths) float32
+blocks, so memory stays at a few MB whatever the batch size. Results are
+reproducible: paths are seeded by (seed, series) and rate multipliers by
+(seed, lot_id), so a lot gets the same numbers alone or in a batch.
+"""
+import zlib
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from crops import normalize_crop
+from price_forecast import price_forecaster, simulate
+from spoilage_engine import BAND_EDGES, BANDS, SHELF_LIFE_DAYS, environment_factor
+
+DEFAULT_PATHS = 10_000
+DEFAULT_HORIZON_WEEKS = 26
+DEFAULT_STORAGE_COST = 2.5      # INR per quintal per week (warehouse rent + handling)
+DEFAULT_INTEREST_RATE = 0.09    # annual, cost of the cash tied up in stock
+RATE_SPREAD = 0.25              # log-sd of the degradation rate around the stated conditions
+SALVAGE_VALUE = 0.4             # share of the market price a lot past shelf life still fetches
+RISK_QUANTILE = 0.05
+LOT_CHUNK = 8
+
+
+@dataclass(frozen=True, eq=False)
+class SellHoldResult:
+    """Per-lot arrays are (lots,) or (lots, horizon_weeks + 1); INR unless noted."""
+    dates: np.ndarray               # (H+1,) datetime64[D], dates[0] is today
+    current_price: np.ndarray       # INR / quintal
+    expected_price: np.ndarray      # mean simulated price per horizon
+    expected_revenue: np.ndarray    # mean discounted net revenue
+    revenue_std: np.ndarray
+    revenue_p5: np.ndarray          # RISK_QUANTILE of net revenue
+    prob_beats_now: np.ndarray      # P(net_h > net_0)
+    degradation: np.ndarray         # expected degradation
+    best_horizon: np.ndarray        # weeks, risk-adjusted argmax
+    portfolio: Dict[str, float]     # every lot at its best horizon, summed per path
+
+
+def value_factor(degradation: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Share of the market price a lot fetches at a given degradation (`out` may alias the input)."""
+    fresh = float(BAND_EDGES[0])
+    out = np.subtract(degradation, fresh, out=out)
+    out *= 1.0 / (1.0 - fresh)
+    np.clip(out, 0.0, 1.0, out=out)
+    out *= -(1.0 - SALVAGE_VALUE)
+    out += 1.0
+    return out
+
+
+def risk_band(degradation: np.ndarray) -> List[str]:
+    return [BANDS[i] for i in np.searchsorted(BAND_EDGES, degradation, side="right").tolist()]
+
+
+def _seed(seed: int, key: str) -> List[int]:
+    return [seed & 0xFFFFFFFF, zlib.crc32(key.encode())]
+
+
+def _rate_multipliers(seed: int, lot_ids: Sequence[str], n_paths: int) -> np.ndarray:
+    out = np.empty((len(lot_ids), n_paths), dtype=np.float32)
+    for i, lot_id in enumerate(lot_ids):
+        out[i] = np.random.default_rng(_seed(seed, "lot|" + lot_id)).standard_normal(n_paths, dtype=np.float32)
+    out *= np.float32(RATE_SPREAD)
+    out -= np.float32(RATE_SPREAD ** 2 / 2)          # mean-preserving
+    return np.exp(out, out=out)
+
+
+def evaluate(crop: Sequence[str], region: Sequence[str], quantity_quintals, temperature_c,
+             humidity_percent, degradation, storage_cost, lot_ids: Optional[Sequence[str]] = None,
+             weeks: int = DEFAULT_HORIZON_WEEKS, n_paths: int = DEFAULT_PATHS, seed: int = 0,
+             interest_rate: float = DEFAULT_INTEREST_RATE, risk_aversion: float = 0.0,
+             start: Optional[date] = None) -> SellHoldResult:
+    """
+    Sell-now vs hold-h-weeks for every lot and every h in 0..weeks. The best
+    horizon maximises E[net] - risk_aversion * (E[net] - p5[net]).
+    Lots without an id are keyed by their position.
+    """
+    start = start or date.today()
+    n = len(crop)
+    lot_ids = [str(i) for i in range(n)] if lot_ids is None else [str(i) for i in lot_ids]
+    q = np.asarray(quantity_quintals, dtype=np.float64)
+    d0 = np.asarray(degradation, dtype=np.float64)
+    cost = np.asarray(storage_cost, dtype=np.float64)
+    shelf = np.array([SHELF_LIFE_DAYS.get(normalize_crop(c), SHELF_LIFE_DAYS["other"]) for c in crop], dtype=np.float64)
+    weekly_rate = 7.0 * environment_factor(temperature_c, humidity_percent) / shelf
+
+    h = np.arange(weeks + 1, dtype=np.float64)
+    discount = (1.0 + interest_rate) ** (-h / 52.0)
+    k = int(RISK_QUANTILE * (n_paths - 1))
+    shape = (n, weeks + 1)
+    current_price = np.empty(n)
+    expected_price, expected, std, p5, prob = (np.empty(shape) for _ in range(5))
+    expected_degradation = d0[:, None] + weekly_rate[:, None] * h
+    best = np.zeros(n, dtype=np.int64)
+    portfolio_now = 0.0
+    portfolio_paths = np.zeros(n_paths, dtype=np.float64)
+
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for i in range(n):
+        groups.setdefault(price_forecaster.resolve(crop[i], region[i]), []).append(i)
+
+    h32 = h.astype(np.float32)[None, :, None]
+    disc32 = discount.astype(np.float32)[None, :, None]
+    for key, members in groups.items():
+        model = price_forecaster.get_model(*key)
+        _, paths = simulate(model, start, weeks, n_paths, np.random.default_rng(_seed(seed, "|".join(key))))
+        mean_price = paths.mean(axis=1, dtype=np.float64)
+        for lo in range(0, len(members), LOT_CHUNK):
+            idx = np.array(members[lo:lo + LOT_CHUNK])
+            m = _rate_multipliers(seed, [lot_ids[i] for i in idx], n_paths)[:, None, :]
+            # (lots, horizons, paths): degradation -> value share -> discounted net revenue
+            block = (weekly_rate[idx].astype(np.float32)[:, None, None] * h32) * m
+            block += d0[idx].astype(np.float32)[:, None, None]
+            value_factor(block, out=block)
+            block *= paths[None]
+            block -= (cost[idx].astype(np.float32)[:, None, None] * h32)
+            block *= (q[idx].astype(np.float32)[:, None, None] * disc32)
+
+            now = block[:, 0, 0].astype(np.float64)
+            mean = block.mean(axis=2, dtype=np.float64)
+            quantile = np.partition(block, k, axis=2)[:, :, k].astype(np.float64)
+            score = mean - risk_aversion * (mean - quantile)
+            chosen = np.argmax(score, axis=1)
+
+            current_price[idx] = paths[0, 0]
+            expected_price[idx] = mean_price
+            expected[idx] = mean
+            square = np.einsum("lhp,lhp->lh", block, block, dtype=np.float64) / n_paths
+            std[idx] = np.sqrt(np.maximum(square - mean * mean, 0.0))
+            p5[idx] = quantile
+            prob[idx] = (block > block[:, :1, :1]).mean(axis=2)
+            best[idx] = chosen
+            portfolio_now += now.sum()
+            portfolio_paths += block[np.arange(len(idx)), chosen].sum(axis=0, dtype=np.float64)
+
+    portfolio = {
+        "sell_now_revenue": float(portfolio_now),
+        "expected_revenue": float(portfolio_paths.mean()) if n else 0.0,
+        "revenue_p5": float(np.partition(portfolio_paths, k)[k]) if n else 0.0,
+        "prob_beats_selling_now": float((portfolio_paths > portfolio_now).mean()) if n else 0.0,
+    }
+    dates = np.datetime64(start, "D") + 7 * np.arange(weeks + 1)
+    return SellHoldResult(dates, current_price, expected_price, expected, std, p5, prob,
+                          expected_degradation, best, portfolio)
+
+
+def recommendation(weeks: int) -> str:
+    return "Sell now" if weeks == 0 else f"Hold {weeks} week{'s' if weeks > 1 else ''}"
@@ -0,0 +1,271 @@
+"""
+Fast response serialization for large results.
+
+Handlers whose results are built internally (already the documented shape)
+return `respond(request, content)` instead of a pydantic model: FastAPI then
+skips the response_model re-validation and the jsonable_encoder walk, and
+NumPy arrays and scalars in `content` are written as they are, without
+`.tolist()`. The format is negotiated from the Accept header:
+
+- application/json (default): orjson, which writes NumPy arrays natively;
+  the stdlib encoder with an ndarray hook when orjson isn't installed.
+  NaN/inf become null. datetime64 arrays come out as ISO datetimes, so
+  pass dates as `date` lists or np.datetime_as_string.
+- application/msgpack (needs msgpack): the same structure, compact binary.
+- application/vnd.apache.arrow.stream (needs pyarrow), for columnar results
+  that name their `table` columns: one Arrow record batch, with the other
+  fields JSON-encoded in the schema metadata under "biometrix".
+
+Formats whose package isn't installed are not offered, so those clients get
+JSON. Responses carry `Vary: Accept`.
+
+CompressionMiddleware compresses bodies of at least BIOMETRIX_COMPRESS_MIN_BYTES
+with brotli (when installed) or gzip for clients that accept it, streaming
+responses chunk by chunk.
+"""
+import json
+import os
+import zlib
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MIN_COMPRESS_BYTES = int(os.environ.get("BIOMETRIX_COMPRESS_MIN_BYTES", "2048"))
+GZIP_LEVEL = int(os.environ.get("BIOMETRIX_GZIP_LEVEL", "1"))     # ~8% larger than -4 at 60% of the CPU
+BROTLI_QUALITY = int(os.environ.get("BIOMETRIX_BROTLI_QUALITY", "1"))  # faster and smaller than gzip -1 on our JSON
+OFFLOAD_BYTES = 256 * 1024      # compress larger bodies on a worker thread
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK,
+            "application/vnd.apache.arrow.file": ARROW}
+
+
+def _installed(module: str) -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec(module) is not None
+
+
+FORMATS = [JSON] + [fmt for fmt, module in ((MSGPACK, "msgpack"), (ARROW, "pyarrow")) if _installed(module)]
+ENCODINGS = (["br"] if _installed("brotli") else []) + ["gzip"]
+
+
+def _plain(value):
+    """Fallback for values neither encoder handles natively."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _finite(value):
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_finite(v) for v in value]
+    return value
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_plain, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    text = json.dumps(content, default=lambda v: _finite(_plain(v)), ensure_ascii=False, separators=(",", ":"))
+    if "NaN" in text or "Infinity" in text:     # scalar NaN/inf outside arrays: rare, re-encode
+        text = json.dumps(_finite(json.loads(text)), ensure_ascii=False, separators=(",", ":"))
+    return text.encode()
+
+
+def _msgpack(content: Any) -> bytes:
+    import msgpack
+
+    return msgpack.packb(content, default=_plain, use_bin_type=True)
+
+
+def _arrow_column(values):
+    import pyarrow as pa
+
+    if isinstance(values, np.ndarray) and values.ndim == 2 and values.dtype.kind in "biuf":
+        flat = pa.array(np.ascontiguousarray(values).ravel())
+        return pa.FixedSizeListArray.from_arrays(flat, values.shape[1])
+    if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        return pa.array(values)
+    return pa.array(values.tolist() if isinstance(values, np.ndarray) else values)
+
+
+def _arrow(content: Dict[str, Any], table: Sequence[str]) -> bytes:
+    import pyarrow as pa
+
+    records = content[table[0]]
+    if len(table) == 1 and isinstance(records, list) and records and isinstance(records[0], dict):
+        # Rows may have different keys
+        names = dict.fromkeys(name for record in records for name in record)
+        batch = pa.table({name: pa.array([record.get(name) for record in records]) for name in names})
+    else:
+        batch = pa.table({name: _arrow_column(content[name]) for name in table})
+    rest = {k: v for k, v in content.items() if k not in table}
+    batch = batch.replace_schema_metadata({"biometrix": dumps(rest)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_table(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _weighted(header: str) -> List[Tuple[str, float]]:
+    """(lower-cased value, q) per item of an Accept / Accept-Encoding header, in header order."""
+    items = []
+    for item in header.split(","):
+        value, *params = (part.strip() for part in item.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        items.append((value.lower(), q))
+    return items
+
+
+def negotiate(accept: Optional[str], columnar: bool = True) -> str:
+    """Best available format for an Accept header (JSON when nothing better matches)."""
+    if not accept or len(FORMATS) == 1:
+        return JSON
+    ranked = sorted((-q, position, _ALIASES.get(media, media))
+                    for position, (media, q) in enumerate(_weighted(accept)) if q > 0)
+    for _, _, media in ranked:
+        if media in FORMATS and (media != ARROW or columnar):
+            return media
+        if media in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def render(content: Any, fmt: str = JSON, table: Sequence[str] = (), status_code: int = 200,
+           headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encodes trusted `content` as `fmt` (see negotiate)."""
+    if fmt == ARROW and table:
+        body = _arrow(content, table)
+    elif fmt == MSGPACK:
+        body = _msgpack(content)
+    else:
+        fmt, body = JSON, dumps(content)
+    return Response(content=body, status_code=status_code, media_type=fmt,
+                    headers=dict(headers or {}, Vary="Accept"))
+
+
+def respond(request, content: Any, table: Sequence[str] = (), **kwargs) -> Response:
+    return render(content, negotiate(request.headers.get("accept"), bool(table)), table, **kwargs)
+
+
+def wants_json(headers: Sequence[Tuple[bytes, bytes]]) -> bool:
+    """True when raw ASGI request headers negotiate to JSON (e.g. for the response cache)."""
+    accept = next((v.decode("latin-1") for k, v in headers if k == b"accept"), None)
+    return negotiate(accept) == JSON
+
+
+# --- Compression ---
+
+def _accepted_encoding(header: Optional[str]) -> Optional[str]:
+    if not header:
+        return None
+    accepted = dict(_weighted(header))
+    for coding in ENCODINGS:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class _Compressor:
+    def __init__(self, coding: str):
+        if coding == "br":
+            import brotli
+
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if last else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Pure ASGI; add it outside the response cache so cached bodies stay uncompressed."""
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = _accepted_encoding(
+            next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), None))
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start, compressor = None, None
+
+        async def compress(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if compressor is None:
+                headers = start.get("headers", [])
+                encoded = any(k.lower() == b"content-encoding" for k, _ in headers)
+                if encoded or start["status"] in (204, 304) or (not more and len(body) < self.minimum_size):
+                    await send(start)
+                    start = None
+                    return await send(message)
+                compressor = _Compressor(coding)
+                await send(dict(start, headers=_compressed_headers(headers, coding)))
+            if len(body) > OFFLOAD_BYTES:
+                from starlette.concurrency import run_in_threadpool
+
+                data = await run_in_threadpool(compressor.chunk, body, not more)
+            else:
+                data = compressor.chunk(body, not more)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, compress)
+
+
+def _compressed_headers(headers, coding: str) -> List[Tuple[bytes, bytes]]:
+    out, vary = [], None
+    for k, v in headers:
+        name = k.lower()
+        if name == b"content-length":
+            continue
+        if name == b"etag" and not v.startswith(b"W/"):
+            v = b"W/" + v          # same content, different bytes: weak, as nginx does
+        if name == b"vary":
+            vary = v
+            continue
+        out.append((k, v))
+    out.append((b"content-encoding", coding.encode()))
+    out.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    return out
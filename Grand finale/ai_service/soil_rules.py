@@ -0,0 +1,133 @@
+"""
+Compiled soil -> crop rule table for /recommend/soil.
+
+The catalogue lives in data/soil_rules.json and is loaded once into immutable
+records. A soil type resolves to its rule by exact lookup on the normalized
+name (or an alias such as "regur"), falling back to keyword containment in
+table order ("Black Cotton Soil" -> black) and finally to the default rule;
+resolutions are cached. Soil-health thresholds (pH, nitrogen) are evaluated
+per sample by `assess`, or for a whole batch with NumPy masks by `assess_many`.
+"""
+import json
+import operator
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+RULES_PATH = os.environ.get(
+    "BIOMETRIX_SOIL_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "soil_rules.json"),
+)
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+class CropRule(NamedTuple):
+    crop_name: str
+    suitability_score: float
+    expected_yield_per_acre: float
+    fertilizer_plan: str
+    irrigation_schedule: str
+    risk_factors: Tuple[str, ...]
+
+
+class SoilRule(NamedTuple):
+    key: str
+    keywords: Tuple[str, ...]
+    crops: Tuple[CropRule, ...]
+
+
+class Threshold(NamedTuple):
+    field: str                  # "ph_level", "nitrogen", ...
+    op: str                     # one of _OPS
+    value: float
+    status: Optional[str]       # soil health status when triggered (first match wins)
+    suggestion: str
+
+
+def normalize_soil(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+class RuleTable:
+    def __init__(self, soils: List[SoilRule], aliases: Dict[str, str],
+                 thresholds: List[Threshold], default_status: str):
+        self.soils = tuple(soils)
+        self.by_key = {rule.key: rule for rule in self.soils}
+        self.default = next(rule for rule in self.soils if not rule.keywords)
+        self._index = {normalize_soil(key): self.by_key[key] for key in self.by_key}
+        self._index.update({normalize_soil(alias): self.by_key[key] for alias, key in aliases.items()})
+        self._keywords = tuple((kw, rule) for rule in self.soils for kw in rule.keywords)
+        self.thresholds = tuple(thresholds)
+        self.default_status = default_status
+        self.resolve = lru_cache(maxsize=1024)(self._resolve)
+
+    @classmethod
+    def load(cls, path: str = RULES_PATH) -> "RuleTable":
+        with open(path) as fh:
+            raw = json.load(fh)
+        soils, aliases = [], {}
+        for soil in raw["soils"]:
+            crops = tuple(
+                CropRule(**dict(crop, risk_factors=tuple(crop["risk_factors"])))
+                for crop in soil["crops"]
+            )
+            soils.append(SoilRule(soil["key"], tuple(kw.lower() for kw in soil["keywords"]), crops))
+            aliases.update({alias: soil["key"] for alias in soil.get("aliases", [])})
+        thresholds = [Threshold(**t) for t in raw["thresholds"]]
+        unknown = [t.op for t in thresholds if t.op not in _OPS]
+        if unknown:
+            raise ValueError(f"Unknown threshold operators in {path}: {unknown}")
+        return cls(soils, aliases, thresholds, raw["default_status"])
+
+    def _resolve(self, soil_type: str) -> SoilRule:
+        name = normalize_soil(soil_type)
+        rule = self._index.get(name)
+        if rule is not None:
+            return rule
+        for keyword, rule in self._keywords:
+            if keyword in name:
+                return rule
+        return self.default
+
+    def assess(self, values: Dict[str, float]) -> Tuple[str, List[str]]:
+        """Health status and amendment suggestions for one sample."""
+        status, suggestions = None, []
+        for t in self.thresholds:
+            if _OPS[t.op](values[t.field], t.value):
+                suggestions.append(t.suggestion)
+                if status is None and t.status:
+                    status = t.status
+        return status or self.default_status, suggestions
+
+    def assess_many(self, columns: Dict[str, Sequence[float]]):
+        """
+        Vectorized `assess` over N samples. Returns (status array of str,
+        (N, n_thresholds) bool matrix of triggered suggestions).
+        """
+        import numpy as np
+
+        n = len(next(iter(columns.values())))
+        triggered = np.empty((n, len(self.thresholds)), dtype=bool)
+        for j, t in enumerate(self.thresholds):
+            triggered[:, j] = _OPS[t.op](np.asarray(columns[t.field], dtype=np.float64), t.value)
+
+        conditions = [triggered[:, j] for j, t in enumerate(self.thresholds) if t.status]
+        choices = [t.status for t in self.thresholds if t.status]
+        status = np.select(conditions, choices, default=self.default_status) if conditions \
+            else np.full(n, self.default_status)
+        return status, triggered
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_rule_table() -> RuleTable:
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = RuleTable.load()
+    return _table
@@ -0,0 +1,462 @@
+"""
+Streaming spoilage engine for warehouse fleets.
+
+Bays report temperature / humidity every few minutes; lots sit in bays.
+Spoilage is tracked as cumulative degradation D (0 = fresh, 1 = end of
+shelf life), accrued at
+
+    dD/dt = crop_rate * env(T, RH)
+    env   = Q10 ** ((T - 25) / 10) * exp(HUMIDITY_K * max(RH - 65, 0))
+
+where crop_rate = 1 / reference shelf life (days at 25 C / 65% RH). Because
+env does not depend on the crop, each bay keeps one running exposure integral
+E (reference days, holding each reading until the next) and a lot's
+degradation is `d0 + crop_rate * (E_bay - E_at_entry)`. A reading batch therefore costs
+one vectorized pass over the readings plus one over the lots in the bays it
+touched, and per-lot state is a handful of preallocated arrays: capacity is
+fixed at BIOMETRIX_SPOILAGE_MAX_LOTS / _MAX_BAYS, so memory stays bounded.
+
+Alerts are produced only when a lot moves to a different risk band.
+
+Events (one JSON object per NDJSON line or WebSocket message item):
+
+    {"type": "reading", "bay_id": "B1", "ts": 1718000000, "temperature_c": 31.5, "humidity_percent": 72}
+    {"type": "lot", "lot_id": "L1", "bay_id": "B1", "crop": "Groundnut", "ts": ..., "degradation": 0.1}
+    {"type": "dispatch", "lot_id": "L1"}
+
+`type` defaults to "reading"; `ts` is epoch seconds or ISO 8601. Readings
+within a batch are applied in timestamp order; readings older than their
+bay's latest applied reading, from before 2000 or more than
+MAX_CLOCK_SKEW_S in the future are rejected. Registering an existing
+lot again moves it (its degradation so far carries over).
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from crops import normalize_crop
+from metrics import REGISTRY, Counter, Gauge
+
+MAX_LOTS = int(os.environ.get("BIOMETRIX_SPOILAGE_MAX_LOTS", "200000"))
+MAX_BAYS = int(os.environ.get("BIOMETRIX_SPOILAGE_MAX_BAYS", "20000"))
+ALERT_BUFFER = 10_000       # recent alerts kept for GET /storage/alerts
+MIN_TS = 946684800.0        # 2000-01-01
+MAX_CLOCK_SKEW_S = 3600.0
+
+# Reference shelf life in days at 25 C / 65% RH for stored seed
+SHELF_LIFE_DAYS = {
+    "soybean": 240, "groundnut": 180, "mustard": 300, "sunflower": 200, "sesame": 270,
+    "castor": 365, "safflower": 270, "niger": 240, "linseed": 300, "other": 180,
+}
+Q10 = 2.0
+REFERENCE_TEMP_C = 25.0
+REFERENCE_HUMIDITY = 65.0
+HUMIDITY_K = 0.08           # rate x3.3 at 80% RH
+BANDS = ("Low", "Medium", "High", "Critical")
+BAND_EDGES = np.array([0.25, 0.5, 0.8])     # degradation at which each next band starts
+_BAND_EDGE_LIST = BAND_EDGES.tolist()
+_DAY_S = 86400.0
+
+READINGS_INGESTED = REGISTRY.register(Counter(
+    "biometrix_spoilage_readings_total", "Sensor readings applied by the spoilage engine.",
+))
+EVENTS_REJECTED = REGISTRY.register(Counter(
+    "biometrix_spoilage_rejected_total", "Spoilage events rejected, by reason.", ("reason",),
+))
+ALERTS_EMITTED = REGISTRY.register(Counter(
+    "biometrix_spoilage_alerts_total", "Lots that entered a risk band.", ("band",),
+))
+ACTIVE_LOTS = REGISTRY.register(Gauge(
+    "biometrix_spoilage_active_lots", "Lots tracked by the spoilage engine.",
+))
+
+
+def environment_factor(temperature_c, humidity_percent):
+    """Degradation rate multiplier relative to 25 C / 65% RH."""
+    temperature_c = np.asarray(temperature_c, dtype=np.float64)
+    humidity_percent = np.asarray(humidity_percent, dtype=np.float64)
+    return (Q10 ** ((temperature_c - REFERENCE_TEMP_C) / 10.0)
+            * np.exp(HUMIDITY_K * np.maximum(humidity_percent - REFERENCE_HUMIDITY, 0.0)))
+
+
+def parse_ts(value) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return float(text)
+        except ValueError:
+            pass
+        stamp = datetime.fromisoformat(text[:-1] + "+00:00" if text.endswith("Z") else text)
+        if stamp.tzinfo is None:
+            stamp = stamp.replace(tzinfo=timezone.utc)
+        return stamp.timestamp()
+    raise ValueError(f"invalid ts {value!r}")
+
+
+class _Slots:
+    """String id -> array slot, with a free list so slots are reused."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.index: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self._free: List[int] = []
+
+    def get(self, key: str) -> Optional[int]:
+        return self.index.get(key)
+
+    def add(self, key: str) -> Optional[int]:
+        if self._free:
+            slot = self._free.pop()
+            self.ids[slot] = key
+        elif len(self.ids) < self.capacity:
+            slot = len(self.ids)
+            self.ids.append(key)
+        else:
+            return None
+        self.index[key] = slot
+        return slot
+
+    def remove(self, key: str) -> Optional[int]:
+        slot = self.index.pop(key, None)
+        if slot is not None:
+            self.ids[slot] = None
+            self._free.append(slot)
+        return slot
+
+    @property
+    def high_water(self) -> int:
+        return len(self.ids)
+
+
+class SpoilageEngine:
+    def __init__(self, max_lots: int = MAX_LOTS, max_bays: int = MAX_BAYS):
+        self.crops = tuple(SHELF_LIFE_DAYS)
+        self._crop_codes = {name: i for i, name in enumerate(self.crops)}
+        self._crop_lookup: Dict[str, int] = {}             # raw spelling -> code
+        self._crop_rate = 1.0 / np.array([SHELF_LIFE_DAYS[c] for c in self.crops], dtype=np.float64)
+
+        self.lots = _Slots(max_lots)
+        self.lot_bay = np.zeros(max_lots, dtype=np.int32)
+        self.lot_crop = np.zeros(max_lots, dtype=np.int16)
+        self.lot_d0 = np.zeros(max_lots)                  # degradation when it entered its bay
+        self.lot_entry = np.zeros(max_lots)               # bay exposure when it entered
+        self.lot_band = np.zeros(max_lots, dtype=np.int8)
+        self.lot_active = np.zeros(max_lots, dtype=bool)
+
+        self.bays = _Slots(max_bays)
+        self.bay_exposure = np.zeros(max_bays)            # reference days since first reading
+        self.bay_ts = np.full(max_bays, -np.inf)          # latest reading, epoch seconds
+        self.bay_env = np.full(max_bays, np.nan)          # env factor at the latest reading
+        self.bay_temp = np.full(max_bays, np.nan, dtype=np.float32)
+        self.bay_humidity = np.full(max_bays, np.nan, dtype=np.float32)
+
+        self.alerts = deque(maxlen=ALERT_BUFFER)
+        self.alert_seq = 0
+        self._lock = threading.Lock()
+
+    # --- Bays and lots ---
+
+    def _bay_slot(self, bay_id: str) -> Optional[int]:
+        slot = self.bays.get(bay_id)
+        if slot is None:
+            slot = self.bays.add(bay_id)
+            if slot is not None:
+                self.bay_exposure[slot] = 0.0
+                self.bay_ts[slot] = -np.inf
+                self.bay_env[slot] = np.nan
+                self.bay_temp[slot] = self.bay_humidity[slot] = np.nan
+        return slot
+
+    def _crop_code(self, crop: str) -> int:
+        code = self._crop_lookup.get(crop)
+        if code is None:
+            code = self._crop_codes.get(normalize_crop(crop), self._crop_codes["other"])
+            if len(self._crop_lookup) < 1024:
+                self._crop_lookup[crop] = code
+        return code
+
+    def _exposure_at(self, bay: int, ts: Optional[float]) -> float:
+        # Hold the latest conditions between the last reading and `ts`
+        exposure = self.bay_exposure[bay]
+        if ts is not None and math.isfinite(self.bay_ts[bay]) and ts > self.bay_ts[bay]:
+            exposure += self.bay_env[bay] * (ts - self.bay_ts[bay]) / _DAY_S
+        return exposure
+
+    def _degradation(self, slots: np.ndarray) -> np.ndarray:
+        # Clipped at d0: a lot that arrived after its bay's latest reading has accrued nothing yet
+        d0 = self.lot_d0[slots]
+        return d0 + self._crop_rate[self.lot_crop[slots]] * np.maximum(
+            self.bay_exposure[self.lot_bay[slots]] - self.lot_entry[slots], 0.0)
+
+    def _register(self, lot_id: str, bay_id: str, crop: str, ts: Optional[float],
+                  degradation: Optional[float]) -> Optional[str]:
+        """Adds or moves a lot; returns an error message instead of raising."""
+        bay = self._bay_slot(bay_id)
+        if bay is None:
+            return "bay capacity reached"
+        slot = self.lots.get(lot_id)
+        if slot is None:
+            slot = self.lots.add(lot_id)
+            if slot is None:
+                return "lot capacity reached"
+            current = 0.0
+        else:
+            current = float(self._degradation(np.array([slot]))[0])
+        self.lot_crop[slot] = self._crop_code(crop)
+        self.lot_bay[slot] = bay
+        self.lot_d0[slot] = current if degradation is None else degradation
+        self.lot_entry[slot] = self._exposure_at(bay, ts)
+        self.lot_band[slot] = bisect.bisect_right(_BAND_EDGE_LIST, self.lot_d0[slot])
+        self.lot_active[slot] = True
+        return None
+
+    def _dispatch(self, lot_id: str) -> Optional[str]:
+        slot = self.lots.remove(lot_id)
+        if slot is None:
+            return "unknown lot"
+        self.lot_active[slot] = False
+        return None
+
+    # --- Readings ---
+
+    def _apply_readings(self, bay_ids: Sequence[str], ts, temperature_c, humidity_percent) -> Tuple[int, List[dict]]:
+        """Vectorized core: integrates exposure per bay, then re-bands the lots in touched bays."""
+        index = self.bays.index
+        bay = np.fromiter((index.get(b, -1) for b in bay_ids), dtype=np.intp, count=len(bay_ids))
+        for i in np.nonzero(bay < 0)[0].tolist():
+            slot = self._bay_slot(bay_ids[i])
+            bay[i] = -1 if slot is None else slot
+        known = bay >= 0
+        bay = np.where(known, bay, 0)
+        ts = np.asarray(ts, dtype=np.float64)
+        env = environment_factor(temperature_c, humidity_percent)
+        keep = (known & np.isfinite(env) & (ts >= MIN_TS) & (ts <= time.time() + MAX_CLOCK_SKEW_S)
+                & (ts >= self.bay_ts[bay]))
+        if not keep.all():
+            EVENTS_REJECTED.inc(int((~keep).sum()), reason="reading")
+        bay, ts, env = bay[keep], ts[keep], env[keep]
+        temperature = np.asarray(temperature_c, dtype=np.float64)[keep]
+        humidity = np.asarray(humidity_percent, dtype=np.float64)[keep]
+        if not len(bay):
+            return 0, []
+
+        order = np.lexsort((ts, bay))
+        bay, ts, env = bay[order], ts[order], env[order]
+        first = np.ones(len(bay), dtype=bool)
+        first[1:] = bay[1:] != bay[:-1]
+        prev_ts = np.empty_like(ts)
+        prev_env = np.empty_like(env)
+        prev_ts[1:], prev_env[1:] = ts[:-1], env[:-1]
+        prev_ts[first], prev_env[first] = self.bay_ts[bay[first]], self.bay_env[bay[first]]
+        seen = np.isfinite(prev_ts)
+        increment = np.where(seen, prev_env * (ts - np.where(seen, prev_ts, ts)) / _DAY_S, 0.0)
+
+        last = np.ones(len(bay), dtype=bool)
+        last[:-1] = bay[:-1] != bay[1:]
+        touched = bay[last]
+        self.bay_exposure[touched] += np.bincount(bay, weights=increment, minlength=touched.max() + 1)[touched]
+        self.bay_ts[touched] = ts[last]
+        self.bay_env[touched] = env[last]
+        self.bay_temp[touched] = temperature[order][last]
+        self.bay_humidity[touched] = humidity[order][last]
+        READINGS_INGESTED.inc(len(bay))
+
+        high = self.lots.high_water
+        in_touched = np.zeros(self.bays.high_water, dtype=bool)
+        in_touched[touched] = True
+        slots = np.nonzero(self.lot_active[:high] & in_touched[self.lot_bay[:high]])[0]
+        if not len(slots):
+            return len(bay), []
+        degradation = self._degradation(slots)
+        band = np.searchsorted(BAND_EDGES, degradation, side="right").astype(np.int8)
+        moved = np.nonzero(band != self.lot_band[slots])[0]
+        self.lot_band[slots[moved]] = band[moved]
+        return len(bay), self._alerts(slots[moved], degradation[moved])
+
+    def _alerts(self, slots: np.ndarray, degradation: np.ndarray) -> List[dict]:
+        alerts = []
+        if not len(slots):
+            return alerts
+        remaining = self._remaining_days(slots, degradation)
+        for slot, d, days in zip(slots.tolist(), degradation.tolist(), remaining.tolist()):
+            self.alert_seq += 1
+            band = BANDS[self.lot_band[slot]]
+            bay = self.lot_bay[slot]
+            alert = {
+                "seq": self.alert_seq,
+                "lot_id": self.lots.ids[slot],
+                "bay_id": self.bays.ids[bay],
+                "crop": self.crops[self.lot_crop[slot]],
+                "risk_level": band,
+                "degradation": round(d, 4),
+                "remaining_shelf_life_days": round(days, 1),
+                "ts": float(self.bay_ts[bay]),
+            }
+            ALERTS_EMITTED.inc(band=band)
+            alerts.append(alert)
+            self.alerts.append(alert)
+        return alerts
+
+    def _remaining_days(self, slots: np.ndarray, degradation: np.ndarray) -> np.ndarray:
+        env = self.bay_env[self.lot_bay[slots]]
+        rate = self._crop_rate[self.lot_crop[slots]] * np.where(np.isfinite(env), env, 1.0)
+        return np.maximum(1.0 - degradation, 0.0) / rate
+
+    # --- Public API ---
+
+    def ingest_readings(self, bay_ids: Sequence[str], ts, temperature_c, humidity_percent) -> dict:
+        """Applies a columnar batch of bay readings; returns counts and any band-crossing alerts."""
+        with self._lock:
+            accepted, alerts = self._apply_readings(bay_ids, ts, temperature_c, humidity_percent)
+            ACTIVE_LOTS.set(len(self.lots.index))
+        return {"accepted": accepted, "rejected": len(bay_ids) - accepted, "alerts": alerts}
+
+    def ingest_events(self, events: Sequence[dict]) -> dict:
+        """
+        Applies events in order. Consecutive readings are applied as one
+        vectorized batch; lot and dispatch events flush the pending readings
+        first, so each sees the state its position in the stream implies.
+        """
+        accepted, alerts, errors = 0, [], []
+        columns = ([], [], [], [])
+
+        def flush():
+            nonlocal accepted
+            if columns[0]:
+                n, new_alerts = self._apply_readings(*columns)
+                accepted += n
+                alerts.extend(new_alerts)
+                for column in columns:
+                    column.clear()
+
+        with self._lock:
+            for i, event in enumerate(events):
+                try:
+                    if not isinstance(event, dict):
+                        raise ValueError("event must be an object")
+                    kind = event.get("type", "reading")
+                    if kind == "reading":
+                        # Parse every field before appending so the columns stay aligned
+                        reading = (str(event["bay_id"]), parse_ts(event["ts"]),
+                                   float(event["temperature_c"]), float(event["humidity_percent"]))
+                        for column, value in zip(columns, reading):
+                            column.append(value)
+                        continue
+                    flush()
+                    if kind == "lot":
+                        ts = parse_ts(event["ts"]) if event.get("ts") is not None else None
+                        degradation = event.get("degradation")
+                        error = self._register(str(event["lot_id"]), str(event["bay_id"]),
+                                               str(event.get("crop", "other")), ts,
+                                               None if degradation is None else float(degradation))
+                    elif kind == "dispatch":
+                        error = self._dispatch(str(event["lot_id"]))
+                    else:
+                        error = f"unknown event type {kind!r}"
+                    if error is None:
+                        accepted += 1
+                    else:
+                        errors.append({"index": i, "error": error})
+                except (KeyError, TypeError, ValueError) as e:
+                    errors.append({"index": i, "error": f"{type(e).__name__}: {e}"})
+            flush()
+            ACTIVE_LOTS.set(len(self.lots.index))
+        if errors:
+            EVENTS_REJECTED.inc(len(errors), reason="invalid")
+        return {"accepted": accepted, "rejected": len(events) - accepted, "alerts": alerts, "errors": errors}
+
+    def ingest_lines(self, lines: List[bytes]) -> dict:
+        """NDJSON lines (blank lines ignored); unparseable lines are reported as errors."""
+        index = [i for i, line in enumerate(lines) if line.strip()]
+        try:
+            # One parse for the whole chunk; only a chunk with a bad line is parsed line by line
+            events = json.loads(b"[" + b",".join(lines[i] for i in index) + b"]")
+        except ValueError:
+            events = None
+        if events is not None and len(events) == len(index):
+            result = self.ingest_events(events)
+            result["errors"] = [{"line": index[e["index"]], "error": e["error"]} for e in result["errors"]]
+            return result
+
+        events, errors, index = [], [], []
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+                index.append(i)
+            except ValueError as e:
+                errors.append({"line": i, "error": f"invalid JSON: {e}"})
+        result = self.ingest_events(events)
+        result["errors"] = errors + [{"line": index[e["index"]], "error": e["error"]} for e in result["errors"]]
+        result["rejected"] += len(errors)
+        return result
+
+    def lot_status(self, lot_id: str) -> Optional[dict]:
+        with self._lock:
+            slot = self.lots.get(lot_id)
+            if slot is None:
+                return None
+            slots = np.array([slot])
+            degradation = self._degradation(slots)
+            bay = self.lot_bay[slot]
+            return {
+                "lot_id": lot_id,
+                "bay_id": self.bays.ids[bay],
+                "crop": self.crops[self.lot_crop[slot]],
+                "risk_level": BANDS[self.lot_band[slot]],
+                "degradation": round(float(degradation[0]), 4),
+                "remaining_shelf_life_days": round(float(self._remaining_days(slots, degradation)[0]), 1),
+                "temperature_c": None if math.isnan(self.bay_temp[bay]) else float(self.bay_temp[bay]),
+                "humidity_percent": None if math.isnan(self.bay_humidity[bay]) else float(self.bay_humidity[bay]),
+                "last_reading_ts": float(self.bay_ts[bay]) if math.isfinite(self.bay_ts[bay]) else None,
+            }
+
+    def summary(self) -> dict:
+        with self._lock:
+            high = self.lots.high_water
+            bands = self.lot_band[:high][self.lot_active[:high]]
+            counts = np.bincount(bands, minlength=len(BANDS))
+            return {
+                "lots": len(self.lots.index),
+                "bays": len(self.bays.index),
+                "capacity": {"lots": self.lots.capacity, "bays": self.bays.capacity},
+                "lots_by_risk_level": dict(zip(BANDS, counts.tolist())),
+                "alert_seq": self.alert_seq,
+            }
+
+    def recent_alerts(self, since: int = 0, limit: int = 1000) -> List[dict]:
+        with self._lock:
+            # The buffer holds the latest seqs in order; skip the ones the caller has seen
+            skip = max(0, len(self.alerts) - (self.alert_seq - since))
+            return [self.alerts[i] for i in range(skip, min(len(self.alerts), skip + limit))]
+
+    def nbytes(self) -> int:
+        arrays = (self.lot_bay, self.lot_crop, self.lot_d0, self.lot_entry, self.lot_band, self.lot_active,
+                  self.bay_exposure, self.bay_ts, self.bay_env, self.bay_temp, self.bay_humidity)
+        return sum(a.nbytes for a in arrays)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_spoilage_engine() -> SpoilageEngine:
+    """Process-wide engine; each worker tracks the lots whose events it receives."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SpoilageEngine()
+    return _engine
@@ -0,0 +1,340 @@
+"""
+Weather alert feed: background polling into an immutable, pre-indexed snapshot.
+
+An `AlertFeed` polls BIOMETRIX_WEATHER_FEED_URL every BIOMETRIX_WEATHER_POLL_S
+seconds from one asyncio task, through a single pooled keep-alive httpx
+client with timeouts and conditional requests (If-None-Match /
+If-Modified-Since, so an unchanged feed costs a 304). Each changed feed is
+parsed, deduplicated and frozen into an `AlertSnapshot` holding the alerts,
+a state -> alerts index and the pre-encoded JSON bodies, then swapped in
+with one reference assignment. Handlers only read `feed.snapshot`: no
+per-request I/O, parsing or filtering.
+
+When the feed is down the last good snapshot keeps being served
+(stale-while-revalidate): responses are flagged stale once a refresh is
+overdue, the poller retries with exponential backoff, expired alerts are
+still dropped, and a request finding the snapshot stale wakes the poller
+early. Without a feed URL the bundled sample (data/weather_alerts_sample.json)
+is served.
+
+The feed is JSON: a list of alerts or {"source": ..., "alerts": [...]}, each
+with title (or event / headline), description, severity (High / Medium /
+Low or IMD colour codes), and optionally id, states, issued and expires.
+Alerts without `states` are located by the state and IMD subdivision names
+in their text.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from crops import normalize_state
+from metrics import REGISTRY, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+FEED_URL = os.environ.get("BIOMETRIX_WEATHER_FEED_URL", "")
+FEED_SOURCE = os.environ.get("BIOMETRIX_WEATHER_FEED_SOURCE", "IMD Mausam")
+POLL_S = float(os.environ.get("BIOMETRIX_WEATHER_POLL_S", "300"))
+FETCH_TIMEOUT_S = float(os.environ.get("BIOMETRIX_WEATHER_TIMEOUT_S", "10"))
+MAX_BACKOFF_S = float(os.environ.get("BIOMETRIX_WEATHER_MAX_BACKOFF_S", "1800"))
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "weather_alerts_sample.json")
+
+SEVERITY_ORDER = ("High", "Medium", "Low")
+_SEVERITY_ALIASES = {
+    "high": "High", "red": "High", "extreme": "High", "severe": "High", "warning": "High",
+    "medium": "Medium", "moderate": "Medium", "orange": "Medium", "alert": "Medium", "watch": "Medium",
+    "low": "Low", "yellow": "Low", "minor": "Low", "green": "Low", "advisory": "Low",
+}
+# IMD subdivisions and place names -> state; state names themselves are matched too
+REGION_STATES = {
+    "coastal andhra pradesh": "andhra pradesh", "rayalaseema": "andhra pradesh", "yanam": "puducherry",
+    "saurashtra": "gujarat", "kutch": "gujarat", "vidarbha": "maharashtra", "marathwada": "maharashtra",
+    "konkan": "maharashtra", "madhya maharashtra": "maharashtra", "coastal karnataka": "karnataka",
+    "interior karnataka": "karnataka", "mahe": "puducherry", "karaikal": "puducherry",
+    "gangetic west bengal": "west bengal", "sub-himalayan west bengal": "west bengal",
+    "jammu": "jammu and kashmir", "kashmir": "jammu and kashmir", "andaman": "andaman and nicobar islands",
+}
+STATES = (
+    "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh", "delhi", "goa", "gujarat",
+    "haryana", "himachal pradesh", "jharkhand", "karnataka", "kerala", "madhya pradesh", "maharashtra",
+    "manipur", "meghalaya", "mizoram", "nagaland", "odisha", "punjab", "rajasthan", "sikkim", "tamil nadu",
+    "telangana", "tripura", "uttar pradesh", "uttarakhand", "west bengal", "chandigarh", "ladakh",
+    "lakshadweep", "puducherry", "jammu and kashmir", "andaman and nicobar islands",
+)
+_PLACES = dict(REGION_STATES, **{state: state for state in STATES}, orissa="odisha")
+_PLACE_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(p) for p in sorted(_PLACES, key=len, reverse=True)) + r")\b", re.IGNORECASE,
+)
+
+FEED_FETCHES = REGISTRY.register(Counter(
+    "biometrix_weather_feed_fetches_total", "Weather feed polls by outcome.", ("outcome",),
+))
+FEED_LAST_SUCCESS = REGISTRY.register(Gauge(
+    "biometrix_weather_feed_last_success_timestamp_seconds", "When the weather feed last answered 200 or 304.",
+))
+
+
+class WeatherAlert(NamedTuple):
+    id: str
+    title: str
+    description: str
+    severity: str
+    source: str
+    states: Tuple[str, ...]
+    expires: Optional[float]    # epoch seconds
+
+
+def _parse_time(value) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    stamp = datetime.fromisoformat(text[:-1] + "+00:00" if text.endswith("Z") else text)
+    return (stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _states_of(item: dict, text: str) -> Tuple[str, ...]:
+    listed = item.get("states") or item.get("regions") or item.get("areas")
+    if isinstance(listed, str):
+        listed = listed.split(",")
+    if listed:
+        names = {normalize_state(str(name)) for name in listed if str(name).strip()}
+        return tuple(sorted(_PLACES.get(name, name) for name in names))
+    return tuple(sorted({_PLACES[m.lower()] for m in _PLACE_PATTERN.findall(text)}))
+
+
+def parse_feed(payload, default_source: str = FEED_SOURCE) -> List[WeatherAlert]:
+    """Feed JSON -> deduplicated alerts, most severe first. Malformed items are skipped."""
+    if isinstance(payload, dict):
+        default_source = str(payload.get("source") or default_source)
+        payload = payload.get("alerts", [])
+    if not isinstance(payload, list):
+        raise ValueError("feed must be a list of alerts or an object with an 'alerts' list")
+    merged: Dict[str, WeatherAlert] = {}
+    for item in payload:
+        if not isinstance(item, dict):
+            continue
+        title = " ".join(str(item.get("title") or item.get("event") or item.get("headline") or "").split())
+        description = " ".join(str(item.get("description") or item.get("text") or item.get("summary") or "").split())
+        if not title and not description:
+            continue
+        try:
+            expires = _parse_time(item.get("expires") or item.get("valid_until"))
+        except ValueError:
+            expires = None
+        severity = _SEVERITY_ALIASES.get(str(item.get("severity", "")).strip().lower(), "Medium")
+        key = str(item.get("id") or item.get("identifier")
+                  or hashlib.sha1(f"{title.lower()}\n{description.lower()}".encode()).hexdigest()[:16])
+        alert = WeatherAlert(key, title, description, severity, str(item.get("source") or default_source),
+                             _states_of(item, f"{title} {description}"), expires)
+        previous = merged.get(key)
+        if previous is not None:
+            # Same alert listed twice (e.g. once per state): keep one, covering every state
+            alert = alert._replace(
+                states=tuple(sorted(set(previous.states) | set(alert.states))),
+                severity=min(previous.severity, alert.severity, key=SEVERITY_ORDER.index),
+            )
+        merged[key] = alert
+    return sorted(merged.values(), key=lambda a: (SEVERITY_ORDER.index(a.severity), a.title, a.id))
+
+
+def _encode(alerts) -> bytes:
+    return json.dumps([
+        {"id": a.id, "title": a.title, "description": a.description, "severity": a.severity,
+         "source": a.source, "states": list(a.states)}
+        for a in alerts
+    ], separators=(",", ":")).encode()
+
+
+_EMPTY_BODY = b"[]"
+
+
+class AlertSnapshot:
+    """Immutable alert set with a state index and pre-encoded response bodies."""
+    __slots__ = ("alerts", "by_state", "_bodies", "body", "fetched_at", "etag", "last_modified", "origin",
+                 "next_expiry")
+
+    def __init__(self, alerts: List[WeatherAlert], fetched_at: float, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, origin: str = "feed"):
+        self.alerts = tuple(alerts)
+        index: Dict[str, List[WeatherAlert]] = {}
+        for alert in self.alerts:
+            for state in alert.states:
+                index.setdefault(state, []).append(alert)
+        self.by_state: Mapping[str, Tuple[WeatherAlert, ...]] = MappingProxyType(
+            {state: tuple(items) for state, items in index.items()})
+        self._bodies = MappingProxyType({state: _encode(items) for state, items in self.by_state.items()})
+        self.body = _encode(self.alerts)
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.origin = origin
+        self.next_expiry = min((a.expires for a in self.alerts if a.expires is not None), default=None)
+
+    def body_for(self, state: Optional[str] = None) -> bytes:
+        if state is None:
+            return self.body
+        return self._bodies.get(normalize_state(state), _EMPTY_BODY)
+
+    def checked(self, fetched_at: float) -> "AlertSnapshot":
+        """The same alerts, confirmed unchanged (304) at `fetched_at`."""
+        confirmed = copy.copy(self)
+        confirmed.fetched_at = fetched_at
+        return confirmed
+
+    def without_expired(self, now: float) -> "AlertSnapshot":
+        if self.next_expiry is None or self.next_expiry > now:
+            return self
+        live = [a for a in self.alerts if a.expires is None or a.expires > now]
+        return AlertSnapshot(live, self.fetched_at, self.etag, self.last_modified, self.origin)
+
+
+def load_sample(path: str = SAMPLE_PATH) -> AlertSnapshot:
+    with open(path) as fh:
+        return AlertSnapshot(parse_feed(json.load(fh)), time.time(), origin="sample")
+
+
+class AlertFeed:
+    def __init__(self, url: str = FEED_URL, poll_s: float = POLL_S, timeout_s: float = FETCH_TIMEOUT_S,
+                 max_backoff_s: float = MAX_BACKOFF_S):
+        self.url = url
+        self.poll_s = poll_s
+        self.timeout_s = timeout_s
+        self.max_backoff_s = max(max_backoff_s, poll_s)
+        self.snapshot = load_sample() if not url else AlertSnapshot([], 0.0, origin="empty")
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._client = None
+        self._task = None
+        self._wake = None
+
+    # --- Serving ---
+
+    def is_stale(self, now: float = None) -> bool:
+        if not self.url:
+            return False
+        return (time.time() if now is None else now) - self.snapshot.fetched_at > 2 * self.poll_s
+
+    def wake(self):
+        """
+        Asks the poller to refresh now (called from the event loop; no I/O
+        here). Ignored while the feed is failing, so backoff still applies.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    # --- Polling ---
+
+    async def start(self):
+        import httpx
+
+        if not self.url or self._task is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout_s),
+            limits=httpx.Limits(max_connections=2, max_keepalive_connections=1,
+                                keepalive_expiry=self.poll_s + self.timeout_s),
+            headers={"Accept": "application/json", "User-Agent": "biometrix-ai-engine"},
+            follow_redirects=True,
+        )
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def refresh(self) -> str:
+        """One conditional fetch; returns "updated", "not_modified" or "error"."""
+        current = self.snapshot
+        headers = {}
+        if current.etag:
+            headers["If-None-Match"] = current.etag
+        if current.last_modified:
+            headers["If-Modified-Since"] = current.last_modified
+        try:
+            response = await self._client.get(self.url, headers=headers)
+            now = time.time()
+            if response.status_code == 304:
+                self.snapshot = current.checked(now).without_expired(now)
+                outcome = "not_modified"
+            else:
+                response.raise_for_status()
+                alerts = parse_feed(response.json())
+                self.snapshot = AlertSnapshot(alerts, now, response.headers.get("etag"),
+                                              response.headers.get("last-modified")).without_expired(now)
+                outcome = "updated"
+            self.failures, self.last_error = 0, None
+            FEED_LAST_SUCCESS.set(now)
+        except Exception as e:   # network, HTTP status, bad JSON: keep serving the last snapshot
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.snapshot = current.without_expired(time.time())
+            outcome = "error"
+            logger.warning("Weather feed refresh failed (%d in a row): %s", self.failures, self.last_error)
+        FEED_FETCHES.inc(outcome=outcome)
+        return outcome
+
+    def _delay(self) -> float:
+        if not self.failures:
+            return self.poll_s
+        backoff = min(self.poll_s * 2 ** (self.failures - 1), self.max_backoff_s)
+        return backoff * random.uniform(0.8, 1.2)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            await self.refresh()
+            if self.failures:
+                # Stale-snapshot wakes from request traffic must not cut the backoff short
+                await asyncio.sleep(self._delay())
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._delay())
+            except asyncio.TimeoutError:
+                pass
+
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "url": self.url or None,
+            "origin": snapshot.origin,
+            "alerts": len(snapshot.alerts),
+            "states": len(snapshot.by_state),
+            "fetched_at": snapshot.fetched_at or None,
+            "stale": self.is_stale(),
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_alert_feed() -> AlertFeed:
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                _feed = AlertFeed()
+    return _feed
@@ -0,0 +1,366 @@
+"""
+Gridded daily weather forecasts for /crop-advisory.
+
+    python weather_grid.py netcdf <run.nc> [--rain-var rainfall] [--humidity-var humidity] [--grid DIR]
+    python weather_grid.py npz <run.npz> [--grid DIR]
+    python weather_grid.py synthetic [--start YYYY-MM-DD] [--days 16] [--tile 0.25] [--grid DIR]
+
+Each forecast run is a directory under BIOMETRIX_WEATHER_GRID/runs, named by
+its issue time so names sort chronologically:
+
+    runs/20261018T000000/
+        meta.json                  version, run, start (first forecast day), days,
+                                   lat0, lon0 (south-west tile corner), tile_deg, n_lat, n_lon
+        rainfall_mm.npy            float32 (day, lat-tile, lon-tile) daily totals
+        humidity_percent.npy       float32 (day, lat-tile, lon-tile) daily mean RH
+
+NaN marks tiles without data (sea). Runs are written to a hidden temp
+directory and renamed into place, so a run directory is complete from the
+moment it appears; dropping one in from a cron job (this CLI) is enough for
+serving workers to pick it up. `get_weather_grid()` looks for a newer run at
+most every BIOMETRIX_WEATHER_GRID_CHECK_S seconds and swaps the reference;
+requests in flight keep the run they started with (its arrays are mapped,
+so pruning old runs does not pull the files from under them).
+
+Arrays are opened with mmap_mode="r": an advisory touches seven days of two
+tiles, and a farm batch is one fancy-indexing gather per variable.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GRID_DIR = os.environ.get(
+    "BIOMETRIX_WEATHER_GRID",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "weather_grid"),
+)
+CHECK_S = float(os.environ.get("BIOMETRIX_WEATHER_GRID_CHECK_S", "30"))
+FORMAT_VERSION = 1
+META = "meta.json"
+VARIABLES = ("rainfall_mm", "humidity_percent")
+KEEP_RUNS = 3
+
+HARVEST_WINDOW_DAYS = 7
+# IMD conventions: a rainy day has >= 2.5 mm, "heavy rain" is >= 64.5 mm in a day
+RAINY_DAY_MM = 2.5
+HEAVY_RAIN_DAY_MM = 64.5
+HIGH_RISK_WEEK_MM = 50.0
+MEDIUM_RISK_WEEK_MM = 15.0
+MEDIUM_RISK_RAINY_DAYS = 3
+HUMID_PERCENT = 80.0        # produce won't dry in the field above this mean RH
+
+RISK_LEVELS = ("Unknown", "Low Risk", "Medium Risk", "High Risk")
+ADVICE = {
+    "Unknown": "No forecast covers this location and harvest week yet.",
+    "Low Risk": "Weather conditions are optimal for harvest.",
+    "Medium Risk": "Showers or humid weather expected during your harvest week. "
+                   "Dry the produce well before storage and keep tarpaulins ready.",
+    "High Risk": "Heavy rain predicted during your harvest week. "
+                 "Delay harvest by 3 days or arrange covered storage.",
+}
+
+# Synthetic runs cover mainland India
+INDIA_BBOX = (6.0, 68.0, 38.0, 98.0)
+
+
+class WeatherGridError(Exception):
+    """Raised when a forecast run is missing, stale or incomplete."""
+
+
+class WeatherGrid:
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: dict):
+        self.meta = meta
+        self.run = meta["run"]
+        self.start = np.datetime64(meta["start"], "D")
+        self.days = int(meta["days"])
+        self.lat0, self.lon0 = float(meta["lat0"]), float(meta["lon0"])
+        self.tile = float(meta["tile_deg"])
+        self.n_lat, self.n_lon = int(meta["n_lat"]), int(meta["n_lon"])
+        self.rainfall_mm = arrays["rainfall_mm"]
+        self.humidity_percent = arrays["humidity_percent"]
+
+    @classmethod
+    def load(cls, path: str) -> "WeatherGrid":
+        meta_path = os.path.join(path, META)
+        if not os.path.exists(meta_path):
+            raise WeatherGridError(f"No forecast run at {path}")
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get("version") != FORMAT_VERSION:
+            raise WeatherGridError(f"Forecast run format {meta.get('version')} != {FORMAT_VERSION}")
+        shape = (meta["days"], meta["n_lat"], meta["n_lon"])
+        try:
+            arrays = {name: np.asarray(np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+                      for name in VARIABLES}
+        except (OSError, ValueError) as e:
+            raise WeatherGridError(f"Incomplete forecast run at {path}: {e}")
+        if any(a.shape != tuple(shape) for a in arrays.values()):
+            raise WeatherGridError(f"Forecast run at {path} does not match its meta.json shape {shape}")
+        return cls(arrays, meta)
+
+    @property
+    def end(self) -> np.datetime64:
+        return self.start + (self.days - 1)
+
+    def tiles(self, lats, lons) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(lat-tile, lon-tile, inside-grid mask); tiles outside the grid come back as 0."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            iy = np.floor((lats - self.lat0) / self.tile)
+            ix = np.floor((lons - self.lon0) / self.tile)
+        inside = (iy >= 0) & (iy < self.n_lat) & (ix >= 0) & (ix < self.n_lon)
+        return (np.where(inside, iy, 0).astype(np.intp), np.where(inside, ix, 0).astype(np.intp), inside)
+
+    def harvest_window(self, lats, lons, harvest_dates, days: int = HARVEST_WINDOW_DAYS) -> Dict[str, np.ndarray]:
+        """
+        Weather over `days` days from each harvest date, aggregated over the
+        forecast days that cover it (`days_covered`; 0 means no forecast).
+        """
+        iy, ix, inside = self.tiles(lats, lons)
+        first = (np.asarray(harvest_dates, dtype="datetime64[D]") - self.start).astype(np.int64)
+        day = first[:, None] + np.arange(days)
+        covered = inside[:, None] & (day >= 0) & (day < self.days)
+        day = np.clip(day, 0, self.days - 1)
+        rain = self.rainfall_mm[day, iy[:, None], ix[:, None]]
+        humidity = self.humidity_percent[day, iy[:, None], ix[:, None]]
+        covered &= np.isfinite(rain) & np.isfinite(humidity)
+        rain = np.where(covered, rain, 0.0)
+        n = covered.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_humidity = np.where(covered, humidity, 0.0).sum(axis=1) / n
+        return {
+            "rainfall_mm": rain.sum(axis=1, dtype=np.float64),
+            "max_daily_rainfall_mm": rain.max(axis=1).astype(np.float64),
+            "rainy_days": (rain >= RAINY_DAY_MM).sum(axis=1),
+            "humidity_percent": np.where(n > 0, mean_humidity, np.nan),
+            "days_covered": n,
+        }
+
+
+def risk_codes(window: Dict[str, np.ndarray]) -> np.ndarray:
+    """Index into RISK_LEVELS per farm."""
+    rain, heaviest = window["rainfall_mm"], window["max_daily_rainfall_mm"]
+    with np.errstate(invalid="ignore"):
+        humid = window["humidity_percent"] >= HUMID_PERCENT
+    return np.select(
+        [window["days_covered"] == 0,
+         (rain >= HIGH_RISK_WEEK_MM) | (heaviest >= HEAVY_RAIN_DAY_MM),
+         (rain >= MEDIUM_RISK_WEEK_MM) | (window["rainy_days"] >= MEDIUM_RISK_RAINY_DAYS) | humid],
+        [0, 3, 2], default=1,
+    )
+
+
+# --- Runs on disk and the hot-swapped current grid ---
+
+def _runs_dir(root: str) -> str:
+    return os.path.join(root, "runs")
+
+
+def latest_run(root: str = GRID_DIR) -> Optional[str]:
+    """Name of the newest complete run, or None."""
+    try:
+        names = [entry.name for entry in os.scandir(_runs_dir(root))
+                 if entry.is_dir() and not entry.name.startswith(".")]
+    except FileNotFoundError:
+        return None
+    return max(names) if names else None
+
+
+def publish_run(arrays: Dict[str, np.ndarray], meta: dict, root: str = GRID_DIR, keep: int = KEEP_RUNS) -> str:
+    """
+    Writes a run and renames it into runs/ in one step, then prunes all but
+    the newest `keep` runs. Returns the run directory.
+    """
+    run = meta.get("run") or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    first = np.asarray(arrays[VARIABLES[0]])
+    meta = dict(meta, version=FORMAT_VERSION, run=run, days=first.shape[0],
+                n_lat=first.shape[1], n_lon=first.shape[2], published_at=time.time())
+    runs = _runs_dir(root)
+    os.makedirs(runs, exist_ok=True)
+    tmp = os.path.join(runs, f".{run}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in VARIABLES:
+        np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(arrays[name], dtype=np.float32))
+    with open(os.path.join(tmp, META), "w") as fh:
+        json.dump(meta, fh, indent=1)
+    path = os.path.join(runs, run)
+    if os.path.exists(path):
+        # Re-publishing a run id: move the old copy aside first (rename cannot replace a directory)
+        old = os.path.join(runs, f".{run}.{os.getpid()}.old")
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, path)
+    for name in sorted(n for n in os.listdir(runs) if not n.startswith("."))[:-keep]:
+        shutil.rmtree(os.path.join(runs, name), ignore_errors=True)
+    return path
+
+
+_grid: Optional[WeatherGrid] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _refresh_locked(root: str):
+    global _grid, _checked_at
+    run = latest_run(root)
+    if run is not None and (_grid is None or run != _grid.run):
+        try:
+            _grid = WeatherGrid.load(os.path.join(_runs_dir(root), run))
+            logger.info("Weather grid: run %s, %d days from %s, %d x %d tiles of %.3f deg",
+                        _grid.run, _grid.days, _grid.start, _grid.n_lat, _grid.n_lon, _grid.tile)
+        except WeatherGridError as e:
+            logger.warning("%s; keeping run %s", e, _grid.run if _grid else None)
+    elif run is None and _grid is None:
+        logger.info("No weather forecast runs in %s; advisories report Unknown", _runs_dir(root))
+    _checked_at = time.monotonic()
+
+
+def get_weather_grid(root: str = GRID_DIR) -> Optional[WeatherGrid]:
+    """
+    The newest forecast run, or None when none is installed. At most every
+    CHECK_S a request looks for a newer run; others keep serving the current one.
+    """
+    if _checked_at == 0.0 or time.monotonic() - _checked_at > CHECK_S:
+        # Only the very first caller has to wait for the scan
+        if _lock.acquire(blocking=_checked_at == 0.0):
+            try:
+                if _checked_at == 0.0 or time.monotonic() - _checked_at > CHECK_S:
+                    _refresh_locked(root)
+            finally:
+                _lock.release()
+    return _grid
+
+
+# --- Inputs ---
+
+def _regular_axis(values: np.ndarray, name: str) -> Tuple[float, float]:
+    """(first cell centre, step) of an evenly spaced ascending axis."""
+    step = np.diff(values)
+    if len(values) < 2 or not np.allclose(step, step[0], rtol=1e-3):
+        raise WeatherGridError(f"{name} must be a regular axis with at least two points")
+    return float(values[0]), float(step[0])
+
+
+def read_netcdf(path: str, rain_var: str = "rainfall", humidity_var: str = "humidity") -> Tuple[Dict[str, np.ndarray], dict]:
+    """A daily (time, lat, lon) NetCDF forecast on a regular grid, e.g. a regridded GFS/NCMRWF run."""
+    try:
+        import netCDF4
+    except ImportError:
+        raise WeatherGridError("NetCDF input requires the netCDF4 package")
+
+    with netCDF4.Dataset(path) as ds:
+        names = {name.lower(): name for name in ds.variables}
+        lat_name = names.get("lat") or names.get("latitude")
+        lon_name = names.get("lon") or names.get("longitude")
+        if lat_name is None or lon_name is None or "time" not in names:
+            raise WeatherGridError(f"{path} needs time, lat and lon coordinates")
+        lats = np.asarray(ds.variables[lat_name][:], dtype=np.float64)
+        lons = np.asarray(ds.variables[lon_name][:], dtype=np.float64)
+        times = ds.variables[names["time"]]
+        first_day = netCDF4.num2date(times[0], times.units).strftime("%Y-%m-%d")
+        arrays = {}
+        for name, var in (("rainfall_mm", rain_var), ("humidity_percent", humidity_var)):
+            if var not in ds.variables:
+                raise WeatherGridError(f"{path} has no variable {var!r}")
+            arrays[name] = np.ma.filled(ds.variables[var][:].astype(np.float32), np.nan)
+    if lats[0] > lats[-1]:
+        lats = lats[::-1]
+        arrays = {name: a[:, ::-1] for name, a in arrays.items()}
+    lat_c, tile = _regular_axis(lats, "latitude")
+    lon_c, lon_step = _regular_axis(lons, "longitude")
+    if not np.isclose(tile, lon_step, rtol=1e-3):
+        raise WeatherGridError("latitude and longitude spacing must match")
+    meta = {"start": first_day, "lat0": lat_c - tile / 2, "lon0": lon_c - tile / 2, "tile_deg": tile,
+            "source": os.path.basename(path)}
+    return arrays, meta
+
+
+def read_npz(path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+    """An .npz with the two (day, lat, lon) arrays plus start, lat0, lon0 and tile_deg scalars."""
+    with np.load(path, allow_pickle=False) as data:
+        missing = [k for k in VARIABLES + ("start", "lat0", "lon0", "tile_deg") if k not in data.files]
+        if missing:
+            raise WeatherGridError(f"{path} is missing {', '.join(missing)}")
+        arrays = {name: data[name].astype(np.float32) for name in VARIABLES}
+        meta = {"start": str(data["start"]), "lat0": float(data["lat0"]), "lon0": float(data["lon0"]),
+                "tile_deg": float(data["tile_deg"]), "source": os.path.basename(path)}
+    return arrays, meta
+
+
+def synthetic_run(start: date, days: int = 16, tile: float = 0.25, bbox=INDIA_BBOX,
+                  seed: int = 0) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Smooth random rain bands and humidity over `bbox`, for benchmarks and local development."""
+    rng = np.random.default_rng(seed)
+    lat0, lon0, lat1, lon1 = bbox
+    n_lat, n_lon = int(round((lat1 - lat0) / tile)), int(round((lon1 - lon0) / tile))
+    coarse = (days, max(2, n_lat // 16), max(2, n_lon // 16))
+
+    def smooth(field):
+        # Bilinear upsampling of a coarse random field
+        ys = np.linspace(0, field.shape[1] - 1, n_lat)
+        xs = np.linspace(0, field.shape[2] - 1, n_lon)
+        y0, x0 = np.floor(ys).astype(int), np.floor(xs).astype(int)
+        y1, x1 = np.minimum(y0 + 1, field.shape[1] - 1), np.minimum(x0 + 1, field.shape[2] - 1)
+        wy, wx = (ys - y0)[None, :, None], (xs - x0)[None, None, :]
+        top = field[:, y0][:, :, x0] * (1 - wx) + field[:, y0][:, :, x1] * wx
+        bottom = field[:, y1][:, :, x0] * (1 - wx) + field[:, y1][:, :, x1] * wx
+        return top * (1 - wy) + bottom * wy
+
+    wetness = smooth(rng.normal(0.0, 1.0, coarse))
+    rain = np.where(wetness > 0.3, rng.gamma(0.8, 18.0, wetness.shape) * wetness, 0.0)
+    humidity = np.clip(62 + 14 * wetness + rng.normal(0, 3, wetness.shape), 15, 100)
+    arrays = {"rainfall_mm": rain.astype(np.float32), "humidity_percent": humidity.astype(np.float32)}
+    meta = {"start": str(start), "lat0": lat0, "lon0": lon0, "tile_deg": tile, "source": f"synthetic:{seed}"}
+    return arrays, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--grid", default=GRID_DIR)
+    parser.add_argument("--run", help="run id (default: the current UTC time)")
+    sources = parser.add_subparsers(dest="source", required=True)
+    netcdf = sources.add_parser("netcdf", help="daily (time, lat, lon) NetCDF forecast")
+    netcdf.add_argument("path")
+    netcdf.add_argument("--rain-var", default="rainfall")
+    netcdf.add_argument("--humidity-var", default="humidity")
+    npz = sources.add_parser("npz", help=".npz with rainfall_mm, humidity_percent, start, lat0, lon0, tile_deg")
+    npz.add_argument("path")
+    synthetic = sources.add_parser("synthetic", help="synthetic all-India run")
+    synthetic.add_argument("--start", type=date.fromisoformat, default=date.today())
+    synthetic.add_argument("--days", type=int, default=16)
+    synthetic.add_argument("--tile", type=float, default=0.25)
+    synthetic.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    started = time.perf_counter()
+    if args.source == "netcdf":
+        arrays, meta = read_netcdf(args.path, args.rain_var, args.humidity_var)
+    elif args.source == "npz":
+        arrays, meta = read_npz(args.path)
+    else:
+        arrays, meta = synthetic_run(args.start, args.days, args.tile, seed=args.seed)
+    if args.run:
+        meta["run"] = args.run
+    path = publish_run(arrays, meta, args.grid)
+    shape = arrays["rainfall_mm"].shape
+    print(f"run {os.path.basename(path)}: {shape[0]} days from {meta['start']}, {shape[1]} x {shape[2]} tiles "
+          f"of {meta['tile_deg']} deg, {sum(a.nbytes for a in arrays.values()) / 1e6:.1f} MB "
+          f"in {time.perf_counter() - started:.1f} s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
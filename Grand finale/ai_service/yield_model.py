@@ -0,0 +1,320 @@
+"""
+Gradient-boosted yield model for /predict/yield and its batch / grid variants.
+
+Inputs are crop, state, seasonal rainfall (mm) and soil nitrogen; the target
+is yield in quintals per acre (requests multiply by acreage). The ensemble is
+fitted with scikit-learn's GradientBoostingRegressor and exported as padded
+(trees x nodes) arrays, so serving evaluates every tree for a whole block of
+rows with a fixed number of NumPy gather steps - no per-row Python. The same
+pass accumulates per-feature contributions (Saabas path attribution: each
+split credits its feature with the change in node value), which sum with the
+ensemble's base value to the prediction and back the `factors` output.
+
+    python yield_model.py [--data CSV]
+
+retrains the artifact from observed yields (columns crop, state, rainfall_mm,
+soil_nitrogen, yield_qtl_per_acre) or, without --data, from the agronomic
+response curves in `synthetic_yields`.
+"""
+import argparse
+import logging
+import os
+import threading
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from artifacts import ArtifactError, load_arrays, save_arrays
+from crops import normalize_crop, normalize_state
+from metrics import INFERENCE_ROWS, INFERENCE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+MODEL_DIR = os.environ.get(
+    "BIOMETRIX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"),
+)
+ARTIFACT_PATH = os.path.join(MODEL_DIR, f"yield_gbm-v{ARTIFACT_VERSION}.npz")
+
+FEATURES = ("crop", "state", "rainfall_mm", "soil_nitrogen")
+FACTOR_NAMES = ("Crop", "State", "Rainfall Impact", "Soil Health")
+BASE_FACTOR = "Base Yield"
+OTHER = "other"
+BLOCK_ROWS = 4096   # rows per traversal block; bounds the (trees x rows) temporaries
+
+# Agronomic priors for the synthetic training set:
+# crop -> (yield qtl/acre in good conditions, rainfall window low/high mm)
+CROP_PROFILES = {
+    "soybean": (4.5, 700, 1100),
+    "groundnut": (6.0, 500, 1000),
+    "mustard": (5.5, 250, 500),
+    "sunflower": (5.0, 500, 800),
+    "sesame": (2.0, 400, 700),
+    "castor": (5.5, 450, 800),
+    "safflower": (3.5, 250, 500),
+    "niger": (1.5, 800, 1300),
+    "linseed": (2.5, 300, 600),
+    OTHER: (4.0, 500, 1200),
+}
+STATE_FACTORS = {
+    "madhya pradesh": 1.0, "rajasthan": 0.92, "gujarat": 1.08, "maharashtra": 0.95,
+    "karnataka": 0.88, "andhra pradesh": 0.97, "telangana": 0.96, "tamil nadu": 1.05,
+    "uttar pradesh": 0.98, "haryana": 1.12, "west bengal": 0.93, "odisha": 0.85,
+    OTHER: 1.0,
+}
+
+
+def synthetic_yields(n: int, seed: int = 0) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Columns and yields (qtl/acre) from crop-specific rainfall windows, a
+    saturating nitrogen response, state multipliers and 8% lognormal noise.
+    """
+    rng = np.random.default_rng(seed)
+    crops = np.array(list(CROP_PROFILES))[rng.integers(0, len(CROP_PROFILES), n)]
+    states = np.array(list(STATE_FACTORS))[rng.integers(0, len(STATE_FACTORS), n)]
+    rainfall = rng.uniform(100, 2000, n)
+    nitrogen = rng.uniform(0, 300, n)
+
+    base, low, high = (np.array([CROP_PROFILES[c][i] for c in crops]) for i in range(3))
+    rain_factor = np.ones(n)
+    dry, wet = rainfall < low, rainfall > high
+    rain_factor[dry] = np.maximum(0.25, 1 - 0.9 * (low[dry] - rainfall[dry]) / low[dry])
+    rain_factor[wet] = np.maximum(0.5, 1 - 0.35 * (rainfall[wet] - high[wet]) / high[wet])
+    n_factor = (0.6 + 0.5 * (1 - np.exp(-nitrogen / 60))) / (0.6 + 0.5 * (1 - np.exp(-50 / 60)))
+    state_factor = np.array([STATE_FACTORS[s] for s in states])
+    noise = rng.lognormal(0.0, 0.08, n)
+    yields = base * rain_factor * n_factor * state_factor * noise
+    return {"crop": crops, "state": states, "rainfall_mm": rainfall, "soil_nitrogen": nitrogen}, yields
+
+
+def load_training_csv(path: str) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    columns = {name: frame[name].to_numpy() for name in FEATURES}
+    return columns, frame["yield_qtl_per_acre"].to_numpy(dtype=np.float64)
+
+# --- Model ---
+
+class YieldModel:
+    def __init__(self, feature, threshold, left, right, value, base_value, crops, states, r2):
+        self.feature = np.asarray(feature, dtype=np.intp)        # (T, M); leaves point at a zero column
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)              # leaves point at themselves
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)         # node means, learning rate applied
+        self.base_value = float(base_value)
+        self.crops = tuple(np.asarray(crops).tolist())
+        self.states = tuple(np.asarray(states).tolist())
+        self.r2 = float(r2)
+        self.depth = self._depth()
+        self._crop_codes = {name: i for i, name in enumerate(self.crops)}
+        self._state_codes = {name: i for i, name in enumerate(self.states)}
+        self.bias = self.base_value + float(self.value[:, 0].sum())
+        self._compile()
+
+    def _compile(self):
+        # Flat (tree-major) node arrays for serving. Preorder puts a split's
+        # left child at node + 1, so only the right child needs a lookup; a
+        # leaf gets threshold -inf (always "right") and points right at itself.
+        n_trees, width = self.feature.shape
+        index = np.arange(width)
+        internal = self.left != index
+        if not (self.left[internal] == np.broadcast_to(index, internal.shape)[internal] + 1).all():
+            raise ArtifactError("Tree nodes are not in preorder")
+        offsets = (np.arange(n_trees) * width)[:, None]
+        self._roots = offsets
+        self._feature = self.feature.ravel()
+        self._threshold = np.where(internal, self.threshold, -np.inf).ravel()
+        self._right = (np.where(internal, self.right, index) + offsets).ravel()
+        self._value = self.value.ravel()
+
+    def _depth(self) -> int:
+        # Node ids are in preorder (children after their parent), so one sweep suffices
+        n_trees, width = self.left.shape
+        depth = np.zeros((n_trees, width), dtype=np.intp)
+        for j in range(width):
+            t = np.nonzero(self.left[:, j] != j)[0]
+            depth[t, self.left[t, j]] = depth[t, j] + 1
+            depth[t, self.right[t, j]] = depth[t, j] + 1
+        return int(depth.max())
+
+    @classmethod
+    def train(cls, columns: Dict[str, np.ndarray] = None, yields: np.ndarray = None, seed: int = 0,
+              n_estimators: int = 200, max_depth: int = 4, learning_rate: float = 0.1):
+        """Fits on columns keyed by FEATURES; defaults to synthetic yields."""
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        if columns is None:
+            columns, yields = synthetic_yields(40_000, seed)
+        crops = tuple(sorted({normalize_crop(str(c)) for c in columns["crop"]} | {OTHER}))
+        states = tuple(sorted({normalize_state(str(s)) for s in columns["state"]} | {OTHER}))
+        X = _encode(columns, {c: i for i, c in enumerate(crops)}, {s: i for i, s in enumerate(states)})
+
+        order = np.random.default_rng(seed).permutation(len(X))
+        split = int(len(order) * 0.9)
+        gbm = GradientBoostingRegressor(n_estimators=n_estimators, max_depth=max_depth,
+                                        learning_rate=learning_rate, subsample=0.8, random_state=seed)
+        gbm.fit(X[order[:split]], yields[order[:split]])
+        r2 = gbm.score(X[order[split:]], yields[order[split:]])
+        gbm.fit(X, yields)
+        return cls.from_sklearn(gbm, crops, states, r2)
+
+    @classmethod
+    def from_sklearn(cls, gbm, crops, states, r2):
+        trees = [est[0].tree_ for est in gbm.estimators_]
+        n_trees, width = len(trees), max(t.node_count for t in trees)
+        n_features = len(FEATURES)
+        feature = np.full((n_trees, width), n_features, dtype=np.intp)
+        threshold = np.zeros((n_trees, width))
+        index = np.broadcast_to(np.arange(width), (n_trees, width))
+        left, right = index.copy(), index.copy()
+        value = np.zeros((n_trees, width))
+        for t, tree in enumerate(trees):
+            m = tree.node_count
+            split = tree.children_left >= 0
+            feature[t, :m][split] = tree.feature[split]
+            threshold[t, :m][split] = tree.threshold[split]
+            left[t, :m][split] = tree.children_left[split]
+            right[t, :m][split] = tree.children_right[split]
+            value[t, :m] = tree.value[:, 0, 0] * gbm.learning_rate
+        base_value = float(np.ravel(gbm.init_.constant_)[0])
+        return cls(feature, threshold, left, right, value, base_value, crops, states, r2)
+
+    def save(self, path: str = ARTIFACT_PATH):
+        save_arrays(path, {
+            "feature": self.feature.astype(np.int32), "threshold": self.threshold,
+            "left": self.left.astype(np.int32), "right": self.right.astype(np.int32),
+            "value": self.value, "base_value": np.array(self.base_value),
+            "crops": np.array(self.crops), "states": np.array(self.states),
+            "features": np.array(FEATURES), "r2": np.array(self.r2),
+        }, ARTIFACT_VERSION)
+
+    @classmethod
+    def load(cls, path: str = ARTIFACT_PATH):
+        arrays = load_arrays(path, ARTIFACT_VERSION)
+        if tuple(arrays["features"].tolist()) != FEATURES:
+            raise ArtifactError(f"Artifact features {arrays['features'].tolist()} != {list(FEATURES)}")
+        return cls(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"], arrays["value"],
+                   arrays["base_value"], arrays["crops"], arrays["states"], arrays["r2"])
+
+    # --- Inference ---
+
+    def crop_code(self, crop: str) -> int:
+        return self._crop_codes.get(normalize_crop(crop), self._crop_codes[OTHER])
+
+    def state_code(self, state: str) -> int:
+        return self._state_codes.get(normalize_state(state), self._state_codes[OTHER])
+
+    def encode(self, columns: Dict[str, Sequence]) -> np.ndarray:
+        """(N, len(FEATURES)) float matrix; unknown crops and states map to "other"."""
+        return _encode(columns, self._crop_codes, self._state_codes)
+
+    def grid(self, states: Sequence[str], soil_nitrogen: Sequence[float], crops: Sequence[str],
+             rainfall_mm: Sequence[float]) -> np.ndarray:
+        """
+        Feature rows for a district x crop x rainfall cube, shape (D * C * R, F)
+        in C order; districts are given by parallel `states` / `soil_nitrogen`.
+        """
+        d, c, r = len(states), len(crops), len(rainfall_mm)
+        X = np.empty((d, c, r, len(FEATURES)))
+        X[..., 0] = np.array([self.crop_code(name) for name in crops], dtype=np.float64)[None, :, None]
+        X[..., 1] = np.array([self.state_code(name) for name in states], dtype=np.float64)[:, None, None]
+        X[..., 2] = np.asarray(rainfall_mm, dtype=np.float64)[None, None, :]
+        X[..., 3] = np.asarray(soil_nitrogen, dtype=np.float64)[:, None, None]
+        return X.reshape(-1, len(FEATURES))
+
+    def explain(self, X: np.ndarray, contributions: bool = True):
+        """
+        Per-acre predictions (N,) and, with `contributions`, an (N, F) matrix
+        of per-feature contributions; each row sums with `bias` to its prediction.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n, n_features = X.shape
+        prediction = np.empty(n)
+        contrib = np.zeros((n, n_features)) if contributions else None
+        with INFERENCE_SECONDS.time(model="yield_gbm"):
+            for start in range(0, n, BLOCK_ROWS):
+                block = X[start:start + BLOCK_ROWS]
+                rows = len(block)
+                # Feature-major, flattened, with a trailing zero row read by leaves
+                values = np.concatenate((block.T.ravel(), np.zeros(rows)))
+                cols = np.arange(rows)
+                node = np.repeat(self._roots, rows, axis=1)          # (trees, rows) flat node ids
+                node_value = self._value[node] if contributions else None
+                flat = np.zeros((n_features + 1) * rows) if contributions else None
+                for _ in range(self.depth):
+                    cell = self._feature[node] * rows + cols
+                    go_left = values[cell] <= self._threshold[node]
+                    node = np.where(go_left, node + 1, self._right[node])
+                    if contributions:
+                        child_value = self._value[node]
+                        flat += np.bincount(cell.ravel(), weights=(child_value - node_value).ravel(),
+                                            minlength=flat.size)
+                        node_value = child_value
+                leaf_value = node_value if contributions else self._value[node]
+                prediction[start:start + rows] = self.base_value + leaf_value.sum(axis=0)
+                if contributions:
+                    contrib[start:start + rows] = flat.reshape(n_features + 1, rows)[:n_features].T
+        INFERENCE_ROWS.inc(n, model="yield_gbm")
+        return prediction, contrib
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.explain(X, contributions=False)[0]
+
+
+def _encode(columns, crop_codes, state_codes) -> np.ndarray:
+    other_crop, other_state = crop_codes[OTHER], state_codes[OTHER]
+    # Resolve each distinct name once, then broadcast the codes
+    crop_names, crop_inverse = np.unique(np.asarray(columns["crop"], dtype=str), return_inverse=True)
+    state_names, state_inverse = np.unique(np.asarray(columns["state"], dtype=str), return_inverse=True)
+    crop_lookup = np.array([crop_codes.get(normalize_crop(c), other_crop) for c in crop_names.tolist()])
+    state_lookup = np.array([state_codes.get(normalize_state(s), other_state) for s in state_names.tolist()])
+    X = np.empty((len(crop_inverse), len(FEATURES)))
+    X[:, 0] = crop_lookup[crop_inverse.ravel()] if len(crop_names) else 0
+    X[:, 1] = state_lookup[state_inverse.ravel()] if len(state_names) else 0
+    X[:, 2] = np.asarray(columns["rainfall_mm"], dtype=np.float64)
+    X[:, 3] = np.asarray(columns["soil_nitrogen"], dtype=np.float64)
+    return X
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_yield_model() -> YieldModel:
+    """Process-wide model, loaded from the artifact on first use (trained if missing)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_or_train()
+    return _model
+
+
+def _load_or_train(path: str = ARTIFACT_PATH) -> YieldModel:
+    try:
+        return YieldModel.load(path)
+    except ArtifactError as e:
+        logger.warning("%s; training YieldModel in-process", e)
+    model = YieldModel.train()
+    try:
+        model.save(path)
+    except OSError as e:
+        logger.warning("Could not persist YieldModel artifact: %s", e)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the yield model artifact")
+    parser.add_argument("--data", help="CSV of observed yields (crop, state, rainfall_mm, soil_nitrogen, "
+                                       "yield_qtl_per_acre)")
+    parser.add_argument("--out", default=ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    columns, yields = load_training_csv(args.data) if args.data else synthetic_yields(40_000, seed=0)
+    model = YieldModel.train(columns, yields)
+    print(f"Held-out R^2: {model.r2:.3f} on {len(yields) // 10} rows")
+    model.save(args.out)
+    print(f"Saved {args.out}")